@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class CrossCountingConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'apps.cross_counting'
+
+    def ready(self):
+        from . import signals  # noqa F401
@@ -0,0 +1,93 @@
+"""
+Shared-cache helpers for occupancy, dashboard and analysis results
+Keys carry a namespace version so a whole family of entries can be dropped at once, and get_or_compute
+lets a single worker recompute an expired entry while the others wait for its result (single flight)
+instead of all hitting the database together.
+
+The cache is the default Django cache (Redis, see settings.CACHES). When it is unreachable every call
+simply computes the value.
+"""
+
+import functools
+import time
+import uuid
+
+from django.core.cache import cache
+
+KEY_PREFIX = 'cross_counting'
+
+# Readings, occupancy and reports depend on region and camera membership
+CAMERA_SET = 'camera_set'
+
+_MISSING = object()
+
+
+def namespace_version(namespace):
+    """Current version token of `namespace`; a fresh one if it was never set or has been evicted"""
+    key = f'{KEY_PREFIX}:version:{namespace}'
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, uuid.uuid4().hex, timeout=None)
+        version = cache.get(key) or 'unversioned'
+    return version
+
+
+def bump_namespace(namespace):
+    """Orphan every key built from `namespace`"""
+    cache.set(f'{KEY_PREFIX}:version:{namespace}', uuid.uuid4().hex, timeout=None)
+
+
+def make_key(*parts, namespace=CAMERA_SET):
+    return ':'.join([KEY_PREFIX, *map(str, parts), namespace_version(namespace)])
+
+
+def get_or_compute(key, compute, timeout, lock_timeout=30, wait_timeout=10, poll_interval=0.05):
+    """
+    Return the cached value of `key`, computing and storing it with `timeout` when missing
+
+    Only the caller that takes the key's lock computes; others poll for the result for up to `wait_timeout`
+    seconds and compute it themselves if the lock holder gives up or takes too long. `lock_timeout` bounds
+    how long a crashed holder can block the key.
+    """
+    value = cache.get(key, _MISSING)
+    if value is not _MISSING:
+        return value
+
+    lock_key = f'{key}:lock'
+    token = uuid.uuid4().hex
+    if cache.add(lock_key, token, timeout=lock_timeout) or cache.get(lock_key) is None:
+        # Lock taken, or the cache is unreachable and there is nothing to wait for
+        try:
+            value = compute()
+            cache.set(key, value, timeout=timeout)
+            return value
+        finally:
+            if cache.get(lock_key) == token:
+                cache.delete(lock_key)
+
+    deadline = time.monotonic() + wait_timeout
+    while time.monotonic() < deadline:
+        time.sleep(poll_interval)
+        value = cache.get(key, _MISSING)
+        if value is not _MISSING:
+            return value
+        if cache.get(lock_key) is None:
+            break
+
+    value = compute()
+    cache.set(key, value, timeout=timeout)
+    return value
+
+
+def cached(name, timeout):
+    """Cache a function without arguments under `name` (camera-set versioned), recomputed single-flight"""
+
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper():
+            return get_or_compute(make_key(name), func, timeout=timeout)
+
+        wrapper.uncached = func
+        return wrapper
+
+    return decorator
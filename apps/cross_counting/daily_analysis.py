@@ -0,0 +1,220 @@
+"""
+Columnar engine for the simplified daily analysis
+The carry-forward cumulative maxima are computed in Postgres (load_hourly_cumulative_max), which returns
+24 rows per camera instead of the day's raw readings. Raw readings, needed only for the per-camera series,
+are loaded as NumPy arrays (camera index, epoch microseconds, in, out, total)
+"""
+
+from datetime import datetime, time, timedelta
+
+import numpy as np
+from django.db import connection
+from django.utils import timezone
+
+MICROS_PER_SECOND = 1000000
+SECONDS_PER_DAY = 86400
+
+# Column order of the arrays returned by load_day_readings
+CAMERA, EPOCH_US, IN, OUT, TOTAL = range(5)
+
+
+def day_bounds(target_date, tz=None):
+    """Aware [start, end) of `target_date` in `tz` (the current timezone by default)"""
+    tz = tz or timezone.get_current_timezone()
+    start = timezone.make_aware(datetime.combine(target_date, time.min), tz)
+    end = timezone.make_aware(datetime.combine(target_date + timedelta(days=1), time.min), tz)
+    return start, end
+
+
+def load_day_readings(camera_ids, target_date):
+    """
+    Load every reading of `camera_ids` on `target_date` as an int64 array with columns
+    (index into camera_ids, epoch microseconds, in, out, total), ordered by camera and time
+    """
+    start, end = day_bounds(target_date)
+    with connection.cursor() as cursor:
+        cursor.execute("""
+            SELECT array_position(%s::uuid[], camera_id) - 1 AS camera_index,
+                   (EXTRACT(EPOCH FROM created_at) * 1000000)::bigint AS epoch_us,
+                   cc_in_count,
+                   cc_out_count,
+                   cc_total_count
+            FROM cross_counting_data_timeseries
+            WHERE camera_id = ANY (%s::uuid[])
+              AND created_at >= %s
+              AND created_at < %s
+            ORDER BY camera_index, created_at
+        """, [camera_ids, camera_ids, start, end])
+        rows = cursor.fetchall()
+
+    if not rows:
+        return np.empty((0, 5), dtype=np.int64)
+    return np.array(rows, dtype=np.int64)
+
+
+def load_hourly_cumulative_max(camera_ids, target_date):
+    """
+    Per camera (in camera_ids order) and local hour of `target_date`, the highest in/out count seen up to the
+    end of that hour, carried forward over hours without readings
+    Returns (cumulative_in, cumulative_out, max_data_hour): two (len(camera_ids), 24) int64 arrays and the
+    last local hour with a reading (None when there are none)
+    """
+    start, end = day_bounds(target_date)
+    tz_name = timezone.get_current_timezone_name()
+    with connection.cursor() as cursor:
+        cursor.execute("""
+            WITH hourly_max AS (
+                SELECT camera_id,
+                       EXTRACT(HOUR FROM created_at AT TIME ZONE %s)::int AS hour,
+                       MAX(cc_in_count) AS max_in,
+                       MAX(cc_out_count) AS max_out
+                FROM cross_counting_data_timeseries
+                WHERE camera_id = ANY (%s::uuid[])
+                  AND created_at >= %s
+                  AND created_at < %s
+                GROUP BY 1, 2
+            )
+            SELECT c.position - 1,
+                   h.hour,
+                   COALESCE(MAX(hm.max_in) OVER w, 0),
+                   COALESCE(MAX(hm.max_out) OVER w, 0),
+                   hm.camera_id IS NOT NULL
+            FROM unnest(%s::uuid[]) WITH ORDINALITY AS c(camera_id, position)
+            CROSS JOIN generate_series(0, 23) AS h(hour)
+            LEFT JOIN hourly_max hm ON hm.camera_id = c.camera_id AND hm.hour = h.hour
+            WINDOW w AS (PARTITION BY c.position ORDER BY h.hour)
+            ORDER BY c.position, h.hour
+        """, [tz_name, camera_ids, start, end, camera_ids])
+        rows = cursor.fetchall()
+
+    cumulative_in = np.zeros((len(camera_ids), 24), dtype=np.int64)
+    cumulative_out = np.zeros((len(camera_ids), 24), dtype=np.int64)
+    max_data_hour = None
+    for camera_index, hour, max_in, max_out, has_data in rows:
+        cumulative_in[camera_index, hour] = max_in
+        cumulative_out[camera_index, hour] = max_out
+        if has_data and (max_data_hour is None or hour > max_data_hour):
+            max_data_hour = hour
+    return cumulative_in, cumulative_out, max_data_hour
+
+
+def local_timestamps(epoch_us, target_date, tz=None):
+    """
+    Return (local wall-clock microseconds since the epoch, ISO offset suffix per row) for `epoch_us`
+    A single offset covers the whole day unless it has a DST transition, in which case each row is converted
+    """
+    tz = tz or timezone.get_current_timezone()
+    start, end = day_bounds(target_date, tz)
+    offset = start.utcoffset()
+
+    if offset == end.utcoffset():
+        offset_us = int(offset.total_seconds()) * MICROS_PER_SECOND
+        suffix = start.isoformat()[19:]
+        return epoch_us + offset_us, np.full(len(epoch_us), suffix, dtype=object)
+
+    local_us = np.empty_like(epoch_us)
+    suffixes = np.empty(len(epoch_us), dtype=object)
+    for i, value in enumerate(epoch_us.tolist()):
+        local = datetime.fromtimestamp(value / MICROS_PER_SECOND, tz)
+        local_us[i] = value + int(local.utcoffset().total_seconds()) * MICROS_PER_SECOND
+        suffixes[i] = local.isoformat()[-6:]
+    return local_us, suffixes
+
+
+def local_hours(local_us):
+    return (local_us // MICROS_PER_SECOND) % SECONDS_PER_DAY // 3600
+
+
+def regional_hourly_totals(cumulative_in, cumulative_out):
+    """Per-hour region totals and the number of cameras with a non-zero cumulative count"""
+    active = (cumulative_in > 0) | (cumulative_out > 0)
+    return [
+        {
+            'hour': hour,
+            'total_in_count': int(total_in),
+            'total_out_count': int(total_out),
+            'active_cameras': int(active_cameras),
+        }
+        for hour, (total_in, total_out, active_cameras) in enumerate(zip(
+            cumulative_in.sum(axis=0).tolist(),
+            cumulative_out.sum(axis=0).tolist(),
+            active.sum(axis=0).tolist(),
+        ))
+    ]
+
+
+def downsample_indices(in_counts, out_counts, max_points):
+    """
+    Indices of the points to plot so a series has at most about `max_points` points
+    The series is split into equal buckets and each keeps the positions of its in/out minimum and maximum,
+    plus the first and last point overall, so peaks, resets and the chart's envelope are preserved
+    """
+    n = len(in_counts)
+    if not max_points or n <= max_points:
+        return np.arange(n)
+
+    n_buckets = max(1, (max_points - 2) // 4)
+    edges = np.linspace(0, n, n_buckets + 1).astype(np.int64)
+    keep = [np.array([0, n - 1])]
+    for lo, hi in zip(edges[:-1].tolist(), edges[1:].tolist()):
+        if lo == hi:
+            continue
+        keep.append(lo + np.array([
+            in_counts[lo:hi].argmin(), in_counts[lo:hi].argmax(),
+            out_counts[lo:hi].argmin(), out_counts[lo:hi].argmax(),
+        ]))
+    return np.unique(np.concatenate(keep))
+
+
+def individual_camera_series(readings, local_us, suffixes, hours, max_hour, camera_ids, camera_names,
+                             max_points=None):
+    """
+    Data points per camera up to `max_hour`, in camera_ids order; cameras without points are left out
+    With `max_points`, longer series are downsampled (see downsample_indices); total_points, first_time,
+    last_time and the maxima still describe every reading
+    """
+    keep = hours <= max_hour
+    readings = readings[keep]
+    local_us = local_us[keep]
+    suffixes = suffixes[keep]
+
+    whole_seconds = local_us % MICROS_PER_SECOND == 0
+    stamps = np.where(
+        whole_seconds,
+        np.datetime_as_string(local_us.astype('datetime64[us]'), unit='s'),
+        np.datetime_as_string(local_us.astype('datetime64[us]'), unit='us'),
+    )
+
+    bounds = np.searchsorted(readings[:, CAMERA], np.arange(len(camera_ids) + 1))
+    series = []
+    for index, camera_id in enumerate(camera_ids):
+        lo, hi = bounds[index], bounds[index + 1]
+        if lo == hi:
+            continue
+        rows = readings[lo:hi]
+        plotted = downsample_indices(rows[:, IN], rows[:, OUT], max_points)
+        data_points = [
+            {
+                'cc_in_count': cc_in,
+                'cc_out_count': cc_out,
+                'cc_total_count': cc_total,
+                'created_at': stamp[11:19],
+                'timestamp': stamp + suffix,
+            }
+            for cc_in, cc_out, cc_total, stamp, suffix in zip(
+                rows[plotted, IN].tolist(), rows[plotted, OUT].tolist(), rows[plotted, TOTAL].tolist(),
+                stamps[lo:hi][plotted].tolist(), suffixes[lo:hi][plotted].tolist(),
+            )
+        ]
+        series.append({
+            'camera_id': str(camera_id),
+            'camera_name': camera_names[camera_id],
+            'data_points': data_points,
+            'total_points': int(hi - lo),
+            'plotted_points': len(data_points),
+            'first_time': data_points[0]['created_at'],
+            'last_time': data_points[-1]['created_at'],
+            'max_in': int(rows[:, IN].max()),
+            'max_out': int(rows[:, OUT].max()),
+        })
+    return series
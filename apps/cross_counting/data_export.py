@@ -0,0 +1,158 @@
+"""
+Streaming exports of raw cross-counting readings
+Readings are read through a server-side cursor (QuerySet.iterator) as plain tuples and written out in
+chunks, so an export of any size runs in constant memory. CSV can be gzip-compressed on the fly; Parquet
+is written one row group at a time and needs pyarrow.
+"""
+
+import csv
+import io
+import zlib
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:  # pragma: no cover - pyarrow is optional, Parquet export is unavailable without it
+    pyarrow = None
+
+FIELDS = (
+    'device_name', 'camera__name', 'channel', 'cc_in_count', 'cc_out_count', 'cc_total_count',
+    'created_at', 'alarm_time',
+)
+
+HEADER = [
+    'Device Name', 'Camera', 'Channel', 'In Count', 'Out Count', 'Total Count',
+    'Created At (System)', 'Alarm Time (Device)', 'Time Difference (seconds)',
+]
+
+CHUNK_SIZE = 5000
+
+# Bytes of CSV collected before a chunk is sent (and compressed)
+CSV_CHUNK_BYTES = 64 * 1024
+
+_TIME_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+
+def readings(queryset, chunk_size=CHUNK_SIZE):
+    """Rows of FIELDS in the queryset's order, fetched `chunk_size` at a time"""
+    return queryset.values_list(*FIELDS).iterator(chunk_size=chunk_size)
+
+
+def csv_rows(rows):
+    """Format readings like the admin's original CSV export"""
+    yield HEADER
+    for device_name, camera, channel, in_count, out_count, total_count, created_at, alarm_time in rows:
+        time_diff = ''
+        if created_at and alarm_time:
+            time_diff = f'{(created_at - alarm_time).total_seconds():.2f}'
+        yield [
+            device_name,
+            camera or '',
+            channel,
+            in_count,
+            out_count,
+            total_count,
+            created_at.strftime(_TIME_FORMAT) if created_at else '',
+            alarm_time.strftime(_TIME_FORMAT) if alarm_time else '',
+            time_diff,
+        ]
+
+
+def csv_chunks(rows, compress=False):
+    """Encode readings as CSV in chunks of about CSV_CHUNK_BYTES, gzip-compressed when `compress` is set"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    compressor = zlib.compressobj(wbits=31) if compress else None
+
+    def drain():
+        data = buffer.getvalue().encode('utf-8')
+        buffer.seek(0)
+        buffer.truncate()
+        return compressor.compress(data) if compressor else data
+
+    for row in csv_rows(rows):
+        writer.writerow(row)
+        if buffer.tell() >= CSV_CHUNK_BYTES:
+            chunk = drain()
+            if chunk:
+                yield chunk
+
+    chunk = drain()
+    if compressor:
+        chunk += compressor.flush()
+    if chunk:
+        yield chunk
+
+
+class _ChunkSink:
+    """Write-only file that hands its contents out in pieces, for writing Parquet to a stream"""
+
+    def __init__(self):
+        self.closed = False
+        self._chunks = []
+        self._position = 0
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+    def writable(self):
+        return True
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def take(self):
+        data = b''.join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def parquet_chunks(rows, row_group_size=CHUNK_SIZE):
+    """Encode readings as Parquet, one row group of `row_group_size` readings per chunk"""
+    if pyarrow is None:
+        raise RuntimeError("Parquet export requires pyarrow")
+
+    timestamp = pyarrow.timestamp('us', tz='UTC')
+    schema = pyarrow.schema([
+        ('device_name', pyarrow.string()),
+        ('camera', pyarrow.string()),
+        ('channel', pyarrow.string()),
+        ('cc_in_count', pyarrow.int64()),
+        ('cc_out_count', pyarrow.int64()),
+        ('cc_total_count', pyarrow.int64()),
+        ('created_at', timestamp),
+        ('alarm_time', timestamp),
+        ('time_difference_seconds', pyarrow.float64()),
+    ])
+
+    sink = _ChunkSink()
+    writer = pyarrow.parquet.ParquetWriter(sink, schema)
+
+    def write_group(group):
+        columns = [list(column) for column in zip(*group)]
+        columns.append([
+            (created_at - alarm_time).total_seconds() if created_at and alarm_time else None
+            for created_at, alarm_time in zip(columns[6], columns[7])
+        ])
+        writer.write_table(pyarrow.Table.from_arrays(columns, schema=schema))
+
+    group = []
+    for row in rows:
+        group.append(row)
+        if len(group) >= row_group_size:
+            write_group(group)
+            group = []
+            yield sink.take()
+    if group:
+        write_group(group)
+
+    writer.close()
+    yield sink.take()
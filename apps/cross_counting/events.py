@@ -0,0 +1,228 @@
+"""
+Occupancy change events
+The ingest writer publishes the regions and cameras whose live state changed in each committed flush to a
+Redis channel; the occupancy stream view relays them to browsers as server-sent events, with a full
+snapshot on connect and every SNAPSHOT_INTERVAL seconds so readings that age out are also reflected
+"""
+
+import json
+import logging
+import time
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+
+logger = logging.getLogger(__name__)
+
+# Region deltas are public; camera deltas are only relayed to signed-in users
+REGION_CHANNEL = 'cross_counting:occupancy:regions'
+CAMERA_CHANNEL = 'cross_counting:occupancy:cameras'
+
+SNAPSHOT_INTERVAL = 60
+KEEPALIVE_INTERVAL = 15
+FALLBACK_POLL_INTERVAL = 10
+
+# Keys compared to decide whether a state changed since it was last published
+_REGION_KEYS = ('current_count', 'total_in_count', 'total_out_count', 'active_cameras', 'max_occupancy')
+_CAMERA_KEYS = ('cc_in_count', 'cc_out_count', 'cc_total_count')
+
+
+def encode_event(data):
+    return json.dumps(data, cls=DjangoJSONEncoder, separators=(',', ':'))
+
+
+class OccupancyPublisher:
+    """
+    Publishes occupancy deltas from the ingest writer thread
+
+    Redis is optional: when it is unreachable, events are dropped and the connection is retried at most
+    every `retry_interval` seconds, so ingestion never waits on it.
+    """
+
+    def __init__(self, redis_url=None, retry_interval=30):
+        self.redis_url = redis_url or settings.REDIS_URL
+        self.retry_interval = retry_interval
+        self._client = None
+        self._retry_at = 0.0
+        self._regions = {}
+        self._cameras = {}
+
+    def publish(self, camera_states, region_states):
+        """Publish the states that differ from the last published ones; returns the delta (or None)"""
+        regions = self._changed(self._regions, region_states, 'region_id', _REGION_KEYS)
+        cameras = self._changed(self._cameras, camera_states, 'camera_id', _CAMERA_KEYS)
+        if not regions and not cameras:
+            return None
+
+        delta = {'regions': regions, 'cameras': cameras}
+        client = self._get_client()
+        if client is not None:
+            try:
+                if regions:
+                    client.publish(REGION_CHANNEL, encode_event({'regions': regions}))
+                if cameras:
+                    client.publish(CAMERA_CHANNEL, encode_event({'cameras': cameras}))
+            except Exception as e:
+                logger.warning(f"Failed to publish occupancy update: {e}")
+                self._client = None
+                self._retry_at = time.monotonic() + self.retry_interval
+        return delta
+
+    @staticmethod
+    def _changed(last_published, states, key, fields):
+        changed = []
+        for state in states:
+            values = tuple(state[field] for field in fields)
+            if last_published.get(state[key]) != values:
+                last_published[state[key]] = values
+                changed.append(state)
+        return changed
+
+    def _get_client(self):
+        if self._client is None and time.monotonic() >= self._retry_at:
+            import redis
+
+            self._client = redis.Redis.from_url(self.redis_url, socket_connect_timeout=1, socket_timeout=1)
+        return self._client
+
+
+def build_snapshot(include_cameras=False):
+    """Full occupancy state in the same shape as the deltas"""
+    from .live_state import get_region_states
+    from .utils import LatestReadingSnapshot
+
+    regions = [
+        {key: region[key] for key in ('region_id', 'occupancy_percentage') + _REGION_KEYS}
+        for region in get_region_states()
+    ]
+    cameras = []
+    if include_cameras:
+        for region in LatestReadingSnapshot.get_snapshot():
+            for camera in region['cameras']:
+                reading = camera['reading'] or {}
+                cameras.append({
+                    'camera_id': str(camera['camera_id']),
+                    'cc_in_count': reading.get('cc_in_count', 0),
+                    'cc_out_count': reading.get('cc_out_count', 0),
+                    'cc_total_count': reading.get('cc_total_count', 0),
+                    'current_occupancy': reading.get('occupancy', 0),
+                    'reading_at': reading.get('created_at'),
+                })
+    return {'regions': regions, 'cameras': cameras}
+
+
+def format_sse(event, data):
+    """Frame one server-sent event; `data` is an encoded JSON string"""
+    return f"event: {event}\ndata: {data}\n\n"
+
+
+def _channels(include_cameras):
+    return [REGION_CHANNEL, CAMERA_CHANNEL] if include_cameras else [REGION_CHANNEL]
+
+
+def _close_quietly(close):
+    try:
+        close()
+    except Exception:
+        pass
+
+
+async def _aclose_quietly(pubsub):
+    try:
+        await pubsub.aclose()
+    except Exception:
+        pass
+
+
+def stream_events(include_cameras=False, redis_url=None):
+    """Blocking SSE generator, for WSGI workers"""
+    import redis
+
+    yield format_sse('snapshot', encode_event(build_snapshot(include_cameras)))
+    next_snapshot = time.monotonic() + SNAPSHOT_INTERVAL
+
+    pubsub = None
+    try:
+        pubsub = redis.Redis.from_url(redis_url or settings.REDIS_URL).pubsub(ignore_subscribe_messages=True)
+        pubsub.subscribe(*_channels(include_cameras))
+    except Exception as e:
+        logger.warning(f"Occupancy stream falling back to polling: {e}")
+        pubsub = None
+
+    try:
+        while True:
+            message = None
+            if pubsub is not None:
+                try:
+                    message = pubsub.get_message(timeout=KEEPALIVE_INTERVAL)
+                except (redis.RedisError, OSError) as e:
+                    logger.warning(f"Occupancy stream lost Redis, falling back to polling: {e}")
+                    _close_quietly(pubsub.close)
+                    pubsub = None
+
+            if pubsub is not None:
+                if message is not None:
+                    yield format_sse('delta', message['data'].decode())
+                else:
+                    yield ": keepalive\n\n"
+            else:
+                time.sleep(FALLBACK_POLL_INTERVAL)
+                next_snapshot = 0
+
+            if time.monotonic() >= next_snapshot:
+                yield format_sse('snapshot', encode_event(build_snapshot(include_cameras)))
+                next_snapshot = time.monotonic() + SNAPSHOT_INTERVAL
+    finally:
+        if pubsub is not None:
+            pubsub.close()
+
+
+async def astream_events(include_cameras=False, redis_url=None):
+    """Async SSE generator, for ASGI servers; one Redis subscription per client, no thread held"""
+    import asyncio
+
+    import redis
+    import redis.asyncio as aioredis
+    from asgiref.sync import sync_to_async
+
+    snapshot = sync_to_async(lambda: encode_event(build_snapshot(include_cameras)))
+
+    yield format_sse('snapshot', await snapshot())
+    next_snapshot = time.monotonic() + SNAPSHOT_INTERVAL
+
+    client = aioredis.Redis.from_url(redis_url or settings.REDIS_URL)
+    pubsub = client.pubsub(ignore_subscribe_messages=True)
+    try:
+        try:
+            await pubsub.subscribe(*_channels(include_cameras))
+        except Exception as e:
+            logger.warning(f"Occupancy stream falling back to polling: {e}")
+            await _aclose_quietly(pubsub)
+            pubsub = None
+
+        while True:
+            message = None
+            if pubsub is not None:
+                try:
+                    message = await pubsub.get_message(timeout=KEEPALIVE_INTERVAL)
+                except (redis.RedisError, OSError) as e:
+                    logger.warning(f"Occupancy stream lost Redis, falling back to polling: {e}")
+                    await _aclose_quietly(pubsub)
+                    pubsub = None
+
+            if pubsub is not None:
+                if message is not None:
+                    yield format_sse('delta', message['data'].decode())
+                else:
+                    yield ": keepalive\n\n"
+            else:
+                await asyncio.sleep(FALLBACK_POLL_INTERVAL)
+                next_snapshot = 0
+
+            if time.monotonic() >= next_snapshot:
+                yield format_sse('snapshot', await snapshot())
+                next_snapshot = time.monotonic() + SNAPSHOT_INTERVAL
+    finally:
+        if pubsub is not None:
+            await pubsub.aclose()
+        await client.aclose()
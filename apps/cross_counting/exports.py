@@ -0,0 +1,212 @@
+"""
+CSV exports of analysis reports
+Exports are written to the default storage under a name derived from (report type, region, dates, camera-set
+version), so the same export is only ever built once and is then streamed from storage. Exports that include
+today are also keyed by a CROSS_COUNTING_REPORT_CACHE_TTL time bucket, like the report cache.
+"""
+
+import csv
+import io
+import tempfile
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files import File
+from django.core.files.storage import default_storage
+from django.utils import timezone
+
+from . import metrics
+from .caching import CAMERA_SET, namespace_version
+from .report_cache import includes_today
+
+EXPORT_DIR = 'exports/cross_counting'
+
+# Set while an export is being written, so a half-written file is never served
+_RUNNING_KEY = 'cross_counting:export:running:{}'
+_RUNNING_TIMEOUT = 60 * 30
+
+# The task queued to build an export, so that requests while it is queued or running share it, and when it was
+# queued, so that a task no worker picks up is given up on
+_TASK_KEY = 'cross_counting:export:task:{}'
+_QUEUED_KEY = 'cross_counting:export:queued:{}'
+
+
+def export_name(report_type, region_id, dates):
+    """Storage name of the export; changes when cameras change or, for today, every TTL seconds"""
+    parts = [report_type, str(region_id), *(d.isoformat() for d in dates), namespace_version(CAMERA_SET)]
+    if includes_today(dates):
+        parts.append(str(int(time.time() // settings.CROSS_COUNTING_REPORT_CACHE_TTL)))
+    return f"{EXPORT_DIR}/{'_'.join(parts)}.csv"
+
+
+def download_filename(report_type, region_name, dates):
+    if report_type == 'daily':
+        return f"daily_analysis_{region_name}_{dates[0]}.csv"
+    if report_type == 'comparative':
+        return f"comparative_analysis_{region_name}_{dates[0]}_vs_{dates[1]}.csv"
+    return f"comprehensive_analysis_{region_name}_{dates[0]}_to_{dates[1]}.csv"
+
+
+def is_ready(name):
+    return default_storage.exists(name) and cache.get(_RUNNING_KEY.format(name)) is None
+
+
+def daily_rows(region_name, dates, analysis_data):
+    (date,) = dates
+    yield ['Daily Analysis Report']
+    yield ['Region', region_name]
+    yield ['Date', date]
+    yield []
+
+    yield ['Summary']
+    yield ['Total Peak In', analysis_data['summary']['total_peak_in']]
+    yield ['Total Peak Out', analysis_data['summary']['total_peak_out']]
+    yield ['Total Peak Count', analysis_data['summary']['total_peak_total']]
+    yield ['Active Cameras', analysis_data['summary']['active_cameras']]
+    yield []
+
+    yield ['Camera-wise Peak Counts']
+    yield ['Camera Name', 'Peak In', 'Peak Out', 'Peak Total']
+    for camera in analysis_data['cameras']:
+        yield [camera['camera_name'], camera['peak_in'], camera['peak_out'], camera['peak_total']]
+
+
+def comparative_rows(region_name, dates, analysis_data):
+    base_date, compare_date = dates
+    yield ['Comparative Analysis Report']
+    yield ['Region', region_name]
+    yield ['Base Date', base_date]
+    yield ['Compare Date', compare_date]
+    yield []
+
+    yield ['Camera-wise Comparison']
+    yield ['Camera Name', 'Base In', 'Base Out', 'Base Total', 'Compare In', 'Compare Out', 'Compare Total',
+           'Diff In', 'Diff Out', 'Diff Total']
+    for camera in analysis_data['comparison']:
+        yield [
+            camera['camera_name'],
+            camera['base_in'],
+            camera['base_out'],
+            camera['base_total'],
+            camera['compare_in'],
+            camera['compare_out'],
+            camera['compare_total'],
+            camera['diff_in'],
+            camera['diff_out'],
+            camera['diff_total'],
+        ]
+
+
+def comprehensive_rows(region_name, dates, analysis_data):
+    from_date, to_date = dates
+    yield ['Comprehensive Analysis Report']
+    yield ['Region', region_name]
+    yield ['From Date', from_date]
+    yield ['To Date', to_date]
+    yield ['Total Days', analysis_data['total_days']]
+    yield []
+
+    yield ['Daily Trends by Camera']
+    for camera_trend in analysis_data['daily_trends']:
+        yield []
+        yield ['Camera', camera_trend['camera_name']]
+        yield ['Date', 'Peak In', 'Peak Out', 'Peak Total']
+        for daily_data in camera_trend['daily_data']:
+            yield [
+                daily_data['date'],
+                daily_data['peak_in_count'],
+                daily_data['peak_out_count'],
+                daily_data['peak_total_count'],
+            ]
+
+
+ROW_BUILDERS = {
+    'daily': daily_rows,
+    'comparative': comparative_rows,
+    'comprehensive': comprehensive_rows,
+}
+
+
+def load_report(report_type, region_id, dates):
+    from .utils import TablePartitioningManager
+
+    if report_type == 'daily':
+        return TablePartitioningManager.get_daily_analysis_data(region_id, *dates)
+    if report_type == 'comparative':
+        return TablePartitioningManager.get_comparative_analysis_data(region_id, *dates)
+    if report_type == 'comprehensive':
+        return TablePartitioningManager.get_comprehensive_analysis_data(region_id, *dates)
+    raise ValueError(f"Unknown report type: {report_type}")
+
+
+def queued_task(name):
+    """Id of the task queued to build export `name`, or None"""
+    return cache.get(_TASK_KEY.format(name))
+
+
+def remember_task(name, task_id):
+    cache.add(_TASK_KEY.format(name), task_id, timeout=_RUNNING_TIMEOUT)
+    cache.set(_QUEUED_KEY.format(task_id), {'name': name, 'queued_at': time.time()}, timeout=_RUNNING_TIMEOUT)
+
+
+def forget_task(name, task_id):
+    cache.delete_many([_TASK_KEY.format(name), _QUEUED_KEY.format(task_id)])
+
+
+def forget_if_lost(task_id):
+    """
+    Forget a still pending export task queued more than CROSS_COUNTING_EXPORT_QUEUE_TIMEOUT seconds ago, so the
+    next request queues a new one; returns whether it was lost. The caller checks that the task is pending.
+    """
+    queued = cache.get(_QUEUED_KEY.format(task_id))
+    if queued is None or time.time() - queued['queued_at'] < settings.CROSS_COUNTING_EXPORT_QUEUE_TIMEOUT:
+        return False
+    forget_task(queued['name'], task_id)
+    return True
+
+
+def build_export(report_type, region_id, dates):
+    """Write the export to storage unless it already exists; returns its storage name"""
+    from .models import Region
+
+    name = export_name(report_type, region_id, dates)
+    running_key = _RUNNING_KEY.format(name)
+    if default_storage.exists(name) and cache.get(running_key) is None:
+        return name
+
+    cache.set(running_key, True, timeout=_RUNNING_TIMEOUT)
+    try:
+        with metrics.EXPORT_SECONDS.labels(report_type=report_type).time():
+            region_name = Region.objects.get(pk=region_id).name
+            analysis_data = load_report(report_type, region_id, dates)
+            with tempfile.TemporaryFile() as buffer:
+                text = io.TextIOWrapper(buffer, encoding='utf-8', newline='')
+                csv.writer(text).writerows(ROW_BUILDERS[report_type](region_name, dates, analysis_data))
+                text.flush()
+                text.detach()
+                buffer.seek(0)
+                if default_storage.exists(name):
+                    default_storage.delete(name)
+                name = default_storage.save(name, File(buffer))
+    finally:
+        cache.delete(running_key)
+    return name
+
+
+def cleanup_exports(max_age=timedelta(days=7)):
+    """Delete exports older than `max_age`; superseded exports are never served again"""
+    try:
+        _, files = default_storage.listdir(EXPORT_DIR)
+    except FileNotFoundError:
+        return 0
+
+    cutoff = timezone.now() - max_age
+    deleted = 0
+    for filename in files:
+        name = f"{EXPORT_DIR}/{filename}"
+        if default_storage.get_modified_time(name) < cutoff:
+            default_storage.delete(name)
+            deleted += 1
+    return deleted
@@ -0,0 +1,317 @@
+"""
+asyncio HTTP server for camera event POSTs
+Requests are framed by Content-Length (or chunked encoding), connections are kept alive and pipelined
+requests are answered in order. Payloads are handed to a sink that never blocks the event loop.
+"""
+
+import asyncio
+import sys
+
+from django.core.management.base import OutputWrapper
+from django.utils import timezone
+
+from . import metrics
+from .parsers import PayloadError, decode_payload, parse_cc_payload
+
+MAX_HEADER_BYTES = 64 * 1024
+MAX_BODY_BYTES = 1024 * 1024
+DEFAULT_IDLE_TIMEOUT = 60
+DEFAULT_PUBLISH_QUEUE_SIZE = 10000
+
+REASONS = {
+    200: "OK",
+    400: "Bad Request",
+    408: "Request Timeout",
+    411: "Length Required",
+    413: "Payload Too Large",
+    431: "Request Header Fields Too Large",
+    500: "Internal Server Error",
+    503: "Service Unavailable",
+}
+
+
+class HTTPError(Exception):
+    def __init__(self, status):
+        super().__init__(REASONS.get(status, ""))
+        self.status = status
+
+
+class MQTTSink:
+    """
+    Publishes POST bodies to MQTT from a background task
+
+    submit() only enqueues; the publisher task drains the queue and retries failed publishes with
+    non-blocking sleeps, so a slow or disconnected broker never stalls request handling.
+    """
+
+    MAX_RETRIES = 3
+
+    def __init__(self, mqtt_client, topic, queue_size=DEFAULT_PUBLISH_QUEUE_SIZE, stdout=None, stderr=None):
+        self.mqtt_client = mqtt_client
+        self.topic = topic
+        self.queue_size = queue_size
+        self.stdout = stdout or OutputWrapper(sys.stdout)
+        self.stderr = stderr or OutputWrapper(sys.stderr)
+        self._queue = None
+        self._task = None
+
+    async def start(self):
+        self._queue = asyncio.Queue(maxsize=self.queue_size)
+        self._task = asyncio.create_task(self._publish_loop())
+
+    def submit(self, body):
+        try:
+            self._queue.put_nowait(body)
+            return True
+        except asyncio.QueueFull:
+            metrics.INGEST_DROPPED.labels(reason='publish_queue_full').inc()
+            self.stderr.write(f"Publish queue full ({self.queue_size}), rejecting payload.")
+            return False
+
+    async def close(self, timeout=10):
+        if self._queue is not None:
+            try:
+                await asyncio.wait_for(self._queue.join(), timeout)
+            except asyncio.TimeoutError:
+                self.stderr.write(f"Dropping {self._queue.qsize()} unpublished payloads on shutdown.")
+        if self._task is not None:
+            self._task.cancel()
+
+    async def _publish_loop(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            body = await self._queue.get()
+            try:
+                await self._publish(loop, body)
+            except Exception as e:
+                metrics.MQTT_PUBLISH_FAILURES.inc()
+                self.stderr.write(f"Error publishing to MQTT: {e}")
+            finally:
+                self._queue.task_done()
+
+    async def _publish(self, loop, body):
+        for attempt in range(1, self.MAX_RETRIES + 1):
+            if not self.mqtt_client.is_connected():
+                self.stdout.write("Reconnecting to MQTT broker...")
+                try:
+                    await loop.run_in_executor(None, self.mqtt_client.reconnect)
+                except Exception as e:
+                    self.stderr.write(f"Failed to reconnect to MQTT broker: {e}")
+                    await asyncio.sleep(1)
+                    continue
+
+            result = self.mqtt_client.publish(self.topic, body)
+            if result.rc == 0:
+                return True
+            self.stderr.write(f"Publish failed (Attempt {attempt}/{self.MAX_RETRIES}), Result code: {result.rc}")
+            await asyncio.sleep(1)
+
+        metrics.MQTT_PUBLISH_FAILURES.inc()
+        self.stderr.write("Exceeded maximum retries for publishing to MQTT.")
+        return False
+
+
+class DatabaseSink:
+    """
+    Parses POST bodies in-process and queues the rows on an IngestBuffer, skipping the MQTT relay
+
+    submit() is synchronous and never touches the database, so it is safe to call from the event loop
+    and from the select server alike.
+    """
+
+    def __init__(self, buffer, stdout=None, stderr=None):
+        self.buffer = buffer
+        self.stdout = stdout or OutputWrapper(sys.stdout)
+        self.stderr = stderr or OutputWrapper(sys.stderr)
+
+    async def start(self):
+        self.buffer.start()
+
+    def submit(self, body):
+        received_at = timezone.now()
+        try:
+            channel_name, rows = parse_cc_payload(decode_payload(body), warn=self.stderr.write)
+        except PayloadError as e:
+            metrics.INGEST_DROPPED.labels(reason='invalid_payload').inc()
+            self.stderr.write(str(e))
+            return True
+        except ValueError as e:
+            metrics.INGEST_DROPPED.labels(reason='invalid_payload').inc()
+            self.stderr.write(f"Failed to decode message payload: {e}")
+            return True
+        return self.buffer.submit(channel_name, rows, received_at=received_at)
+
+    async def close(self):
+        await asyncio.get_running_loop().run_in_executor(None, self.buffer.stop)
+
+
+class AsyncEventServer:
+    """HTTP/1.1 server that acknowledges every request and forwards POST bodies to `sink`"""
+
+    def __init__(self, host, port, sink, idle_timeout=DEFAULT_IDLE_TIMEOUT, verbosity=1, stdout=None, stderr=None):
+        self.host = host
+        self.port = port
+        self.sink = sink
+        self.idle_timeout = idle_timeout
+        self.verbosity = verbosity
+        self.stdout = stdout or OutputWrapper(sys.stdout)
+        self.stderr = stderr or OutputWrapper(sys.stderr)
+        self.requests_handled = 0
+
+    async def serve_forever(self):
+        await self.sink.start()
+        server = await asyncio.start_server(self._handle_connection, self.host, self.port, limit=MAX_HEADER_BYTES)
+        self.stdout.write(f"Server started on {self.host}:{self.port} (asyncio mode)")
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            await self.sink.close()
+
+    async def _handle_connection(self, reader, writer):
+        addr = writer.get_extra_info('peername')
+        if self.verbosity >= 2:
+            self.stdout.write(f"Accepted new connection from {addr}")
+
+        try:
+            while True:
+                try:
+                    request = await asyncio.wait_for(read_request(reader), timeout=self.idle_timeout)
+                except asyncio.TimeoutError:
+                    break
+                except HTTPError as e:
+                    self.stderr.write(f"Malformed HTTP message received from {addr}: {e.status} {e}")
+                    writer.write(build_response(e.status, keep_alive=False))
+                    await writer.drain()
+                    break
+
+                if request is None:
+                    break
+
+                method, path, version, headers, body = request
+                keep_alive = wants_keep_alive(version, headers)
+                status = self._dispatch(method, body, addr)
+
+                # Responses go out in request order, so pipelined requests need no extra bookkeeping
+                writer.write(build_response(status, keep_alive=keep_alive))
+                await writer.drain()
+                self.requests_handled += 1
+                if not keep_alive:
+                    break
+        except (ConnectionResetError, BrokenPipeError) as e:
+            self.stderr.write(f"Client {addr} disconnected unexpectedly: {e}")
+        except Exception as e:
+            self.stderr.write(f"Error handling client data: {e}")
+        finally:
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except Exception:
+                pass
+            if self.verbosity >= 2:
+                self.stdout.write(f"Client {addr} disconnected.")
+
+    def _dispatch(self, method, body, addr):
+        if self.verbosity >= 2:
+            self.stdout.write(f"Received {method} request from {addr}")
+
+        status = self._handle(method, body)
+        metrics.EVENT_REQUESTS.labels(method=method, status=status).inc()
+        return status
+
+    def _handle(self, method, body):
+        if method != "POST":
+            return 200
+        if not body:
+            self.stderr.write("Empty body received, skipping publish.")
+            return 200
+        metrics.INGEST_PAYLOADS.labels(source='http').inc()
+        return 200 if self.sink.submit(body) else 503
+
+
+async def read_request(reader):
+    """
+    Read one request from `reader`
+    Returns (method, path, version, headers, body) or None when the client closed the connection cleanly.
+    Header names are lower-cased; body is bytes.
+    """
+    try:
+        head = await reader.readuntil(b"\r\n\r\n")
+    except asyncio.IncompleteReadError as e:
+        if not e.partial.strip():
+            return None
+        raise HTTPError(400)
+    except asyncio.LimitOverrunError:
+        raise HTTPError(431)
+
+    try:
+        lines = head.decode('latin-1').split("\r\n")
+        method, path, version = lines[0].split()
+        headers = {}
+        for line in lines[1:]:
+            if not line:
+                continue
+            key, value = line.split(":", 1)
+            headers[key.strip().lower()] = value.strip()
+    except ValueError:
+        raise HTTPError(400)
+
+    if 'chunked' in headers.get('transfer-encoding', '').lower():
+        body = await _read_chunked(reader)
+    elif 'content-length' in headers:
+        try:
+            length = int(headers['content-length'])
+        except ValueError:
+            raise HTTPError(400)
+        if length < 0:
+            raise HTTPError(400)
+        if length > MAX_BODY_BYTES:
+            raise HTTPError(413)
+        try:
+            body = await reader.readexactly(length)
+        except asyncio.IncompleteReadError:
+            raise HTTPError(400)
+    elif method == "POST":
+        raise HTTPError(411)
+    else:
+        body = b""
+
+    return method, path, version, headers, body
+
+
+async def _read_chunked(reader):
+    chunks = []
+    size = 0
+    try:
+        while True:
+            size_line = await reader.readuntil(b"\r\n")
+            chunk_size = int(size_line.split(b";", 1)[0].strip(), 16)
+            if chunk_size == 0:
+                # Skip optional trailers up to the terminating blank line
+                while (await reader.readuntil(b"\r\n")) != b"\r\n":
+                    pass
+                return b"".join(chunks)
+            size += chunk_size
+            if size > MAX_BODY_BYTES:
+                raise HTTPError(413)
+            chunks.append(await reader.readexactly(chunk_size))
+            await reader.readexactly(2)
+    except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, ValueError):
+        raise HTTPError(400)
+
+
+def wants_keep_alive(version, headers):
+    connection = headers.get('connection', '').lower()
+    if version == "HTTP/1.0":
+        return connection == "keep-alive"
+    return connection != "close"
+
+
+def build_response(status, keep_alive=True):
+    body = b"Acknowledged" if status == 200 else REASONS.get(status, "Error").encode()
+    return (
+        f"HTTP/1.1 {status} {REASONS.get(status, 'Error')}\r\n"
+        f"Content-Length: {len(body)}\r\n"
+        f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n"
+        f"\r\n"
+    ).encode() + body
@@ -0,0 +1,315 @@
+"""
+Buffered ingestion pipeline for cross-counting payloads
+Parsed rows are queued in memory by the network thread and written in batches by a single writer thread,
+so a slow database never stalls the MQTT loop
+"""
+
+import io
+import logging
+import queue
+import sys
+import threading
+import time
+from collections import namedtuple
+from datetime import datetime
+
+from django.core.management.base import OutputWrapper
+from django.db import connection, transaction
+from django.utils import timezone
+
+from . import metrics
+from .events import OccupancyPublisher
+from .instrumentation import timed
+from .live_state import record_readings
+from .parsers import ROW_FIELDS
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BATCH_SIZE = 500
+DEFAULT_FLUSH_INTERVAL_MS = 1000
+DEFAULT_MAX_QUEUE_SIZE = 100000
+DEFAULT_CAMERA_REFRESH_SECONDS = 300
+DEFAULT_NEGATIVE_TTL_SECONDS = 60
+
+COPY_COLUMNS = ROW_FIELDS + ('camera_id', 'time', 'created_at', 'updated_at')
+_COPY_ESCAPES = str.maketrans({'\\': '\\\\', '\t': '\\t', '\n': '\\n', '\r': '\\r'})
+
+CameraInfo = namedtuple('CameraInfo', ['id', 'region_id', 'status'])
+
+
+class CameraLookupCache:
+    """
+    In-process ChannelName -> CameraInfo cache
+
+    The whole camera table is loaded at once and reloaded every `refresh_interval` seconds, or as soon as a
+    Camera is saved or deleted in this process (see signals.py). Names that are not found are remembered for
+    `negative_ttl` seconds so a misconfigured device cannot turn every message into a query.
+    """
+
+    MAX_NEGATIVE_ENTRIES = 10000
+
+    # Bumped by the Camera post_save/post_delete receivers; every cache reloads on its next lookup
+    _generation = 0
+
+    def __init__(self, refresh_interval=DEFAULT_CAMERA_REFRESH_SECONDS, negative_ttl=DEFAULT_NEGATIVE_TTL_SECONDS):
+        self.refresh_interval = refresh_interval
+        self.negative_ttl = negative_ttl
+
+        self._lock = threading.Lock()
+        self._cameras = {}
+        self._missing = {}
+        self._loaded_at = None
+        self._loaded_generation = None
+
+    @classmethod
+    def invalidate_all(cls):
+        cls._generation += 1
+
+    def get(self, name):
+        """Return the CameraInfo for `name`, or None if no such camera exists"""
+        with self._lock:
+            now = time.monotonic()
+            if self._is_stale(now):
+                self._reload(now)
+
+            info = self._cameras.get(name)
+            if info is not None:
+                return info
+
+            expires_at = self._missing.get(name)
+            if expires_at is not None and expires_at > now:
+                return None
+
+            # Not in the last snapshot: the camera may have been created since, so check once before
+            # remembering the miss
+            info = self._fetch(name)
+            if info is not None:
+                self._cameras[name] = info
+                self._missing.pop(name, None)
+                return info
+
+            if len(self._missing) >= self.MAX_NEGATIVE_ENTRIES:
+                self._missing = {key: value for key, value in self._missing.items() if value > now}
+            self._missing[name] = now + self.negative_ttl
+            return None
+
+    def _is_stale(self, now):
+        return (
+            self._loaded_at is None
+            or self._loaded_generation != CameraLookupCache._generation
+            or now - self._loaded_at >= self.refresh_interval
+        )
+
+    def _reload(self, now):
+        from .models import Camera
+
+        self._loaded_generation = CameraLookupCache._generation
+        self._cameras = {
+            name: CameraInfo(camera_id, region_id, status)
+            for name, camera_id, region_id, status in Camera.objects.values_list('name', 'id', 'region_id', 'status')
+        }
+        self._missing = {}
+        self._loaded_at = now
+
+    @staticmethod
+    def _fetch(name):
+        from .models import Camera
+
+        row = Camera.objects.filter(name=name).values_list('id', 'region_id', 'status').first()
+        return CameraInfo(*row) if row else None
+
+
+class IngestBuffer:
+    """
+    In-memory queue in front of CrossCountingData
+
+    submit() is cheap and thread-safe. The writer thread flushes every `batch_size` rows or every
+    `flush_interval_ms` milliseconds, whichever comes first, with one COPY (bulk_create on non-PostgreSQL
+    databases or with use_copy=False) per flush, one live state update (see live_state.py) and one
+    last_data_received update for all cameras seen in that flush. Live state changes are published to
+    `publisher` after the transaction commits.
+    """
+
+    def __init__(self, batch_size=DEFAULT_BATCH_SIZE, flush_interval_ms=DEFAULT_FLUSH_INTERVAL_MS,
+                 max_queue_size=DEFAULT_MAX_QUEUE_SIZE, camera_cache=None, use_copy=True, publisher=None,
+                 stdout=None, stderr=None):
+        self.batch_size = max(1, batch_size)
+        self.use_copy = use_copy
+        self.publisher = publisher or OccupancyPublisher()
+        self.flush_interval = max(1, flush_interval_ms) / 1000.0
+        self.camera_cache = camera_cache or CameraLookupCache()
+        self.stdout = stdout or OutputWrapper(sys.stdout)
+        self.stderr = stderr or OutputWrapper(sys.stderr)
+
+        self._queue = queue.Queue(maxsize=max_queue_size)
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+        metrics.INGEST_QUEUE_DEPTH.set_function(self.qsize)
+        self._thread = threading.Thread(target=self._run, name="cc-ingest-writer", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=30):
+        """Stop the writer thread after flushing everything already queued"""
+        self._stop_event.set()
+        if self._thread:
+            self._thread.join(timeout)
+
+    def submit(self, channel_name, rows, received_at=None):
+        """
+        Queue the rows parsed from one payload. `rows` is a list of tuples in parsers.ROW_FIELDS order;
+        it may be empty, in which case the camera is still marked as seen.
+        Returns False if the queue is full and the payload was dropped.
+        """
+        try:
+            self._queue.put_nowait((channel_name, received_at or timezone.now(), rows))
+            return True
+        except queue.Full:
+            metrics.INGEST_DROPPED.labels(reason='queue_full').inc()
+            self.stderr.write(f"Ingest queue full ({self._queue.maxsize}), dropping payload for {channel_name}.")
+            return False
+
+    def qsize(self):
+        return self._queue.qsize()
+
+    def _run(self):
+        pending = []
+        pending_rows = 0
+        deadline = time.monotonic() + self.flush_interval
+
+        try:
+            while True:
+                timeout = max(0.0, deadline - time.monotonic())
+                try:
+                    item = self._queue.get(timeout=timeout)
+                    pending.append(item)
+                    pending_rows += len(item[2])
+                except queue.Empty:
+                    pass
+
+                stopping = self._stop_event.is_set() and self._queue.empty()
+                if pending and (pending_rows >= self.batch_size or time.monotonic() >= deadline or stopping):
+                    try:
+                        self.flush(pending)
+                    except Exception as e:
+                        # Losing one batch is better than losing the writer thread while submit() keeps queueing
+                        metrics.INGEST_WRITE_ERRORS.inc()
+                        self.stderr.write(f"Dropped a batch of {len(pending)} payloads, Error: {e}")
+                        connection.close()
+                    pending = []
+                    pending_rows = 0
+
+                if time.monotonic() >= deadline:
+                    deadline = time.monotonic() + self.flush_interval
+
+                if stopping:
+                    break
+        finally:
+            connection.close()
+
+    def flush(self, items):
+        """Write one batch of queued payloads"""
+        started = time.monotonic()
+
+        records = []
+        seen_camera_ids = set()
+        region_ids = set()
+        try:
+            # The lookup may hit the database too, so it fails and retries like the write
+            for channel_name, received_at, rows in items:
+                camera = self.camera_cache.get(channel_name)
+                if camera is None:
+                    metrics.INGEST_DROPPED.labels(reason='unknown_camera').inc()
+                    self.stdout.write(f"Camera object not found for ChannelName: {channel_name}. Discarding alert.")
+                    continue
+                seen_camera_ids.add(camera.id)
+                if rows and camera.region_id is not None:
+                    region_ids.add(camera.region_id)
+                records.extend((camera.id, received_at, row) for row in rows)
+
+            with timed("ingest write", logger) as stage, metrics.INGEST_WRITE_SECONDS.time():
+                camera_states, region_states = self._write(records, seen_camera_ids, region_ids)
+                stage.rows = len(records)
+                stage.count(cameras=len(seen_camera_ids), regions=len(region_ids))
+        except Exception as e:
+            metrics.INGEST_WRITE_ERRORS.inc()
+            self.stderr.write(f"Failed to flush {len(records)} Cross Counting rows, Error: {e}")
+            connection.close()
+            if len(items) > 1:
+                # One malformed payload should not cost the whole batch
+                for item in items:
+                    self.flush([item])
+            return
+
+        metrics.INGEST_ROWS.inc(len(records))
+        metrics.INGEST_BATCH_ROWS.observe(len(records))
+        self.publisher.publish(camera_states, region_states)
+
+        elapsed_ms = (time.monotonic() - started) * 1000
+        self.stdout.write(
+            f"Flushed {len(records)} Cross Counting rows for {len(seen_camera_ids)} cameras "
+            f"in {elapsed_ms:.1f} ms (queue: {self.qsize()})"
+        )
+
+    def _write(self, records, camera_ids, region_ids):
+        """Insert `records` and update live state in one transaction; returns the new live states"""
+        from .models import Camera
+
+        camera_states, region_states = [], []
+        with transaction.atomic():
+            if records:
+                if self.use_copy and connection.vendor == 'postgresql':
+                    self._copy_records(records)
+                else:
+                    self._bulk_create_records(records)
+                camera_states, region_states = record_readings(records, region_ids)
+            if camera_ids:
+                Camera.objects.filter(id__in=camera_ids).update(last_data_received=timezone.now())
+        return camera_states, region_states
+
+    @staticmethod
+    def _copy_records(records):
+        """COPY rows into the hypertable; created_at and time are the receive time, as with save()"""
+        from .models import CrossCountingData
+
+        lines = []
+        for camera_id, received_at, row in records:
+            values = row + (camera_id, received_at, received_at, received_at)
+            lines.append("\t".join(_copy_value(value) for value in values))
+        buffer = io.StringIO("\n".join(lines) + "\n")
+
+        with connection.cursor() as cursor:
+            cursor.copy_expert(
+                f"COPY {CrossCountingData._meta.db_table} ({', '.join(COPY_COLUMNS)}) FROM STDIN",
+                buffer,
+            )
+
+    def _bulk_create_records(self, records):
+        from .models import CrossCountingData
+
+        objects = [
+            # bulk_create bypasses CrossCountingData.save(), so the hypertable time column is set here
+            CrossCountingData(camera_id=camera_id, time=received_at, created_at=received_at,
+                              **dict(zip(ROW_FIELDS, row)))
+            for camera_id, received_at, row in records
+        ]
+        CrossCountingData.objects.bulk_create(objects, batch_size=self.batch_size)
+
+
+def _copy_value(value):
+    """Format one value for COPY ... FROM STDIN text format"""
+    if value is None:
+        return "\\N"
+    if isinstance(value, bool):
+        return "t" if value else "f"
+    if isinstance(value, datetime):
+        if timezone.is_naive(value):
+            value = timezone.make_aware(value)
+        return value.isoformat()
+    if isinstance(value, str):
+        return value.translate(_COPY_ESCAPES)
+    return str(value)
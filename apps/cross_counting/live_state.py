@@ -0,0 +1,181 @@
+"""
+Live occupancy state
+The ingest writer upserts each camera's latest reading into CameraLiveState and re-sums the affected
+regions into RegionLiveState in the same transaction, so occupancy reads cost O(regions) no matter how
+large the hypertable gets
+"""
+
+from datetime import timedelta
+
+from django.db import connection
+from django.utils import timezone
+
+from .parsers import ROW_FIELDS
+
+# Readings older than this do not count towards current occupancy
+LIVE_WINDOW = timedelta(minutes=5)
+
+_IN = ROW_FIELDS.index('cc_in_count')
+_OUT = ROW_FIELDS.index('cc_out_count')
+_TOTAL = ROW_FIELDS.index('cc_total_count')
+
+
+def latest_readings(records):
+    """Reduce (camera_id, received_at, row) records to {camera_id: (received_at, row)} for the newest row"""
+    latest = {}
+    for camera_id, received_at, row in records:
+        current = latest.get(camera_id)
+        if current is None or received_at >= current[0]:
+            latest[camera_id] = (received_at, row)
+    return latest
+
+
+def occupancy_percentage(current_count, max_occupancy):
+    return round(current_count / max_occupancy * 100, 1) if max_occupancy > 0 else 0.0
+
+
+def record_readings(records, region_ids):
+    """
+    Upsert camera live state for `records` and re-sum `region_ids`; call inside the writer's transaction
+    Returns (camera_states, region_states) for publishing once the transaction has committed. A reading
+    older than the stored one (from a writer that committed later) is ignored and not published.
+    """
+    latest = latest_readings(records)
+    applied = set()
+    if latest:
+        with connection.cursor() as cursor:
+            cursor.execute("""
+                INSERT INTO cross_counting_camera_live_state
+                    (camera_id, cc_in_count, cc_out_count, cc_total_count, reading_at)
+                SELECT * FROM unnest(%s::uuid[], %s::integer[], %s::integer[], %s::integer[], %s::timestamptz[])
+                ON CONFLICT (camera_id) DO UPDATE
+                    SET cc_in_count = EXCLUDED.cc_in_count,
+                        cc_out_count = EXCLUDED.cc_out_count,
+                        cc_total_count = EXCLUDED.cc_total_count,
+                        reading_at = EXCLUDED.reading_at
+                    WHERE EXCLUDED.reading_at >= cross_counting_camera_live_state.reading_at
+                RETURNING camera_id
+            """, [
+                [str(camera_id) for camera_id in latest],
+                [row[_IN] for _, row in latest.values()],
+                [row[_OUT] for _, row in latest.values()],
+                [row[_TOTAL] for _, row in latest.values()],
+                [received_at for received_at, _ in latest.values()],
+            ])
+            applied = {str(camera_id) for (camera_id,) in cursor.fetchall()}
+
+    camera_states = [
+        {
+            'camera_id': str(camera_id),
+            'cc_in_count': row[_IN],
+            'cc_out_count': row[_OUT],
+            'cc_total_count': row[_TOTAL],
+            'current_occupancy': max(0, row[_IN] - row[_OUT]),
+            'reading_at': received_at.isoformat(),
+        }
+        for camera_id, (received_at, row) in latest.items()
+        if str(camera_id) in applied
+    ]
+    region_states = recompute_regions(region_ids) if region_ids else []
+    return camera_states, region_states
+
+
+def recompute_regions(region_ids=None):
+    """
+    Re-sum RegionLiveState for `region_ids` (all regions when None) from fresh camera live state
+    Returns the new state of each region
+    """
+    region_filter = "" if region_ids is None else "WHERE r.id = ANY (%s)"
+    params = [timezone.now() - LIVE_WINDOW] + ([] if region_ids is None else [list(region_ids)])
+
+    with connection.cursor() as cursor:
+        cursor.execute(f"""
+            WITH upserted AS (
+            INSERT INTO cross_counting_region_live_state
+                (region_id, current_count, total_in_count, total_out_count, active_cameras, oldest_reading_at,
+                 updated_at)
+            SELECT r.id,
+                   COALESCE(SUM(GREATEST(0, s.cc_in_count - s.cc_out_count)), 0),
+                   COALESCE(SUM(s.cc_in_count), 0),
+                   COALESCE(SUM(s.cc_out_count), 0),
+                   COUNT(s.camera_id),
+                   MIN(s.reading_at),
+                   now()
+            FROM cross_counting_region r
+            LEFT JOIN cross_counting_camera c ON c.region_id = r.id AND c.status = true
+            LEFT JOIN cross_counting_camera_live_state s ON s.camera_id = c.id AND s.reading_at >= %s
+            {region_filter}
+            GROUP BY r.id
+            ON CONFLICT (region_id) DO UPDATE
+                SET current_count = EXCLUDED.current_count,
+                    total_in_count = EXCLUDED.total_in_count,
+                    total_out_count = EXCLUDED.total_out_count,
+                    active_cameras = EXCLUDED.active_cameras,
+                    oldest_reading_at = EXCLUDED.oldest_reading_at,
+                    updated_at = EXCLUDED.updated_at
+            RETURNING region_id, current_count, total_in_count, total_out_count, active_cameras
+            )
+            SELECT u.region_id, u.current_count, u.total_in_count, u.total_out_count, u.active_cameras, r.occupancy
+            FROM upserted u
+            JOIN cross_counting_region r ON r.id = u.region_id
+        """, params)
+        rows = cursor.fetchall()
+
+    return [
+        {
+            'region_id': region_id,
+            'current_count': current_count,
+            'total_in_count': total_in,
+            'total_out_count': total_out,
+            'active_cameras': active_cameras,
+            'max_occupancy': max_occupancy,
+            'occupancy_percentage': occupancy_percentage(current_count, max_occupancy),
+        }
+        for region_id, current_count, total_in, total_out, active_cameras, max_occupancy in rows
+    ]
+
+
+def get_region_states():
+    """
+    Return [{region_id, region_name, max_occupancy, current_count, ...}] ordered by region name
+    Regions whose sum includes a reading that has aged out of LIVE_WINDOW (or that have no state yet) are
+    re-summed first, so the result matches a query over the last LIVE_WINDOW of raw rows
+    """
+    from .models import Region
+
+    rows = _read_region_states(Region)
+    stale = [row['region_id'] for row in rows if _is_stale(row)]
+    if stale:
+        recompute_regions(stale)
+        rows = _read_region_states(Region)
+    return rows
+
+
+def _read_region_states(region_model):
+    return [
+        {
+            'region_id': region_id,
+            'region_name': name,
+            'max_occupancy': occupancy,
+            'current_count': current_count or 0,
+            'total_in_count': total_in or 0,
+            'total_out_count': total_out or 0,
+            'active_cameras': active_cameras or 0,
+            'oldest_reading_at': oldest_reading_at,
+            'occupancy_percentage': occupancy_percentage(current_count or 0, occupancy),
+            'has_state': updated_at is not None,
+        }
+        for region_id, name, occupancy, current_count, total_in, total_out, active_cameras, oldest_reading_at,
+        updated_at in region_model.objects.values_list(
+            'id', 'name', 'occupancy', 'live_state__current_count', 'live_state__total_in_count',
+            'live_state__total_out_count', 'live_state__active_cameras', 'live_state__oldest_reading_at',
+            'live_state__updated_at',
+        ).order_by('name')
+    ]
+
+
+def _is_stale(row, now=None):
+    if not row['has_state']:
+        return True
+    oldest = row['oldest_reading_at']
+    return oldest is not None and oldest < (now or timezone.now()) - LIVE_WINDOW
@@ -0,0 +1,185 @@
+import json
+import statistics
+import time
+from datetime import date, datetime, time as dt_time, timedelta
+
+import numpy as np
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.utils import timezone
+
+from apps.cross_counting.ingest import IngestBuffer
+from apps.cross_counting.models import Region
+from apps.cross_counting.synthetic import camera_day_records
+from apps.cross_counting.utils import OccupancyAnalyzer, TablePartitioningManager
+
+NO_CACHE = {'default': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}}
+
+
+class Command(BaseCommand):
+    help = "Time the analysis queries, occupancy reads and ingest writes, e.g. over generate_synthetic_data output"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--region',
+            type=str,
+            default='Synthetic Region 1',
+            help="Name of the region to analyse (default: Synthetic Region 1)."
+        )
+        parser.add_argument(
+            '--date',
+            type=str,
+            default=None,
+            help="Day to analyse, YYYY-MM-DD; comparisons use the day before and ranges the week up to it "
+                 "(default: yesterday)."
+        )
+        parser.add_argument(
+            '--iterations',
+            type=int,
+            default=5,
+            help="Runs per measurement (default: 5)."
+        )
+        parser.add_argument(
+            '--ingest-rows',
+            type=int,
+            default=5000,
+            help="Rows per measured ingest batch; the batch is rolled back (default: 5000, 0 to skip)."
+        )
+        parser.add_argument(
+            '--warm',
+            action='store_true',
+            help="Measure through the configured cache instead of computing every run from the database."
+        )
+        parser.add_argument(
+            '--json-out',
+            type=str,
+            default=None,
+            help="Write the results to this file, e.g. to use as a later --baseline."
+        )
+        parser.add_argument(
+            '--baseline',
+            type=str,
+            default=None,
+            help="Results file of an earlier run; fail when a median is slower by more than --tolerance."
+        )
+        parser.add_argument(
+            '--tolerance',
+            type=float,
+            default=0.2,
+            help="Allowed slowdown against --baseline as a fraction (default: 0.2)."
+        )
+
+    def handle(self, *args, **options):
+        try:
+            region = Region.objects.get(name=options['region'])
+        except Region.DoesNotExist:
+            raise CommandError(f"Region {options['region']!r} not found; run generate_synthetic_data first")
+        if options['date']:
+            try:
+                day = date.fromisoformat(options['date'])
+            except ValueError:
+                raise CommandError("--date must be YYYY-MM-DD")
+        else:
+            day = timezone.localdate() - timedelta(days=1)
+
+        baseline = None
+        if options['baseline']:
+            try:
+                with open(options['baseline']) as f:
+                    baseline = json.load(f)
+            except (OSError, ValueError) as e:
+                raise CommandError(f"Cannot read baseline: {e}")
+
+        iterations = max(1, options['iterations'])
+        day_start = timezone.make_aware(datetime.combine(day, dt_time.min))
+        benchmarks = [
+            ("daily analysis", lambda: TablePartitioningManager.get_daily_analysis_data(region.id, day)),
+            ("comparative analysis", lambda: TablePartitioningManager.get_comparative_analysis_data(
+                region.id, day - timedelta(days=1), day)),
+            ("comprehensive analysis (7 days)", lambda: TablePartitioningManager.get_comprehensive_analysis_data(
+                region.id, day - timedelta(days=6), day)),
+            ("hourly region aggregates", lambda: TablePartitioningManager.get_hourly_region_aggregates(
+                region.id, day_start, day_start + timedelta(days=1))),
+            ("current occupancy", TablePartitioningManager.get_current_occupancy_data),
+            ("dashboard statistics", TablePartitioningManager.get_dashboard_statistics),
+            ("enhanced dashboard", TablePartitioningManager.get_enhanced_dashboard_data),
+            ("real-time occupancy", lambda: OccupancyAnalyzer.get_real_time_occupancy(region.id)),
+        ]
+        if options['ingest_rows'] > 0:
+            benchmarks.append((f"ingest write ({options['ingest_rows']} rows)",
+                               self._ingest_write(region, options['ingest_rows'])))
+
+        self.stdout.write(f"Region {region.name}, {day}, {iterations} iterations, "
+                          f"{'warm' if options['warm'] else 'cold'} cache")
+        results = {}
+        with override_settings(**({} if options['warm'] else {'CACHES': NO_CACHE})):
+            for label, fn in benchmarks:
+                results[label] = self._measure(fn, iterations)
+                self._report(label, results[label])
+
+        if options['json_out']:
+            with open(options['json_out'], 'w') as f:
+                json.dump(results, f, indent=2)
+            self.stdout.write(f"Results written to {options['json_out']}")
+
+        if baseline is not None:
+            self._compare(results, baseline, options['tolerance'])
+
+    @staticmethod
+    def _ingest_write(region, row_count):
+        """A write of `row_count` synthetic rows spread over the region's cameras, rolled back afterwards"""
+        cameras = list(region.cameras.values_list('id', 'name'))
+        if not cameras:
+            raise CommandError(f"Region {region.name!r} has no cameras")
+        rows_per_camera = max(1, row_count // len(cameras))
+        cadence = max(1, 86400 // rows_per_camera)
+        rng = np.random.default_rng(0)
+        records = []
+        for camera_id, name in cameras:
+            records.extend(camera_day_records(camera_id, name, '10.255.0.1', timezone.localdate(), cadence,
+                                              rng)[:rows_per_camera])
+        camera_ids = {camera_id for camera_id, _ in cameras}
+        buffer = IngestBuffer()
+
+        def write():
+            with transaction.atomic():
+                buffer._write(records, camera_ids, {region.id})
+                transaction.set_rollback(True)
+
+        return write
+
+    @staticmethod
+    def _measure(fn, iterations):
+        timings = []
+        for _ in range(iterations):
+            with CaptureQueriesContext(connection) as queries:
+                started = time.perf_counter()
+                fn()
+                timings.append((time.perf_counter() - started) * 1000)
+        return {
+            'min_ms': round(min(timings), 3),
+            'median_ms': round(statistics.median(timings), 3),
+            'max_ms': round(max(timings), 3),
+            'queries': len(queries),
+        }
+
+    def _report(self, label, result):
+        self.stdout.write(
+            f"  {label:<36} min {result['min_ms']:9.1f} ms  median {result['median_ms']:9.1f} ms  "
+            f"max {result['max_ms']:9.1f} ms  {result['queries']:4d} queries"
+        )
+
+    def _compare(self, results, baseline, tolerance):
+        regressions = []
+        for label, result in results.items():
+            previous = baseline.get(label)
+            if previous is None:
+                continue
+            if result['median_ms'] > previous['median_ms'] * (1 + tolerance):
+                regressions.append(
+                    f"{label}: median {result['median_ms']:.1f} ms, baseline {previous['median_ms']:.1f} ms"
+                )
+        if regressions:
+            raise CommandError(f"Slower than baseline by more than {tolerance:.0%}:\n" + "\n".join(regressions))
+        self.stdout.write(self.style.SUCCESS(f"Within {tolerance:.0%} of the baseline"))
@@ -0,0 +1,78 @@
+import json
+import time
+from pathlib import Path
+
+from dateutil.parser import parse
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.cross_counting import parsers
+
+DEFAULT_CORPUS = Path(settings.BASE_DIR) / 'docs' / 'cc_payload_corpus.jsonl'
+
+
+class Command(BaseCommand):
+    help = "Measure per-message parsing cost over a corpus of recorded cc payloads"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--corpus',
+            type=str,
+            default=str(DEFAULT_CORPUS),
+            help="File with one raw payload per line, e.g. recorded with mqtt_consumer --record-to "
+                 "(default: docs/cc_payload_corpus.jsonl)."
+        )
+        parser.add_argument(
+            '--iterations',
+            type=int,
+            default=20,
+            help="Passes over the corpus per measurement (default: 20)."
+        )
+
+    def handle(self, *args, **options):
+        try:
+            with open(options['corpus'], 'rb') as f:
+                corpus = [line.strip() for line in f if line.strip()]
+        except OSError as e:
+            raise CommandError(f"Cannot read corpus: {e}")
+        if not corpus:
+            raise CommandError("Corpus is empty")
+
+        iterations = max(1, options['iterations'])
+        payloads = [json.loads(raw) for raw in corpus]
+        alarm_times = [
+            alarm["time"]
+            for payload in payloads
+            for alarm in payload.get("data", {}).get("alarm_list", [])
+            if alarm.get("time")
+        ]
+
+        self.stdout.write(f"{len(corpus)} payloads, {len(alarm_times)} alarm timestamps, {iterations} iterations")
+        self.stdout.write(f"JSON backend: {'orjson' if parsers.orjson is not None else 'json'}")
+
+        self._report("decode (json)", len(corpus), iterations, lambda: [json.loads(raw) for raw in corpus])
+        self._report("decode (decode_payload)", len(corpus), iterations,
+                     lambda: [parsers.decode_payload(raw) for raw in corpus])
+        if alarm_times:
+            self._report("alarm time (dateutil)", len(alarm_times), iterations,
+                         lambda: [parse(value) for value in alarm_times])
+            self._report("alarm time (parse_alarm_time)", len(alarm_times), iterations,
+                         lambda: [parsers.parse_alarm_time(value) for value in alarm_times])
+        self._report("full parse (decode + parse_cc_payload)", len(corpus), iterations,
+                     lambda: [self._parse(raw) for raw in corpus])
+
+    @staticmethod
+    def _parse(raw):
+        try:
+            return parsers.parse_cc_payload(parsers.decode_payload(raw))
+        except ValueError:
+            return None
+
+    def _report(self, label, count, iterations, fn):
+        best = None
+        for _ in range(iterations):
+            started = time.perf_counter()
+            fn()
+            elapsed = time.perf_counter() - started
+            best = elapsed if best is None else min(best, elapsed)
+        self.stdout.write(f"  {label:<40} {best / count * 1e6:8.2f} us/item")
@@ -1,3 +1,4 @@
+import asyncio
 import socket
 import select
 import json
@@ -5,10 +6,15 @@ from urllib.parse import urlparse, parse_qs
 import time
 import paho.mqtt.client as mqtt
 from django.core.management.base import BaseCommand
+from apps.cross_counting import metrics
+from apps.cross_counting.http_server import (
+    AsyncEventServer, MQTTSink, DatabaseSink, DEFAULT_IDLE_TIMEOUT, DEFAULT_PUBLISH_QUEUE_SIZE, build_response,
+)
+from apps.cross_counting.ingest import IngestBuffer, DEFAULT_BATCH_SIZE, DEFAULT_FLUSH_INTERVAL_MS
 
 
 class Command(BaseCommand):
-    help = "Start a TCP server to handle HTTP requests and publish to MQTT"
+    help = "Start a TCP server to handle HTTP requests and publish to MQTT (or write straight to the database)"
 
     def add_arguments(self, parser):
         try:
@@ -28,10 +34,71 @@ class Command(BaseCommand):
             default=4000,
             help="Port number for the TCP server (default: 4000)."
         )
+        parser.add_argument(
+            '--mode',
+            choices=['select', 'asyncio'],
+            default='select',
+            help="Server implementation: the original select loop, or the asyncio server with Content-Length "
+                 "framing, keep-alive and a non-blocking MQTT publish queue (default: select)."
+        )
+        parser.add_argument(
+            '--idle-timeout',
+            type=int,
+            default=DEFAULT_IDLE_TIMEOUT,
+            help=f"asyncio mode: close keep-alive connections idle for N seconds (default: {DEFAULT_IDLE_TIMEOUT})."
+        )
+        parser.add_argument(
+            '--publish-queue-size',
+            type=int,
+            default=DEFAULT_PUBLISH_QUEUE_SIZE,
+            help=f"asyncio mode: answer 503 once this many payloads are waiting to be published "
+                 f"(default: {DEFAULT_PUBLISH_QUEUE_SIZE})."
+        )
+        parser.add_argument(
+            '--sink',
+            choices=['mqtt', 'db'],
+            default='mqtt',
+            help="Where POST bodies go: relay to the MQTT broker, or parse them here and write batches "
+                 "straight into cross_counting_data_timeseries (default: mqtt)."
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=DEFAULT_BATCH_SIZE,
+            help=f"db sink: flush buffered rows once this many are queued (default: {DEFAULT_BATCH_SIZE})."
+        )
+        parser.add_argument(
+            '--flush-interval',
+            type=int,
+            default=DEFAULT_FLUSH_INTERVAL_MS,
+            help=f"db sink: flush buffered rows at least every N milliseconds (default: {DEFAULT_FLUSH_INTERVAL_MS})."
+        )
+        parser.add_argument(
+            '--writer',
+            choices=['copy', 'bulk_create'],
+            default='copy',
+            help="db sink: write batches with COPY (default) or bulk_create."
+        )
+        parser.add_argument(
+            '--metrics-port',
+            type=int,
+            default=None,
+            help="Serve Prometheus metrics on this port."
+        )
 
     def handle(self, *args, **options):
         host = options['host']
         port = options['port']
+        mode = options['mode']
+        metrics.serve(options['metrics_port'])
+        db_sink = None
+        if options['sink'] == 'db':
+            db_sink = DatabaseSink(
+                IngestBuffer(batch_size=options['batch_size'], flush_interval_ms=options['flush_interval'],
+                             use_copy=options['writer'] == 'copy', stdout=self.stdout, stderr=self.stderr),
+                stdout=self.stdout,
+                stderr=self.stderr,
+            )
 
         # MQTT_BROKER = "mqtt.geniusvision.in"
         MQTT_BROKER = "0.0.0.0"
@@ -60,6 +127,7 @@ class Command(BaseCommand):
                     return True
                 self.stderr.write(f"Publish failed (Attempt {attempt}/{MAX_RETRIES}), Result code: {result.rc}")
                 time.sleep(1)
+            metrics.MQTT_PUBLISH_FAILURES.inc()
             self.stderr.write("Exceeded maximum retries for publishing to MQTT.")
             return False
 
@@ -84,21 +152,33 @@ class Command(BaseCommand):
                 return None, None, None, None
 
         def handle_request(method, path, headers, body, addr, mqtt_client):
+            """Handle one request; returns the HTTP status of the outcome"""
             self.stdout.write(f"Received {method} request from {addr}")
 
-            if method == "POST":
-                self.stdout.write(f"Body: {body}")
-                if not body:
-                    self.stderr.write("Empty body received, skipping publish.")
-                    return
+            if method != "POST":
+                return 200
+            self.stdout.write(f"Body: {body}")
+            if not body:
+                self.stderr.write("Empty body received, skipping publish.")
+                return 200
+            metrics.INGEST_PAYLOADS.labels(source='http').inc()
 
-                try:
-                    if not safe_publish(mqtt_client, MQTT_TOPIC, body):
-                        self.stderr.write("Failed to publish payload to MQTT after retries.")
-                except Exception as e:
-                    self.stderr.write(f"Error publishing to MQTT: {e}")
+            if db_sink:
+                if not db_sink.submit(body):
+                    self.stderr.write("Ingest queue full, payload dropped.")
+                    return 503
+                return 200
 
-        def start_server():
+            try:
+                if not safe_publish(mqtt_client, MQTT_TOPIC, body):
+                    self.stderr.write("Failed to publish payload to MQTT after retries.")
+                    return 503
+            except Exception as e:
+                self.stderr.write(f"Error publishing to MQTT: {e}")
+                return 500
+            return 200
+
+        def connect_mqtt():
             nonlocal mqtt_client  # allow access to outer scope
             mqtt_client = mqtt.Client(protocol=mqtt.MQTTv311)
             mqtt_client.enable_logger()
@@ -107,8 +187,27 @@ class Command(BaseCommand):
                 mqtt_client.connect(MQTT_BROKER, MQTT_PORT)
                 mqtt_client.loop_start()
                 self.stdout.write(f"Connected to MQTT broker at {MQTT_BROKER}:{MQTT_PORT}")
+                return True
             except Exception as e:
                 self.stderr.write(f"Failed to connect to MQTT broker: {e}")
+                return False
+
+        def start_async_server():
+            if db_sink:
+                sink = db_sink
+            else:
+                if not connect_mqtt():
+                    return
+                sink = MQTTSink(mqtt_client, MQTT_TOPIC, queue_size=options['publish_queue_size'],
+                                stdout=self.stdout, stderr=self.stderr)
+            server = AsyncEventServer(host, port, sink, idle_timeout=options['idle_timeout'],
+                                      verbosity=options['verbosity'], stdout=self.stdout, stderr=self.stderr)
+            asyncio.run(server.serve_forever())
+
+        def start_server():
+            if db_sink:
+                db_sink.buffer.start()
+            elif not connect_mqtt():
                 return
 
             server_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
@@ -147,12 +246,18 @@ class Command(BaseCommand):
                             full_message = b"".join(buffer).decode()
                             method, path, headers, body = parse_http_message(full_message)
 
+                            status = 200
                             if method and path:
-                                handle_request(method, path, headers, body, clients[notified_socket], mqtt_client)
+                                status = handle_request(method, path, headers, body, clients[notified_socket],
+                                                        mqtt_client)
+                                metrics.EVENT_REQUESTS.labels(method=method, status=status).inc()
                             else:
                                 self.stderr.write("Malformed HTTP message received.")
 
-                            notified_socket.sendall(b"HTTP/1.1 200 OK\r\nContent-Length: 12\r\n\r\nAcknowledged")
+                            if status == 200:
+                                notified_socket.sendall(b"HTTP/1.1 200 OK\r\nContent-Length: 12\r\n\r\nAcknowledged")
+                            else:
+                                notified_socket.sendall(build_response(status))
 
                         except ConnectionResetError as e:
                             self.stderr.write(f"Client {clients.get(notified_socket)} disconnected unexpectedly: {e}")
@@ -173,7 +278,10 @@ class Command(BaseCommand):
                         del clients[notified_socket]
 
         try:
-            start_server()
+            if mode == 'asyncio':
+                start_async_server()
+            else:
+                start_server()
         except KeyboardInterrupt:
             self.stdout.write("\nServer shutting down gracefully.")
         except Exception as e:
@@ -183,3 +291,5 @@ class Command(BaseCommand):
                 client.close()
             if mqtt_client:
                 mqtt_client.disconnect()
+            if db_sink:
+                db_sink.buffer.stop()
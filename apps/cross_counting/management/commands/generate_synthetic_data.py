@@ -0,0 +1,145 @@
+import time
+from datetime import date, timedelta
+
+import numpy as np
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.utils import timezone
+
+from apps.cross_counting.ingest import IngestBuffer
+from apps.cross_counting.models import Camera, CrossCountingData, Region
+from apps.cross_counting.report_cache import invalidate_reports
+from apps.cross_counting.synthetic import DEFAULT_CADENCE_SECONDS, camera_day_records
+from apps.cross_counting.utils import CrossCountingAnalytics
+
+REGION_PREFIX = 'Synthetic Region'
+CAMERA_PREFIX = 'SYN-'
+
+
+class Command(BaseCommand):
+    help = "Fill the hypertable with synthetic readings: N regions x M cameras x D days at a fixed cadence"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--regions',
+            type=int,
+            default=2,
+            help="Synthetic regions to create (default: 2)."
+        )
+        parser.add_argument(
+            '--cameras',
+            type=int,
+            default=4,
+            help="Cameras per region (default: 4)."
+        )
+        parser.add_argument(
+            '--days',
+            type=int,
+            default=7,
+            help="Whole days of readings per camera, ending with --end-date (default: 7)."
+        )
+        parser.add_argument(
+            '--end-date',
+            type=str,
+            default=None,
+            help="Last generated day, YYYY-MM-DD (default: yesterday)."
+        )
+        parser.add_argument(
+            '--cadence',
+            type=int,
+            default=DEFAULT_CADENCE_SECONDS,
+            help=f"Seconds between readings of one camera (default: {DEFAULT_CADENCE_SECONDS})."
+        )
+        parser.add_argument(
+            '--scale',
+            type=float,
+            default=1.0,
+            help="Multiplier on the hourly arrival profile (default: 1.0)."
+        )
+        parser.add_argument(
+            '--seed',
+            type=int,
+            default=None,
+            help="Random seed, for reproducible data."
+        )
+        parser.add_argument(
+            '--clear',
+            action='store_true',
+            help="Delete existing synthetic regions, cameras and their readings first."
+        )
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'postgresql':
+            raise CommandError("Synthetic data is written with COPY and needs the PostgreSQL database")
+        if min(options['regions'], options['cameras'], options['days'], options['cadence']) < 1:
+            raise CommandError("--regions, --cameras, --days and --cadence must be at least 1")
+
+        if options['end_date']:
+            try:
+                end_date = date.fromisoformat(options['end_date'])
+            except ValueError:
+                raise CommandError("--end-date must be YYYY-MM-DD")
+        else:
+            end_date = timezone.localdate() - timedelta(days=1)
+        days = [end_date - timedelta(days=offset) for offset in range(options['days'] - 1, -1, -1)]
+
+        if options['clear']:
+            self._clear()
+
+        cameras = self._create_cameras(options['regions'], options['cameras'])
+        rng = np.random.default_rng(options['seed'])
+
+        self.stdout.write(
+            f"Generating {len(cameras)} cameras x {len(days)} days ({days[0]} to {days[-1]}) "
+            f"at {options['cadence']} s cadence"
+        )
+        started = time.perf_counter()
+        total_rows = 0
+        for day in days:
+            day_started = time.perf_counter()
+            day_rows = 0
+            for index, camera in enumerate(cameras):
+                records = camera_day_records(camera.id, camera.name, f"10.0.{index // 250}.{index % 250 + 1}",
+                                             day, options['cadence'], rng, options['scale'])
+                with transaction.atomic():
+                    IngestBuffer._copy_records(records)
+                day_rows += len(records)
+            total_rows += day_rows
+            elapsed = time.perf_counter() - day_started
+            self.stdout.write(f"  {day}: {day_rows} rows in {elapsed:.1f} s ({day_rows / elapsed:,.0f} rows/s)")
+
+        elapsed = time.perf_counter() - started
+        self.stdout.write(f"Wrote {total_rows} rows in {elapsed:.1f} s ({total_rows / elapsed:,.0f} rows/s)")
+
+        refresh_days = (timezone.localdate() - days[0]).days + 1
+        CrossCountingAnalytics.refresh_materialized_views(days=refresh_days)
+        invalidate_reports()
+        self.stdout.write(self.style.SUCCESS(
+            f"Refreshed continuous aggregates for the last {refresh_days} days"
+        ))
+
+    def _clear(self):
+        cameras = Camera.objects.filter(name__startswith=CAMERA_PREFIX)
+        readings, _ = CrossCountingData.objects.filter(camera__in=cameras).delete()
+        camera_count, _ = cameras.delete()
+        region_count, _ = Region.objects.filter(name__startswith=REGION_PREFIX).delete()
+        self.stdout.write(f"Deleted {readings} readings, {camera_count} cameras and {region_count} regions")
+
+    def _create_cameras(self, region_count, cameras_per_region):
+        cameras = []
+        for r in range(1, region_count + 1):
+            region, _ = Region.objects.get_or_create(
+                name=f"{REGION_PREFIX} {r}",
+                defaults={'occupancy': 150 * cameras_per_region},
+            )
+            for c in range(1, cameras_per_region + 1):
+                camera, _ = Camera.objects.get_or_create(
+                    name=f"{CAMERA_PREFIX}R{r}-C{c}",
+                    defaults={
+                        'region': region,
+                        'rtsp_link': f"rtsp://synthetic/r{r}/c{c}",
+                        'hls_link': f"http://synthetic/r{r}/c{c}.m3u8",
+                    },
+                )
+                cameras.append(camera)
+        return cameras
@@ -0,0 +1,307 @@
+import http.client
+import itertools
+import json
+import random
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+import numpy as np
+import paho.mqtt.client as mqtt
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.utils import timezone
+
+from apps.cross_counting.models import Camera, CrossCountingData
+from apps.cross_counting.synthetic import cc_payload, device_time
+
+PERCENTILES = (50, 90, 99)
+
+
+class Command(BaseCommand):
+    help = ("Send cc alarm payloads to event_server or the MQTT broker at a fixed rate per camera and report "
+            "end-to-end latency and rows/s written")
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--target',
+            choices=['http', 'mqtt'],
+            default='http',
+            help="POST to event_server, or publish straight to the broker mqtt_consumer listens to (default: http)."
+        )
+        parser.add_argument(
+            '--host',
+            type=str,
+            default='127.0.0.1',
+            help="event_server or broker host (default: 127.0.0.1)."
+        )
+        parser.add_argument(
+            '--port',
+            type=int,
+            default=None,
+            help="event_server or broker port (default: 4000 for http, 1883 for mqtt)."
+        )
+        parser.add_argument(
+            '--topic',
+            type=str,
+            default='alert',
+            help="MQTT topic (default: alert)."
+        )
+        parser.add_argument(
+            '--cameras',
+            type=int,
+            default=10,
+            help="Simulated cameras; each sends as an existing camera named --camera-prefix... (default: 10)."
+        )
+        parser.add_argument(
+            '--camera-prefix',
+            type=str,
+            default='SYN-',
+            help="Use cameras whose names start with this, e.g. made by generate_synthetic_data (default: SYN-)."
+        )
+        parser.add_argument(
+            '--rate',
+            type=float,
+            default=0.5,
+            help="Payloads per second per camera (default: 0.5, the cameras' 2 second cadence)."
+        )
+        parser.add_argument(
+            '--duration',
+            type=float,
+            default=30,
+            help="Seconds to send for (default: 30)."
+        )
+        parser.add_argument(
+            '--connections',
+            type=int,
+            default=4,
+            help="Concurrent sender connections; cameras are split between them (default: 4)."
+        )
+        parser.add_argument(
+            '--replay',
+            type=str,
+            default=None,
+            help="Cycle through the payloads in this corpus (e.g. docs/cc_payload_corpus.jsonl) instead of "
+                 "synthesizing them; ChannelName and alarm time are rewritten."
+        )
+        parser.add_argument(
+            '--drain',
+            type=float,
+            default=15,
+            help="Seconds to wait after sending for the last rows to be written; payloads not written this long "
+                 "after being sent are counted as missing (default: 15)."
+        )
+        parser.add_argument(
+            '--poll-interval',
+            type=float,
+            default=0.1,
+            help="Seconds between database polls for written rows; bounds the write latency resolution "
+                 "(default: 0.1)."
+        )
+
+    def handle(self, *args, **options):
+        if options['rate'] <= 0 or options['duration'] <= 0 or options['cameras'] < 1:
+            raise CommandError("--rate, --duration and --cameras must be positive")
+
+        channels = list(Camera.objects.filter(name__startswith=options['camera_prefix'])
+                        .order_by('name').values_list('name', flat=True)[:options['cameras']])
+        if len(channels) < options['cameras']:
+            raise CommandError(
+                f"Only {len(channels)} cameras named {options['camera_prefix']}*; create more, e.g. with "
+                f"generate_synthetic_data --regions 1 --cameras {options['cameras']} --days 1"
+            )
+
+        corpus = None
+        if options['replay']:
+            try:
+                with open(options['replay'], 'rb') as f:
+                    corpus = [line.strip() for line in f if line.strip()]
+            except OSError as e:
+                raise CommandError(f"Cannot read corpus: {e}")
+            if not corpus:
+                raise CommandError("Corpus is empty")
+
+        port = options['port'] or (4000 if options['target'] == 'http' else 1883)
+        # Rows of this run are found by subscribe_id; data_pos is the message sequence number
+        run = LoadRun(random.randint(1, 2 ** 31 - 1), channels, corpus, give_up_after=options['drain'])
+        connections = max(1, min(options['connections'], len(channels)))
+        senders = [
+            threading.Thread(
+                target=run.send,
+                args=(self._connect(options['target'], options['host'], port, options['topic']),
+                      channels[index::connections], options['rate'], options['duration']),
+                daemon=True,
+            )
+            for index in range(connections)
+        ]
+
+        self.stdout.write(
+            f"Sending {len(channels) * options['rate']:.1f} payloads/s from {len(channels)} cameras to "
+            f"{options['target']}://{options['host']}:{port} for {options['duration']:.0f} s "
+            f"(run {run.subscribe_id})"
+        )
+        run.started_at = time.time()
+        for sender in senders:
+            sender.start()
+
+        try:
+            deadline = run.started_at + options['duration'] + options['drain']
+            while time.time() < deadline:
+                time.sleep(options['poll_interval'])
+                run.poll()
+                if not any(sender.is_alive() for sender in senders) and run.pending() == 0:
+                    break
+            run.poll()
+        finally:
+            run.stopping.set()
+            connection.close()
+
+        self._report(run)
+
+    @staticmethod
+    def _connect(target, host, port, topic):
+        """Return send(body) for one sender connection; send raises OSError when the payload was not accepted"""
+        if target == 'mqtt':
+            client = mqtt.Client(protocol=mqtt.MQTTv311)
+            try:
+                client.connect(host, port)
+            except OSError as e:
+                raise CommandError(f"Cannot connect to the MQTT broker at {host}:{port}: {e}")
+            client.loop_start()
+
+            def send(body):
+                result = client.publish(topic, body)
+                if result.rc != mqtt.MQTT_ERR_SUCCESS:
+                    raise OSError(mqtt.error_string(result.rc))
+
+            return send
+
+        state = {'connection': None}
+
+        def send(body):
+            if state['connection'] is None:
+                state['connection'] = http.client.HTTPConnection(host, port, timeout=10)
+            try:
+                state['connection'].request('POST', '/', body, {'Content-Type': 'application/json'})
+                response = state['connection'].getresponse()
+                response.read()
+            except (OSError, http.client.HTTPException) as e:
+                state['connection'].close()
+                state['connection'] = None
+                raise OSError(str(e))
+            if response.status >= 300:
+                raise OSError(f"HTTP {response.status}")
+
+        return send
+
+    def _report(self, run):
+        elapsed = max(run.last_write_at or time.time(), run.started_at) - run.started_at
+        failed, pending = len(run.failed), run.pending()
+        self.stdout.write(
+            f"Sent {run.sent} payloads ({failed} failed), {len(run.written)} written as {run.rows} rows, "
+            f"{pending} missing after the drain period"
+        )
+        if run.written:
+            self.stdout.write(f"Throughput: {run.rows / elapsed:,.0f} rows/s written over {elapsed:.1f} s")
+            self._report_latency("Received (created_at - sent)", [
+                received_at - run.sent_at[seq] for seq, (received_at, _) in run.written.items()
+            ])
+            self._report_latency("Written (seen in DB - sent)", [
+                seen_at - run.sent_at[seq] for seq, (_, seen_at) in run.written.items()
+            ])
+        if failed or pending:
+            self.stderr.write(f"{failed} payloads failed to send and {pending} were not written")
+
+    def _report_latency(self, label, latencies):
+        values = np.array(latencies) * 1000
+        figures = "  ".join(f"p{p} {np.percentile(values, p):8.1f} ms" for p in PERCENTILES)
+        self.stdout.write(f"  {label:<30} {figures}  max {values.max():8.1f} ms")
+
+
+class LoadRun:
+    """Send times of one run's payloads and the rows seen for them"""
+
+    def __init__(self, subscribe_id, channels, corpus=None, give_up_after=15):
+        self.subscribe_id = subscribe_id
+        self.give_up_after = give_up_after
+        self.corpus = corpus
+        self.counters = {channel: [0, 0] for channel in channels}
+        self.sequence = itertools.count(1)
+        self.sent_at = {}
+        self.failed = set()
+        self.written = {}  # data_pos -> (created_at, time first seen in the database)
+        self.rows = 0
+        self.started_at = None
+        self.last_write_at = None
+        self.stopping = threading.Event()
+        self._lock = threading.Lock()
+        self._unseen_from = 1
+
+    @property
+    def sent(self):
+        return len(self.sent_at)
+
+    def pending(self):
+        with self._lock:
+            return len(self.sent_at.keys() - self.failed - self.written.keys())
+
+    def payload(self, channel, seq, now):
+        if self.corpus is not None:
+            payload = json.loads(self.corpus[seq % len(self.corpus)])
+            data = payload.setdefault("data", {})
+            data.update(subscribe_id=self.subscribe_id, data_pos=seq)
+            data.setdefault("dev_net_info", [{}])[0]["ChannelName"] = channel
+            for alarm in data.get("alarm_list", []):
+                alarm["time"] = device_time(now)
+            return payload
+
+        counters = self.counters[channel]
+        counters[0] += random.randint(0, 2)
+        counters[1] = min(counters[0], counters[1] + random.randint(0, 2))
+        return cc_payload(channel, counters[0], counters[1], now, subscribe_id=self.subscribe_id, data_pos=seq)
+
+    def send(self, send, channels, rate, duration):
+        """Send for `duration` seconds, round-robin over `channels` at `rate` payloads/s per channel"""
+        interval = 1 / (rate * len(channels))
+        end = self.started_at + duration
+        for step in itertools.count():
+            due = self.started_at + step * interval
+            if due >= end or self.stopping.is_set():
+                return
+            delay = due - time.time()
+            if delay > 0:
+                time.sleep(delay)
+
+            seq = next(self.sequence)
+            body = json.dumps(self.payload(channels[step % len(channels)], seq, timezone.now())).encode()
+            with self._lock:
+                self.sent_at[seq] = time.time()
+            try:
+                send(body)
+            except OSError:
+                with self._lock:
+                    self.failed.add(seq)
+
+    def poll(self):
+        """Record rows of this run written since the last poll"""
+        since = datetime.fromtimestamp(self.started_at, dt_timezone.utc) - timedelta(minutes=5)
+        rows = list(CrossCountingData.objects
+                    .filter(time__gte=since, subscribe_id=self.subscribe_id, data_pos__gte=self._unseen_from)
+                    .values_list('data_pos', 'created_at'))
+        seen_at = time.time()
+        with self._lock:
+            new = Counter(seq for seq, _ in rows if seq not in self.written)
+            for seq, created_at in rows:
+                if seq in new and seq not in self.written:
+                    self.written[seq] = (created_at.timestamp(), seen_at)
+            if new:
+                self.rows += sum(new.values())
+                self.last_write_at = seen_at
+            # Rows up to the first payload still in flight have all been seen; skip them next time. Payloads
+            # the consumer dropped are never written: give up on them after `give_up_after` seconds so each
+            # poll only reads the most recent rows of the run
+            give_up_before = seen_at - self.give_up_after
+            while (self._unseen_from in self.written or self._unseen_from in self.failed
+                   or self.sent_at.get(self._unseen_from, seen_at) < give_up_before):
+                self._unseen_from += 1
@@ -3,30 +3,33 @@ from apps.cross_counting.utils import CrossCountingAnalytics
 
 
 class Command(BaseCommand):
-    help = 'Refresh materialized views for cross-counting analytics'
+    help = 'Refresh the continuous aggregates used by cross-counting analytics'
 
     def add_arguments(self, parser):
+        parser.add_argument(
+            '--days',
+            type=int,
+            default=3,
+            help='Refresh buckets from the last N days (default: 3)',
+        )
+        parser.add_argument(
+            '--full',
+            action='store_true',
+            help='Refresh the whole history, e.g. after a backfill',
+        )
         parser.add_argument(
             '--concurrent',
             action='store_true',
-            help='Use CONCURRENTLY option for refresh (slower but non-blocking)',
+            help='Kept for compatibility; continuous aggregate refreshes never block reads',
         )
 
     def handle(self, *args, **options):
         try:
-            if options['concurrent']:
-                CrossCountingAnalytics.refresh_materialized_views()
-                self.stdout.write(
-                    self.style.SUCCESS('Successfully refreshed materialized views concurrently')
-                )
-            else:
-                from django.db import connection
-                with connection.cursor() as cursor:
-                    cursor.execute("REFRESH MATERIALIZED VIEW cross_counting_hourly_aggregates;")
-                    cursor.execute("REFRESH MATERIALIZED VIEW cross_counting_daily_peaks;")
-                
-                self.stdout.write(
-                    self.style.SUCCESS('Successfully refreshed materialized views')
-                )
+            days = None if options['full'] else options['days']
+            CrossCountingAnalytics.refresh_materialized_views(days=days)
+            window = 'all data' if days is None else f'the last {days} days'
+            self.stdout.write(
+                self.style.SUCCESS(f'Successfully refreshed continuous aggregates for {window}')
+            )
         except Exception as e:
             self.stderr.write(f"Error refreshing views: {e}")
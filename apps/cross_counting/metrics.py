@@ -0,0 +1,55 @@
+"""
+Prometheus metrics for ingest, analyses and exports
+The web app serves them on /metrics; mqtt_consumer and event_server serve their own on --metrics-port.
+Under a multi-process server (gunicorn, uvicorn workers) set PROMETHEUS_MULTIPROC_DIR so /metrics
+aggregates every worker (see views/metrics.py).
+"""
+
+from prometheus_client import Counter, Gauge, Histogram, start_http_server
+
+# Ingest: MQTT consumer, event server and the IngestBuffer writer thread
+INGEST_PAYLOADS = Counter(
+    'cross_counting_ingest_payloads_total', 'Payloads received', ['source'])
+INGEST_DROPPED = Counter(
+    'cross_counting_ingest_dropped_total', 'Payloads dropped before being written', ['reason'])
+INGEST_ROWS = Counter(
+    'cross_counting_ingest_rows_total', 'Readings written to the database')
+INGEST_WRITE_ERRORS = Counter(
+    'cross_counting_ingest_write_errors_total', 'Batch writes that failed')
+INGEST_QUEUE_DEPTH = Gauge(
+    'cross_counting_ingest_queue_depth', 'Payloads waiting for the writer thread', multiprocess_mode='livesum')
+INGEST_WRITE_SECONDS = Histogram(
+    'cross_counting_ingest_write_seconds', 'Time to write one batch, including live state updates',
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10))
+INGEST_BATCH_ROWS = Histogram(
+    'cross_counting_ingest_batch_rows', 'Readings per written batch',
+    buckets=(1, 10, 50, 100, 250, 500, 1000, 2500, 5000, 10000))
+
+# Event server
+EVENT_REQUESTS = Counter(
+    'cross_counting_event_requests_total', 'Requests handled by the event server', ['method', 'status'])
+MQTT_PUBLISH_FAILURES = Counter(
+    'cross_counting_mqtt_publish_failures_total', 'Payloads that could not be published to MQTT')
+
+# Analyses: compute time of reports missing from the report cache, and page latency
+REPORT_REQUESTS = Counter(
+    'cross_counting_report_requests_total', 'Analysis reports requested', ['report_type', 'cache'])
+REPORT_SECONDS = Histogram(
+    'cross_counting_report_seconds', 'Time to compute an analysis report', ['report_type'],
+    buckets=(0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120))
+VIEW_SECONDS = Histogram(
+    'cross_counting_view_seconds', 'Analysis page and CSV export response time', ['view'],
+    buckets=(0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60))
+
+# CSV exports
+EXPORTS = Counter(
+    'cross_counting_exports_total', 'CSV export requests', ['report_type', 'result'])
+EXPORT_SECONDS = Histogram(
+    'cross_counting_export_seconds', 'Time to build a CSV export', ['report_type'],
+    buckets=(0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300))
+
+
+def serve(port, addr='0.0.0.0'):
+    """Serve the metrics of a management command on `port`; does nothing when `port` is None"""
+    if port is not None:
+        start_http_server(port, addr=addr)
@@ -0,0 +1,93 @@
+# Creates cross_counting_hourly_aggregates and cross_counting_daily_peaks as TimescaleDB continuous
+# aggregates. Buckets are aligned to TIME_ZONE so hours and days match the dashboards.
+
+from django.conf import settings
+from django.db import migrations, models
+
+TIME_ZONE = settings.TIME_ZONE
+
+CREATE_HOURLY = f"""
+DROP MATERIALIZED VIEW IF EXISTS cross_counting_hourly_aggregates CASCADE;
+CREATE MATERIALIZED VIEW cross_counting_hourly_aggregates
+WITH (timescaledb.continuous, timescaledb.materialized_only = false) AS
+SELECT camera_id,
+       time_bucket(INTERVAL '1 hour', time, '{TIME_ZONE}') AS hour,
+       MAX(cc_in_count) AS max_in_count,
+       MAX(cc_out_count) AS max_out_count,
+       MAX(cc_total_count) AS max_total_count,
+       MIN(cc_in_count) AS min_in_count,
+       MIN(cc_out_count) AS min_out_count,
+       MIN(cc_total_count) AS min_total_count,
+       AVG(cc_total_count)::double precision AS avg_total_count,
+       COUNT(*) AS data_points
+FROM cross_counting_data_timeseries
+GROUP BY camera_id, time_bucket(INTERVAL '1 hour', time, '{TIME_ZONE}');
+
+SELECT add_continuous_aggregate_policy('cross_counting_hourly_aggregates',
+    start_offset => INTERVAL '3 days',
+    end_offset => INTERVAL '1 hour',
+    schedule_interval => INTERVAL '15 minutes');
+"""
+
+CREATE_DAILY = f"""
+DROP MATERIALIZED VIEW IF EXISTS cross_counting_daily_peaks CASCADE;
+CREATE MATERIALIZED VIEW cross_counting_daily_peaks
+WITH (timescaledb.continuous, timescaledb.materialized_only = false) AS
+SELECT camera_id,
+       time_bucket(INTERVAL '1 day', time, '{TIME_ZONE}') AS date,
+       MAX(cc_in_count) AS peak_in_count,
+       MAX(cc_out_count) AS peak_out_count,
+       MAX(cc_total_count) AS peak_total_count
+FROM cross_counting_data_timeseries
+GROUP BY camera_id, time_bucket(INTERVAL '1 day', time, '{TIME_ZONE}');
+
+SELECT add_continuous_aggregate_policy('cross_counting_daily_peaks',
+    start_offset => INTERVAL '7 days',
+    end_offset => INTERVAL '1 hour',
+    schedule_interval => INTERVAL '1 hour');
+"""
+
+DROP_HOURLY = """
+SELECT remove_continuous_aggregate_policy('cross_counting_hourly_aggregates', if_exists => true);
+DROP MATERIALIZED VIEW IF EXISTS cross_counting_hourly_aggregates;
+"""
+
+DROP_DAILY = """
+SELECT remove_continuous_aggregate_policy('cross_counting_daily_peaks', if_exists => true);
+DROP MATERIALIZED VIEW IF EXISTS cross_counting_daily_peaks;
+"""
+
+
+class Migration(migrations.Migration):
+
+    # CREATE MATERIALIZED VIEW ... WITH (timescaledb.continuous) cannot run inside a transaction
+    atomic = False
+
+    dependencies = [
+        ('cross_counting', '0003_remove_crosscountingdata_ts_time_camera_idx_and_more'),
+    ]
+
+    operations = [
+        migrations.RunSQL(CREATE_HOURLY, DROP_HOURLY),
+        migrations.RunSQL(CREATE_DAILY, DROP_DAILY),
+
+        # The aggregates have no id column; both models are unmanaged, so these only update the state
+        migrations.RemoveField(
+            model_name='hourlyaggregateview',
+            name='id',
+        ),
+        migrations.AlterField(
+            model_name='hourlyaggregateview',
+            name='hour',
+            field=models.DateTimeField(primary_key=True, serialize=False),
+        ),
+        migrations.RemoveField(
+            model_name='dailypeakview',
+            name='id',
+        ),
+        migrations.AlterField(
+            model_name='dailypeakview',
+            name='date',
+            field=models.DateTimeField(primary_key=True, serialize=False),
+        ),
+    ]
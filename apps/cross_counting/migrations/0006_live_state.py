@@ -0,0 +1,57 @@
+# Generated by Django 5.2.4 on 2026-10-18 10:06
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+# Seed camera live state from the newest stored reading, so occupancy is right before the next message
+SEED_CAMERA_LIVE_STATE = """
+INSERT INTO cross_counting_camera_live_state (camera_id, cc_in_count, cc_out_count, cc_total_count, reading_at)
+SELECT c.id, l.cc_in_count, l.cc_out_count, l.cc_total_count, l.created_at
+FROM cross_counting_camera c
+CROSS JOIN LATERAL (
+    SELECT cc_in_count, cc_out_count, cc_total_count, created_at
+    FROM cross_counting_data_timeseries
+    WHERE camera_id = c.id
+    ORDER BY created_at DESC
+    LIMIT 1
+) l;
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cross_counting', '0005_camera_hourly_rollup'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CameraLiveState',
+            fields=[
+                ('camera', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='live_state', serialize=False, to='cross_counting.camera')),
+                ('cc_in_count', models.PositiveIntegerField(default=0)),
+                ('cc_out_count', models.PositiveIntegerField(default=0)),
+                ('cc_total_count', models.PositiveIntegerField(default=0)),
+                ('reading_at', models.DateTimeField(db_index=True)),
+            ],
+            options={
+                'db_table': 'cross_counting_camera_live_state',
+            },
+        ),
+        migrations.CreateModel(
+            name='RegionLiveState',
+            fields=[
+                ('region', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='live_state', serialize=False, to='cross_counting.region')),
+                ('current_count', models.PositiveIntegerField(default=0)),
+                ('total_in_count', models.PositiveIntegerField(default=0)),
+                ('total_out_count', models.PositiveIntegerField(default=0)),
+                ('active_cameras', models.PositiveIntegerField(default=0)),
+                ('oldest_reading_at', models.DateTimeField(blank=True, null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'db_table': 'cross_counting_region_live_state',
+            },
+        ),
+        migrations.RunSQL(SEED_CAMERA_LIVE_STATE, migrations.RunSQL.noop),
+    ]
@@ -170,48 +170,38 @@ class CrossCountingData(models.Model):
     def get_hourly_aggregates(cls, camera_id, start_time, end_time):
         """
         Get hourly aggregated data for analytics dashboard
-        Uses time-series indexes for fast aggregation
-        FIXED: Uses created_at for all time-based operations
+        Reads the cross_counting_hourly_aggregates continuous aggregate (hours in TIME_ZONE), which also
+        covers the not yet materialized hour through real-time aggregation
         """
-        from django.db.models import Max, Min, Avg, Count
-        from django.db.models.functions import TruncHour
+        from datetime import timedelta
 
-        return cls.objects.filter(
+        return HourlyAggregateView.objects.filter(
             camera_id=camera_id,
-            created_at__range=[start_time, end_time]
-        ).annotate(
-            hour=TruncHour('created_at')
-        ).values('hour').annotate(
-            max_in_count=Max('cc_in_count'),
-            max_out_count=Max('cc_out_count'),
-            max_total_count=Max('cc_total_count'),
-            min_in_count=Min('cc_in_count'),
-            min_out_count=Min('cc_out_count'),
-            min_total_count=Min('cc_total_count'),
-            avg_total_count=Avg('cc_total_count'),
-            data_points=Count('id')
+            hour__gt=start_time - timedelta(hours=1),
+            hour__lte=end_time,
+        ).values(
+            'hour', 'max_in_count', 'max_out_count', 'max_total_count', 'min_in_count', 'min_out_count',
+            'min_total_count', 'avg_total_count', 'data_points',
         ).order_by('hour')
 
     @classmethod
     def get_daily_peak_counts(cls, camera_id, start_date, end_date):
         """
         Get daily peak counts (before reset at 11:59 PM)
-        Useful for daily analytics and reporting
-        FIXED: Uses created_at for date filtering
+        Reads the cross_counting_daily_peaks continuous aggregate; days are TIME_ZONE days
         """
-        from django.db.models import Max
-        from django.db.models.functions import TruncDate
+        from datetime import datetime, time, timedelta
+
+        start = timezone.make_aware(datetime.combine(start_date, time.min))
+        end = timezone.make_aware(datetime.combine(end_date + timedelta(days=1), time.min))
 
-        return cls.objects.filter(
+        rows = DailyPeakView.objects.filter(
             camera_id=camera_id,
-            created_at__date__range=[start_date, end_date]
-        ).annotate(
-            date=TruncDate('created_at')
-        ).values('date').annotate(
-            peak_in_count=Max('cc_in_count'),
-            peak_out_count=Max('cc_out_count'),
-            peak_total_count=Max('cc_total_count')
-        ).order_by('date')
+            date__gte=start,
+            date__lt=end,
+        ).values('date', 'peak_in_count', 'peak_out_count', 'peak_total_count').order_by('date')
+
+        return [dict(row, date=timezone.localtime(row['date']).date()) for row in rows]
 
     @classmethod
     def get_real_time_dashboard_data(cls, camera_ids=None, minutes=30):
@@ -239,42 +229,41 @@ class CrossCountingData(models.Model):
         """
         NEW METHOD: Get last value per hour for each camera in a region
         This is the core method for proper hourly analytics
+        Reads CameraHourlyRollup; hour is the TIME_ZONE hour of day and every hourly bucket overlapping
+        [start_time, end_time) is considered
         """
         from django.db import connection
 
+        tz_name = timezone.get_current_timezone_name()
         with connection.cursor() as cursor:
             cursor.execute("""
-                           WITH ranked_data AS (SELECT ccd.camera_id,
-                                                       ccd.cc_in_count,
-                                                       ccd.cc_out_count,
-                                                       ccd.cc_total_count,
-                                                       EXTRACT(HOUR FROM ccd.created_at) as hour, ccd.created_at, ROW_NUMBER() OVER (
-                               PARTITION BY ccd.camera_id, EXTRACT (HOUR FROM ccd.created_at)
-                               ORDER BY ccd.created_at DESC
-                               ) as rn
-                           FROM cross_counting_data_timeseries ccd
+                           SELECT DISTINCT ON (r.camera_id, EXTRACT(HOUR FROM r.hour AT TIME ZONE %s))
+                                  r.camera_id,
+                                  EXTRACT(HOUR FROM r.hour AT TIME ZONE %s) AS hour,
+                                  r.last_in_count    AS cc_in_count,
+                                  r.last_out_count   AS cc_out_count,
+                                  r.last_total_count AS cc_total_count
+                           FROM cross_counting_camera_hourly_rollup r
                                JOIN cross_counting_camera c
-                           ON ccd.camera_id = c.id
+                           ON r.camera_id = c.id
                            WHERE c.region_id = %s
                              AND c.status = true
-                             AND ccd.created_at >= %s
-                             AND ccd.created_at
-                               < %s
-                               )
-                           SELECT camera_id, hour, cc_in_count, cc_out_count, cc_total_count
-                           FROM ranked_data
-                           WHERE rn = 1
-                           ORDER BY camera_id, hour
-                           """, [region_id, start_time, end_time])
+                             AND r.hour > %s - INTERVAL '1 hour'
+                             AND r.hour < %s
+                           ORDER BY r.camera_id, EXTRACT(HOUR FROM r.hour AT TIME ZONE %s), r.hour DESC
+                           """, [tz_name, tz_name, region_id, start_time, end_time, tz_name])
 
             columns = [col[0] for col in cursor.description]
             return [dict(zip(columns, row)) for row in cursor.fetchall()]
 
 
 class HourlyAggregateView(models.Model):
-    """Materialized view for hourly aggregated cross-counting data"""
+    """
+    Continuous aggregate of hourly cross-counting data (migration 0004)
+    The view has no id column; hour is only unique per camera, so fetch rows with .filter(), not .get(pk=)
+    """
     camera = models.ForeignKey(Camera, on_delete=models.DO_NOTHING)
-    hour = models.DateTimeField()
+    hour = models.DateTimeField(primary_key=True)
     max_in_count = models.PositiveIntegerField()
     max_out_count = models.PositiveIntegerField()
     max_total_count = models.PositiveIntegerField()
@@ -293,9 +282,12 @@ class HourlyAggregateView(models.Model):
 
 
 class DailyPeakView(models.Model):
-    """Materialized view for daily peak counts"""
+    """
+    Continuous aggregate of daily peak counts (migration 0004)
+    date is the start of the day in TIME_ZONE; like HourlyAggregateView it is only unique per camera
+    """
     camera = models.ForeignKey(Camera, on_delete=models.DO_NOTHING)
-    date = models.DateField()
+    date = models.DateTimeField(primary_key=True)
     peak_in_count = models.PositiveIntegerField()
     peak_out_count = models.PositiveIntegerField()
     peak_total_count = models.PositiveIntegerField()
@@ -305,4 +297,64 @@ class DailyPeakView(models.Model):
         db_table = 'cross_counting_daily_peaks'
 
     def __str__(self):
-        return f"{self.camera.name} - {self.date}"
\ No newline at end of file
+        return f"{self.camera.name} - {self.date}"
+
+
+class CameraHourlyRollup(models.Model):
+    """
+    Continuous aggregate with the last reading of each camera per TIME_ZONE hour (migration 0005)
+    Hourly analytics read this instead of ranking raw rows; like the other views, hour is only unique
+    per camera
+    """
+    camera = models.ForeignKey(Camera, on_delete=models.DO_NOTHING)
+    hour = models.DateTimeField(primary_key=True)
+    last_in_count = models.PositiveIntegerField()
+    last_out_count = models.PositiveIntegerField()
+    last_total_count = models.PositiveIntegerField()
+    max_in_count = models.PositiveIntegerField()
+    max_out_count = models.PositiveIntegerField()
+    sample_count = models.PositiveIntegerField()
+    last_seen_at = models.DateTimeField()
+
+    class Meta:
+        managed = False
+        db_table = 'cross_counting_camera_hourly_rollup'
+
+    def __str__(self):
+        return f"{self.camera.name} - {self.hour}"
+
+
+class CameraLiveState(models.Model):
+    """Latest reading of each camera, upserted by the ingest writer on every flush (see live_state.py)"""
+    camera = models.OneToOneField(Camera, on_delete=models.CASCADE, primary_key=True, related_name='live_state')
+    cc_in_count = models.PositiveIntegerField(default=0)
+    cc_out_count = models.PositiveIntegerField(default=0)
+    cc_total_count = models.PositiveIntegerField(default=0)
+    reading_at = models.DateTimeField(db_index=True)
+
+    class Meta:
+        db_table = 'cross_counting_camera_live_state'
+
+    def __str__(self):
+        return f"{self.camera_id} - {self.reading_at}"
+
+
+class RegionLiveState(models.Model):
+    """
+    Current occupancy of each region, summed over the live state of its active cameras
+    Only cameras that reported within live_state.LIVE_WINDOW count; oldest_reading_at tells readers when
+    the sum goes stale
+    """
+    region = models.OneToOneField(Region, on_delete=models.CASCADE, primary_key=True, related_name='live_state')
+    current_count = models.PositiveIntegerField(default=0)
+    total_in_count = models.PositiveIntegerField(default=0)
+    total_out_count = models.PositiveIntegerField(default=0)
+    active_cameras = models.PositiveIntegerField(default=0)
+    oldest_reading_at = models.DateTimeField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'cross_counting_region_live_state'
+
+    def __str__(self):
+        return f"{self.region_id} - {self.current_count}"
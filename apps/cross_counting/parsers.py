@@ -0,0 +1,187 @@
+"""
+Parsing of camera cc alarm payloads
+Shared by mqtt_consumer and event_server --sink=db so both ingest paths store exactly the same rows
+
+Hot path: payload bytes are decoded with orjson when it is installed, alarm timestamps in the fixed
+format cameras send are parsed without dateutil, and each cc alarm becomes a plain tuple in ROW_FIELDS
+order that the ingest writer can COPY without building model instances.
+"""
+
+import json
+import re
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from dateutil.parser import parse
+from django.utils import timezone
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson is optional, stdlib json is the fallback
+    orjson = None
+
+# Column order of the tuples returned by parse_cc_payload
+ROW_FIELDS = (
+    'device_name',
+    'device_ip',
+    'device_mac',
+    'device_phy',
+    'channel',
+    'channel_alias',
+    'cc_in_count',
+    'cc_out_count',
+    'cc_total_count',
+    'alarm_snapshot',
+    'alarm_subtype',
+    'alarm_status',
+    'record_flag',
+    'subscribe_id',
+    'data_pos',
+    'alarm_time',
+)
+
+# 2025-07-31T07:46:02[.ffffff][Z][+05:30]
+_ALARM_TIME_RE = re.compile(
+    r'(\d{4})-(\d{2})-(\d{2})[T ](\d{2}):(\d{2}):(\d{2})(?:\.(\d{1,6}))?(Z)?(?:([+-])(\d{2}):?(\d{2}))?'
+)
+_OFFSETS = {}
+
+
+class PayloadError(ValueError):
+    """Payload cannot be attributed to a camera and must be discarded"""
+
+
+def decode_payload(raw):
+    """Decode a raw MQTT/HTTP body (bytes or str) into a dict"""
+    if orjson is not None:
+        return orjson.loads(raw)
+    if isinstance(raw, (bytes, bytearray)):
+        raw = raw.decode('utf-8')
+    return json.loads(raw)
+
+
+def _offset(seconds):
+    tz = _OFFSETS.get(seconds)
+    if tz is None:
+        tz = dt_timezone.utc if seconds == 0 else dt_timezone(timedelta(seconds=seconds))
+        _OFFSETS[seconds] = tz
+    return tz
+
+
+def parse_alarm_time(value):
+    """
+    Parse an alarm timestamp, returning the same instant dateutil would
+
+    Note that dateutil reads the cameras' "...Z+05:30" suffix POSIX-style, i.e. as UTC-05:30; the fast
+    path keeps that interpretation so stored alarm_time values do not shift. Anything the fast path does
+    not recognise goes to dateutil.
+    """
+    match = _ALARM_TIME_RE.fullmatch(value)
+    if match is None:
+        return parse(value)
+
+    year, month, day, hour, minute, second, fraction, zulu, sign, offset_h, offset_m = match.groups()
+    try:
+        if sign:
+            seconds = int(offset_h) * 3600 + int(offset_m) * 60
+            if (sign == '-') != bool(zulu):
+                seconds = -seconds
+            tzinfo = _offset(seconds)
+        elif zulu:
+            tzinfo = dt_timezone.utc
+        else:
+            tzinfo = None
+        return datetime(int(year), int(month), int(day), int(hour), int(minute), int(second),
+                        int(fraction.ljust(6, '0')) if fraction else 0, tzinfo=tzinfo)
+    except ValueError:
+        return parse(value)
+
+
+def parse_cc_payload(payload, warn=None):
+    """
+    Walk a decoded payload and return (channel_name, rows)
+
+    rows is a list of tuples in ROW_FIELDS order, one per cc channel alarm (camera, time and created_at
+    are added by the writer). Problems with individual alarms are reported through `warn` and skipped;
+    a payload that is not shaped like a camera alarm, or has no ChannelName, raises PayloadError.
+    """
+    data = payload.get("data", {}) if isinstance(payload, dict) else None
+    if not isinstance(data, dict):
+        raise PayloadError("Payload is not an object with a data object. Discarding alert.")
+    dev_net_info = data.get("dev_net_info", [{}])
+    if not isinstance(dev_net_info, list) or not dev_net_info or not isinstance(dev_net_info[0], dict):
+        raise PayloadError("dev_net_info is not a non-empty list of objects. Discarding alert.")
+    dev_net_info = dev_net_info[0]
+    alarm_list = data.get("alarm_list", [])
+    if not isinstance(alarm_list, list):
+        raise PayloadError("alarm_list is not a list. Discarding alert.")
+    subscribe_id = data.get("subscribe_id")
+    data_pos = data.get("data_pos")
+
+    channel_name = dev_net_info.get("ChannelName")
+    if not channel_name:
+        raise PayloadError("Missing ChannelName in dev_net_info. Discarding alert.")
+    if not isinstance(channel_name, str):
+        raise PayloadError("ChannelName is not a string. Discarding alert.")
+
+    device_name = dev_net_info.get("device_name", "Unknown Device")
+    device_ip = dev_net_info.get("ip", "0.0.0.0")
+    device_mac = dev_net_info.get("mac", "00:00:00:00:00:00")
+    device_phy = dev_net_info.get("phy", "")
+
+    rows = []
+    for alarm in alarm_list:
+        if not isinstance(alarm, dict):
+            if warn:
+                warn("Alarm is not an object. Skipping alarm.")
+            continue
+        alarm_time_str = alarm.get("time")
+        if not alarm_time_str:
+            if warn:
+                warn("Missing alarm time. Skipping alarm.")
+            continue
+
+        try:
+            alarm_time = parse_alarm_time(alarm_time_str)
+        except Exception as e:
+            if warn:
+                warn(f"Failed to parse alarm time '{alarm_time_str}': {e}")
+            alarm_time = timezone.now()
+
+        channel_alarms = alarm.get("channel_alarm", [])
+        if not isinstance(channel_alarms, list):
+            raise PayloadError("channel_alarm is not a list. Discarding alert.")
+        for channel_alarm in channel_alarms:
+            if not isinstance(channel_alarm, dict):
+                if warn:
+                    warn("Channel alarm is not an object. Skipping channel alarm.")
+                continue
+            int_alarm = channel_alarm.get("int_alarm", {})
+            if not isinstance(int_alarm, dict) or int_alarm.get("int_subtype") != "cc":
+                continue
+
+            try:
+                cc_alarm_num = channel_alarm.get("cc_alarm_num", {})
+                record_flag = channel_alarm.get("record_flag", {})
+                rows.append((
+                    device_name,
+                    device_ip,
+                    device_mac,
+                    device_phy,
+                    channel_name,  # ChannelName from dev_net_info, not the device-local channel
+                    channel_alarm.get("chn_alias", ""),
+                    cc_alarm_num.get("cc_in_num", 0),
+                    cc_alarm_num.get("cc_out_num", 0),
+                    cc_alarm_num.get("cc_total_num", 0),
+                    bool(int_alarm.get("take_alarm_snap", 0)),
+                    int_alarm.get("int_subtype", "cc"),
+                    bool(int_alarm.get("alarm_val", False)),
+                    record_flag.get("s", "") if isinstance(record_flag, dict) else str(record_flag),
+                    subscribe_id,
+                    data_pos,
+                    alarm_time,
+                ))
+            except Exception as e:
+                if warn:
+                    warn(f"Failed to process alarm for channel: {channel_name}, Error: {e}")
+
+    return channel_name, rows
@@ -0,0 +1,92 @@
+"""
+Result cache for analysis reports
+Reports are cached by (report type, region, dates, options, camera-set version) as encoded JSON. Reports that
+only cover days that have ended never change, so they are kept for CROSS_COUNTING_PAST_REPORT_CACHE_TTL
+seconds (a week by default; finite so orphaned entries are freed); reports that include today expire after
+CROSS_COUNTING_REPORT_CACHE_TTL seconds. Saving or deleting a Camera or Region (see signals.py)
+bumps the camera-set version, which orphans every cached report at once (see caching.py).
+"""
+
+import functools
+import inspect
+import json
+from datetime import date
+
+from django.conf import settings
+from django.utils import timezone
+
+from . import metrics
+from .caching import CAMERA_SET, bump_namespace, get_or_compute, make_key
+from .serialization import dumps
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson is optional, stdlib json is the fallback
+    orjson = None
+
+
+def invalidate_reports():
+    """Orphan every cached report (and every other camera-set keyed entry), e.g. after membership changed"""
+    bump_namespace(CAMERA_SET)
+
+
+def report_key(report_type, region_id, dates, options=None):
+    parts = ['report', report_type, region_id, '_'.join(d.isoformat() for d in dates)]
+    parts += [f'{name}={value}' for name, value in sorted((options or {}).items())]
+    return make_key(*parts)
+
+
+def includes_today(dates, today=None):
+    """Whether any of `dates` has not ended yet, so a report on them can still change"""
+    today = today or timezone.localdate()
+    return any(d >= today for d in dates)
+
+
+def report_timeout(dates, today=None):
+    """The short TTL when a date has not ended, otherwise the long TTL of past-day reports"""
+    if includes_today(dates, today):
+        return settings.CROSS_COUNTING_REPORT_CACHE_TTL
+    return settings.CROSS_COUNTING_PAST_REPORT_CACHE_TTL
+
+
+def _loads(value):
+    return orjson.loads(value) if orjson is not None else json.loads(value)
+
+
+def cached_report(report_type):
+    """
+    Cache a report function called as func(region_id, *dates, **options)
+
+    Arguments after region_id that are dates make up the report's dates; the others are options and also part
+    of the key. The result must be JSON-ready; every call returns a fresh copy.
+    """
+
+    def decorator(func):
+        signature = inspect.signature(func)
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            bound = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+            arguments = dict(bound.arguments)
+            region_id = arguments.pop('region_id')
+            dates = [value for value in arguments.values() if isinstance(value, date)]
+            options = {name: value for name, value in arguments.items() if not isinstance(value, date)}
+
+            computed = False
+
+            def compute():
+                nonlocal computed
+                computed = True
+                with metrics.REPORT_SECONDS.labels(report_type=report_type).time():
+                    return dumps(func(*args, **kwargs))
+
+            encoded = get_or_compute(
+                report_key(report_type, region_id, dates, options), compute, timeout=report_timeout(dates))
+            metrics.REPORT_REQUESTS.labels(report_type=report_type, cache='miss' if computed else 'hit').inc()
+            return _loads(encoded)
+
+        wrapper.uncached = func
+        return wrapper
+
+    return decorator
@@ -0,0 +1,56 @@
+"""
+JSON encoding for analysis results
+Analysis results are built from JSON-ready values (see utils.py) and encoded exactly once per fragment,
+with orjson when it is installed; datetimes, dates and UUIDs are encoded natively, anything else falls back
+to DjangoJSONEncoder. Template fragments are escaped like Django's json_script so they can be embedded
+in a <script> block.
+"""
+
+import json
+import logging
+from datetime import date, datetime, time
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils.safestring import mark_safe
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson is optional, stdlib json is the fallback
+    orjson = None
+
+logger = logging.getLogger(__name__)
+
+_ENCODER = DjangoJSONEncoder()
+
+_SCRIPT_ESCAPES = {
+    ord('>'): '\\u003E',
+    ord('<'): '\\u003C',
+    ord('&'): '\\u0026',
+}
+
+
+class _Encoder(DjangoJSONEncoder):
+    """stdlib fallback matching orjson: full-precision datetimes"""
+
+    def default(self, obj):
+        if isinstance(obj, (datetime, date, time)):
+            return obj.isoformat()
+        return super().default(obj)
+
+
+def dumps(data):
+    """Encode `data` to a JSON string"""
+    if orjson is not None:
+        return orjson.dumps(
+            data, default=_ENCODER.default, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY,
+        ).decode()
+    return json.dumps(data, cls=_Encoder, ensure_ascii=False, separators=(',', ':'))
+
+
+def json_for_template(data):
+    """Encode `data` as a JSON fragment that is safe to embed in a <script> block"""
+    try:
+        return mark_safe(dumps(data).translate(_SCRIPT_ESCAPES))
+    except (TypeError, ValueError) as e:
+        logger.error(f"Error serializing data to JSON: {e}")
+        return mark_safe('{}')
@@ -0,0 +1,46 @@
+import functools
+
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete, pre_save
+from django.dispatch import receiver
+
+from apps.cross_counting.ingest import CameraLookupCache
+from apps.cross_counting.live_state import recompute_regions
+from apps.cross_counting.models import Camera, Region
+from apps.cross_counting.report_cache import invalidate_reports
+
+
+@receiver(post_save, sender=Camera)
+@receiver(post_delete, sender=Camera)
+def invalidate_camera_lookup_cache(sender, instance, **kwargs):
+    # Camera name/region/status changed: make the ingest path reload its name -> id map
+    CameraLookupCache.invalidate_all()
+
+
+@receiver(pre_save, sender=Camera)
+def remember_previous_region(sender, instance, raw=False, **kwargs):
+    # A camera that moves between regions changes both sums; new cameras cost no query
+    if raw or instance._state.adding:
+        instance._previous_region_id = None
+    else:
+        instance._previous_region_id = (
+            Camera.objects.filter(pk=instance.pk).values_list('region_id', flat=True).first()
+        )
+
+
+@receiver(post_save, sender=Camera)
+@receiver(post_delete, sender=Camera)
+def refresh_region_live_state(sender, instance, **kwargs):
+    # The camera may have moved between regions or been disabled: re-sum only the regions it touched
+    region_ids = {instance.region_id, getattr(instance, '_previous_region_id', None)} - {None}
+    if region_ids:
+        transaction.on_commit(functools.partial(recompute_regions, region_ids))
+
+
+@receiver(post_save, sender=Camera)
+@receiver(post_delete, sender=Camera)
+@receiver(post_save, sender=Region)
+@receiver(post_delete, sender=Region)
+def invalidate_cached_reports(sender, instance, **kwargs):
+    # Reports list region and camera names and sum over the region's cameras
+    transaction.on_commit(invalidate_reports)
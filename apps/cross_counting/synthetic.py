@@ -0,0 +1,101 @@
+"""
+Synthetic cross-counting readings for benchmarks
+Each camera reports cumulative in/out counters every `cadence` seconds. The counters reset at local midnight
+and grow by Poisson-distributed arrivals that follow a working-day profile; people leave about two hours
+after they arrive, and the out counter never overtakes the in counter. Records have the shape IngestBuffer
+writes: (camera_id, received_at, row) with row in parsers.ROW_FIELDS order. cc_payload builds the JSON the
+cameras send, for load tests of event_server and mqtt_consumer.
+"""
+
+from datetime import datetime, time, timedelta
+
+import numpy as np
+from django.utils import timezone
+
+DEFAULT_CADENCE_SECONDS = 2
+
+# Arrivals per camera per hour of the local day
+HOURLY_ARRIVALS = np.array([
+    2, 1, 1, 1, 2, 8, 30, 90, 160, 120, 80, 70,
+    90, 80, 70, 70, 80, 110, 90, 50, 30, 15, 8, 4,
+], dtype=float)
+LEAVE_DELAY_HOURS = 2
+
+
+def day_counters(day, cadence=DEFAULT_CADENCE_SECONDS, rng=None, scale=1.0):
+    """
+    Timestamps and cumulative counters of one camera over one local day
+    Returns (timestamps, cumulative_in, cumulative_out): aware datetimes and int arrays of equal length
+    """
+    rng = rng or np.random.default_rng()
+    start = timezone.make_aware(datetime.combine(day, time.min))
+    end = timezone.make_aware(datetime.combine(day + timedelta(days=1), time.min))
+    steps = int((end - start).total_seconds() // cadence)
+
+    hours = (np.arange(steps) * cadence // 3600).clip(max=23)
+    arrivals = HOURLY_ARRIVALS * scale * cadence / 3600
+    cumulative_in = np.cumsum(rng.poisson(arrivals[hours]))
+    departures = np.roll(arrivals, LEAVE_DELAY_HOURS)
+    cumulative_out = np.minimum(np.cumsum(rng.poisson(departures[hours])), cumulative_in)
+
+    timestamps = [start + timedelta(seconds=step * cadence) for step in range(steps)]
+    return timestamps, cumulative_in, cumulative_out
+
+
+def camera_day_records(camera_id, camera_name, device_ip, day, cadence=DEFAULT_CADENCE_SECONDS, rng=None,
+                       scale=1.0):
+    """IngestBuffer records of one camera over one local day; the device's clock runs up to 1 s behind"""
+    rng = rng or np.random.default_rng()
+    timestamps, cumulative_in, cumulative_out = day_counters(day, cadence, rng, scale)
+    clock_lag = rng.uniform(0, 1, len(timestamps))
+
+    records = []
+    for received_at, in_count, out_count, lag in zip(timestamps, cumulative_in.tolist(),
+                                                       cumulative_out.tolist(), clock_lag.tolist()):
+        row = (
+            'GV-DNC575-AI', device_ip, '00:00:00:00:00:00', 'eth0', camera_name, camera_name,
+            in_count, out_count, in_count + out_count,
+            False, 'cc', True, '', None, None,
+            received_at - timedelta(seconds=lag),
+        )
+        records.append((camera_id, received_at, row))
+    return records
+
+
+def device_time(moment):
+    """`moment` as the cameras write alarm times: local wall time followed by Z and the UTC offset"""
+    local = timezone.localtime(moment)
+    offset = local.strftime('%z')
+    return f"{local:%Y-%m-%dT%H:%M:%S}Z{offset[:3]}:{offset[3:]}"
+
+
+def cc_payload(channel_name, in_count, out_count, moment, device_ip='10.0.0.1', subscribe_id=None,
+               data_pos=None):
+    """A cc alarm payload as cameras POST it to event_server and mqtt_consumer receives it"""
+    return {
+        "data": {
+            "subscribe_id": subscribe_id,
+            "data_pos": data_pos,
+            "dev_net_info": [{
+                "device_name": "GV-DNC575-AI",
+                "mac": "00-00-00-00-00-00",
+                "ip": device_ip,
+                "phy": "eth0",
+                "ChannelName": channel_name,
+            }],
+            "alarm_list": [{
+                "time": device_time(moment),
+                "channel_alarm": [{
+                    "channel": "CH1",
+                    "chn_alias": "",
+                    "cc_alarm_num": {
+                        "cc_in_num": in_count,
+                        "cc_out_num": out_count,
+                        "cc_total_num": in_count + out_count,
+                    },
+                    "int_alarm": {"alarm_val": True, "int_subtype": "cc", "take_alarm_snap": 0},
+                    "record_flag": {"s": "G"},
+                }],
+            }],
+        }
+    }
@@ -0,0 +1,105 @@
+"""
+Celery tasks for cross-counting maintenance, background analysis reports and CSV exports
+Maintenance tasks run from settings.CELERY_BEAT_SCHEDULE. generate_analysis_report computes a report into the
+report cache (see report_cache.py) and reports its progress, so the page that polls it can load the finished
+report as a cache hit; generate_csv_export writes an export to storage (see exports.py).
+"""
+
+import logging
+from datetime import date
+
+from celery import shared_task
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+REPORT_TYPES = ('daily', 'comparative', 'comprehensive')
+
+
+@shared_task
+def refresh_continuous_aggregates(days=3):
+    from .utils import CrossCountingAnalytics
+
+    CrossCountingAnalytics.refresh_materialized_views(days=days)
+    logger.info(f"Refreshed continuous aggregates for the last {days} days")
+
+
+@shared_task
+def cleanup_old_data(days_to_keep=None):
+    from .utils import DataRetentionManager
+
+    days_to_keep = days_to_keep or settings.CROSS_COUNTING_RETENTION_DAYS
+    deleted = DataRetentionManager.cleanup_old_data(days_to_keep=days_to_keep)
+    logger.info(f"Deleted {deleted} readings older than {days_to_keep} days")
+    return deleted
+
+
+@shared_task
+def optimize_table_maintenance():
+    from .utils import PerformanceOptimizer
+
+    return PerformanceOptimizer.optimize_table_maintenance()
+
+
+def report_steps(report_type, region_id, dates):
+    """
+    The cached calls that make up a report, as (label, callable) pairs in order
+    The comparative analysis reuses both cached daily analyses, so computing them first makes its progress real
+    """
+    from .utils import TablePartitioningManager
+
+    if report_type == 'daily':
+        (target_date,) = dates
+        return [(f'Daily analysis for {target_date}',
+                 lambda: TablePartitioningManager.get_daily_analysis_data(region_id, target_date))]
+    if report_type == 'comparative':
+        base_date, compare_date = dates
+        return [
+            (f'Daily totals for {base_date}', lambda: TablePartitioningManager.get_daily_analysis_data(
+                region_id, base_date, include_individual_data=False)),
+            (f'Daily totals for {compare_date}', lambda: TablePartitioningManager.get_daily_analysis_data(
+                region_id, compare_date, include_individual_data=False)),
+            ('Comparison', lambda: TablePartitioningManager.get_comparative_analysis_data(
+                region_id, base_date, compare_date)),
+        ]
+    if report_type == 'comprehensive':
+        from_date, to_date = dates
+        return [(f'Analysis from {from_date} to {to_date}',
+                 lambda: TablePartitioningManager.get_comprehensive_analysis_data(region_id, from_date, to_date))]
+    raise ValueError(f"Unknown report type: {report_type}")
+
+
+@shared_task(bind=True)
+def generate_analysis_report(self, report_type, region_id, dates):
+    """Compute a report into the report cache; `dates` are ISO strings in the report's argument order"""
+    steps = report_steps(report_type, region_id, [date.fromisoformat(value) for value in dates])
+
+    for index, (label, step) in enumerate(steps):
+        self.update_state(state='PROGRESS', meta={'current': index, 'total': len(steps), 'step': label})
+        step()
+
+    logger.info(f"Generated {report_type} report for region {region_id} ({', '.join(dates)})")
+    return {'report_type': report_type, 'region_id': region_id, 'dates': dates}
+
+
+@shared_task(bind=True)
+def generate_csv_export(self, report_type, region_id, dates):
+    """Write a report's CSV export to storage; `dates` are ISO strings in the report's argument order"""
+    from .exports import build_export
+
+    self.update_state(state='PROGRESS', meta={'current': 0, 'total': 1, 'step': 'Writing CSV export'})
+    name = build_export(report_type, region_id, [date.fromisoformat(value) for value in dates])
+
+    logger.info(f"Exported {report_type} report for region {region_id} ({', '.join(dates)}) to {name}")
+    return {'report_type': report_type, 'region_id': region_id, 'dates': dates, 'export': name}
+
+
+@shared_task
+def cleanup_exports(max_age_days=7):
+    from datetime import timedelta
+
+    from .exports import cleanup_exports as delete_old_exports
+
+    deleted = delete_old_exports(max_age=timedelta(days=max_age_days))
+    logger.info(f"Deleted {deleted} CSV exports older than {max_age_days} days")
+    return deleted
@@ -0,0 +1,61 @@
+from unittest import mock
+
+from django.contrib.admin import site
+from django.test import RequestFactory, SimpleTestCase
+
+from apps.cross_counting import paginators
+from apps.cross_counting.admin import RecentWindowFilter
+from apps.cross_counting.models import CrossCountingData
+
+
+class CountedList(list):
+    def __init__(self, exact_count):
+        super().__init__()
+        self.exact_count = exact_count
+        self.counted = False
+
+    def count(self):
+        self.counted = True
+        return self.exact_count
+
+
+class EstimatedCountPaginatorTestCase(SimpleTestCase):
+    def paginator(self, exact_count):
+        return paginators.EstimatedCountPaginator(CountedList(exact_count), 50)
+
+    def test_large_results_use_the_estimate(self):
+        paginator = self.paginator(exact_count=2_500_000)
+        with mock.patch.object(paginators, 'estimated_count', return_value=2_400_000):
+            self.assertEqual(paginator.count, 2_400_000)
+        self.assertFalse(paginator.object_list.counted)
+
+    def test_small_results_are_counted_exactly(self):
+        paginator = self.paginator(exact_count=120)
+        with mock.patch.object(paginators, 'estimated_count', return_value=90):
+            self.assertEqual(paginator.count, 120)
+
+    def test_exact_count_when_estimate_is_unavailable(self):
+        paginator = self.paginator(exact_count=40_000)
+        with mock.patch.object(paginators, 'estimated_count', return_value=None):
+            self.assertEqual(paginator.count, 40_000)
+
+
+class RecentWindowFilterTestCase(SimpleTestCase):
+    def list_filter(self, params):
+        request = RequestFactory().get('/', params)
+        return RecentWindowFilter(request, {key: [value] for key, value in params.items()},
+                                  CrossCountingData, site._registry[CrossCountingData])
+
+    def test_last_24_hours_by_default(self):
+        queryset = mock.Mock()
+
+        self.list_filter({}).queryset(None, queryset)
+
+        (_, kwargs), = [call[1:] for call in queryset.filter.mock_calls]
+        self.assertEqual(list(kwargs), ['created_at__gte'])
+
+    def test_all_time_does_not_filter(self):
+        queryset = mock.Mock()
+
+        self.assertIs(self.list_filter({'window': 'all'}).queryset(None, queryset), queryset)
+        queryset.filter.assert_not_called()
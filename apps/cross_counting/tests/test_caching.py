@@ -0,0 +1,75 @@
+import threading
+
+from django.core.cache import cache
+from django.test import SimpleTestCase, override_settings
+
+from apps.cross_counting import caching
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+class CachingTestCase(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+        self.calls = 0
+
+    def compute(self):
+        self.calls += 1
+        return {'value': self.calls}
+
+    def test_value_is_computed_once(self):
+        first = caching.get_or_compute('k', self.compute, timeout=60)
+        second = caching.get_or_compute('k', self.compute, timeout=60)
+
+        self.assertEqual(first, second)
+        self.assertEqual(self.calls, 1)
+        self.assertIsNone(cache.get('k:lock'))
+
+    def test_cached_none_is_a_hit(self):
+        caching.get_or_compute('k', lambda: None, timeout=60)
+
+        self.assertIsNone(caching.get_or_compute('k', self.compute, timeout=60))
+        self.assertEqual(self.calls, 0)
+
+    def test_waits_for_the_lock_holder(self):
+        cache.add('k:lock', 'other-worker', timeout=30)
+        threading.Timer(0.1, lambda: cache.set('k', 'from other worker', timeout=60)).start()
+
+        value = caching.get_or_compute('k', self.compute, timeout=60, wait_timeout=5, poll_interval=0.01)
+
+        self.assertEqual(value, 'from other worker')
+        self.assertEqual(self.calls, 0)
+
+    def test_computes_when_the_lock_holder_gives_up(self):
+        cache.add('k:lock', 'other-worker', timeout=30)
+        threading.Timer(0.05, lambda: cache.delete('k:lock')).start()
+
+        value = caching.get_or_compute('k', self.compute, timeout=60, wait_timeout=5, poll_interval=0.01)
+
+        self.assertEqual(value, {'value': 1})
+
+    def test_namespace_bump_changes_keys(self):
+        before = caching.make_key('occupancy')
+        self.assertEqual(caching.make_key('occupancy'), before)
+
+        caching.bump_namespace(caching.CAMERA_SET)
+
+        self.assertNotEqual(caching.make_key('occupancy'), before)
+
+
+@override_settings(CACHES={'default': {
+    'BACKEND': 'django_redis.cache.RedisCache',
+    'LOCATION': 'redis://127.0.0.1:1/0',
+    'OPTIONS': {'IGNORE_EXCEPTIONS': True, 'SOCKET_CONNECT_TIMEOUT': 0.1},
+}})
+class UnreachableCacheTestCase(SimpleTestCase):
+    def test_computes_without_waiting(self):
+        calls = []
+
+        @caching.cached('occupancy', timeout=5)
+        def occupancy():
+            calls.append(1)
+            return [1]
+
+        self.assertEqual(occupancy(), [1])
+        self.assertEqual(occupancy(), [1])
+        self.assertEqual(len(calls), 2)
@@ -0,0 +1,104 @@
+from datetime import date, datetime, timedelta
+from zoneinfo import ZoneInfo
+
+import numpy as np
+from django.test import SimpleTestCase
+
+from apps.cross_counting import daily_analysis
+
+KOLKATA = ZoneInfo("Asia/Kolkata")
+DAY = date(2025, 7, 31)
+
+
+def epoch_us(dt):
+    return int(dt.timestamp()) * 1000000 + dt.microsecond
+
+
+class DailyAnalysisTestCase(SimpleTestCase):
+    def test_regional_totals_count_active_cameras(self):
+        totals = daily_analysis.regional_hourly_totals(
+            np.array([[0, 7], [0, 4]]), np.array([[0, 2], [1, 3]]))
+
+        self.assertEqual(totals, [
+            {'hour': 0, 'total_in_count': 0, 'total_out_count': 1, 'active_cameras': 1},
+            {'hour': 1, 'total_in_count': 11, 'total_out_count': 5, 'active_cameras': 2},
+        ])
+
+    def test_timestamps_match_localtime_isoformat(self):
+        readings_at = [
+            datetime(2025, 7, 31, 0, 0, 5, tzinfo=KOLKATA),
+            datetime(2025, 7, 31, 13, 45, 0, 250000, tzinfo=KOLKATA),
+            datetime(2025, 7, 31, 23, 59, 59, tzinfo=KOLKATA),
+        ]
+        readings = np.array([[0, epoch_us(dt), i, 0, i] for i, dt in enumerate(readings_at)], dtype=np.int64)
+
+        local_us, suffixes = daily_analysis.local_timestamps(readings[:, daily_analysis.EPOCH_US], DAY, KOLKATA)
+        hours = daily_analysis.local_hours(local_us)
+        series = daily_analysis.individual_camera_series(
+            readings, local_us, suffixes, hours, 23, ['cam'], {'cam': 'Gate 1'})
+
+        self.assertEqual(hours.tolist(), [0, 13, 23])
+        points = series[0]['data_points']
+        self.assertEqual([p['timestamp'] for p in points], [dt.isoformat() for dt in readings_at])
+        self.assertEqual([p['created_at'] for p in points], [dt.strftime('%H:%M:%S') for dt in readings_at])
+        self.assertEqual(series[0]['max_in'], 2)
+
+    def test_dst_day_converts_each_reading(self):
+        london = ZoneInfo("Europe/London")
+        transition_day = date(2025, 3, 30)
+        start, _ = daily_analysis.day_bounds(transition_day, london)
+        readings_at = [start + timedelta(hours=h) for h in (0, 3, 12)]
+        epochs = np.array([epoch_us(dt) for dt in readings_at], dtype=np.int64)
+
+        local_us, suffixes = daily_analysis.local_timestamps(epochs, transition_day, london)
+
+        self.assertEqual(daily_analysis.local_hours(local_us).tolist(), [0, 3, 12])
+        self.assertEqual(suffixes.tolist(), ['+00:00', '+01:00', '+01:00'])
+
+    def test_cameras_without_points_are_skipped(self):
+        readings = np.array([[1, 0, 3, 1, 4]], dtype=np.int64)
+        series = daily_analysis.individual_camera_series(
+            readings, readings[:, 1], np.array(['+00:00'], dtype=object), np.array([0]), 0,
+            ['a', 'b'], {'a': 'A', 'b': 'B'})
+
+        self.assertEqual([s['camera_id'] for s in series], ['b'])
+
+    def test_short_series_are_not_downsampled(self):
+        counts = np.arange(10)
+
+        self.assertEqual(daily_analysis.downsample_indices(counts, counts, 10).tolist(), list(range(10)))
+        self.assertEqual(daily_analysis.downsample_indices(counts, counts, None).tolist(), list(range(10)))
+
+    def test_downsampling_keeps_extremes_and_ends(self):
+        rng = np.random.default_rng(3)
+        in_counts = np.cumsum(rng.integers(0, 3, 43200))
+        out_counts = np.cumsum(rng.integers(0, 2, 43200))
+        in_counts[20000] = 0  # counter reset
+        out_counts[30000] = out_counts.max() + 50  # spike
+
+        plotted = daily_analysis.downsample_indices(in_counts, out_counts, 1000)
+
+        self.assertLessEqual(len(plotted), 1000)
+        self.assertEqual(plotted.tolist(), sorted(set(plotted.tolist())))
+        self.assertEqual((plotted[0], plotted[-1]), (0, 43199))
+        self.assertIn(20000, plotted)
+        self.assertIn(30000, plotted)
+        self.assertEqual(in_counts[plotted].max(), in_counts.max())
+
+    def test_downsampled_series_keeps_full_day_summary(self):
+        n = 500
+        start = datetime(2025, 7, 31, 6, 0, tzinfo=KOLKATA)
+        readings = np.array(
+            [[0, epoch_us(start + timedelta(seconds=2 * i)), i, i // 2, i + i // 2] for i in range(n)],
+            dtype=np.int64)
+        local_us, suffixes = daily_analysis.local_timestamps(readings[:, daily_analysis.EPOCH_US], DAY, KOLKATA)
+
+        series = daily_analysis.individual_camera_series(
+            readings, local_us, suffixes, daily_analysis.local_hours(local_us), 23, ['cam'], {'cam': 'Gate 1'},
+            max_points=50)[0]
+
+        self.assertEqual(series['total_points'], n)
+        self.assertLessEqual(series['plotted_points'], 50)
+        self.assertEqual(series['plotted_points'], len(series['data_points']))
+        self.assertEqual((series['first_time'], series['last_time']), ('06:00:00', '06:16:38'))
+        self.assertEqual((series['max_in'], series['max_out']), (n - 1, (n - 1) // 2))
@@ -0,0 +1,104 @@
+"""
+The SQL cumulative-max query against hourly values worked out by hand with the original per-hour loop
+(running max of each hour's highest reading, 0 before the first one)
+Needs the TimescaleDB test database
+"""
+
+from datetime import date, datetime, timedelta
+
+import numpy as np
+from django.test import TestCase
+from django.utils import timezone
+
+from apps.cross_counting import daily_analysis
+from apps.cross_counting.models import Camera, CrossCountingData, Region
+from apps.cross_counting.utils import TablePartitioningManager
+
+DAY = date(2025, 7, 30)
+
+# (local hour, in, out) readings; camera 2 has none. Camera 0's second hour is below its first and its
+# counter resets at 14:00, neither of which may lower the cumulative max
+READINGS = (
+    ((0, 3, 1), (0, 5, 2), (1, 4, 2), (5, 9, 4), (5, 12, 6), (13, 20, 11), (14, 0, 0), (23, 31, 18)),
+    ((2, 2, 0), (2, 6, 1), (3, 8, 5), (9, 10, 7)),
+    (),
+)
+EXPECTED_IN = [
+    [5] * 5 + [12] * 8 + [20] * 10 + [31],
+    [0] * 2 + [6] + [8] * 6 + [10] * 15,
+    [0] * 24,
+]
+EXPECTED_OUT = [
+    [2] * 5 + [6] * 8 + [11] * 10 + [18],
+    [0] * 2 + [1] + [5] * 6 + [7] * 15,
+    [0] * 24,
+]
+# (first hour, last hour, total in, total out, active cameras)
+EXPECTED_REGIONAL = (
+    (0, 1, 5, 2, 1), (2, 2, 11, 3, 2), (3, 4, 13, 7, 2), (5, 8, 20, 11, 2), (9, 12, 22, 13, 2),
+    (13, 22, 30, 18, 2), (23, 23, 41, 25, 2),
+)
+
+
+class HourlyCumulativeMaxTestCase(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.region = Region.objects.create(name="Parity", occupancy=100)
+        cls.cameras = [
+            Camera.objects.create(name=f"Parity {i}", rtsp_link="", hls_link="", region=cls.region)
+            for i in range(3)
+        ]
+        start = timezone.make_aware(datetime.combine(DAY, datetime.min.time()))
+        readings = []
+        for camera, camera_readings in zip(cls.cameras, READINGS):
+            for minute, (hour, in_count, out_count) in enumerate(camera_readings):
+                readings.append((camera, start + timedelta(hours=hour, minutes=minute), in_count, out_count))
+            # Readings on the neighbouring days are outside the local day
+            readings.append((camera, start - timedelta(seconds=1), 999, 999))
+            readings.append((camera, start + timedelta(days=1), 999, 999))
+
+        for camera, created_at, in_count, out_count in readings:
+            row = CrossCountingData.objects.create(
+                camera=camera, device_name="dev", device_ip="10.0.0.1", device_mac="00:00:00:00:00:00",
+                channel=camera.name, alarm_subtype="CC", alarm_time=created_at,
+                cc_in_count=in_count, cc_out_count=out_count, cc_total_count=in_count + out_count,
+            )
+            CrossCountingData.objects.filter(pk=row.pk).update(created_at=created_at, time=created_at)
+
+    def camera_ids(self):
+        return [camera.id for camera in self.cameras]
+
+    def test_cumulative_max_per_camera_and_hour(self):
+        cumulative_in, cumulative_out, max_data_hour = daily_analysis.load_hourly_cumulative_max(
+            self.camera_ids(), DAY)
+
+        np.testing.assert_array_equal(cumulative_in, EXPECTED_IN)
+        np.testing.assert_array_equal(cumulative_out, EXPECTED_OUT)
+        self.assertEqual(max_data_hour, 23)
+
+    def test_regional_totals(self):
+        expected = [
+            {'hour': hour, 'total_in_count': total_in, 'total_out_count': total_out, 'active_cameras': active}
+            for first, last, total_in, total_out, active in EXPECTED_REGIONAL
+            for hour in range(first, last + 1)
+        ]
+
+        analysis = TablePartitioningManager.get_simplified_daily_analysis(self.region.id, DAY)
+
+        self.assertEqual(analysis['regional_hourly_data'], expected)
+        self.assertEqual(len(analysis['individual_camera_data']), 2)
+
+    def test_regional_totals_without_individual_data(self):
+        full = TablePartitioningManager.get_simplified_daily_analysis(self.region.id, DAY)
+        regional = TablePartitioningManager.get_simplified_daily_analysis(
+            self.region.id, DAY, include_individual_data=False)
+
+        self.assertEqual(regional['regional_hourly_data'], full['regional_hourly_data'])
+        self.assertEqual(regional['individual_camera_data'], [])
+
+    def test_day_without_readings(self):
+        cumulative_in, _, max_data_hour = daily_analysis.load_hourly_cumulative_max(
+            self.camera_ids(), DAY - timedelta(days=5))
+
+        self.assertIsNone(max_data_hour)
+        self.assertFalse(cumulative_in.any())
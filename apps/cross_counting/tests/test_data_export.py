@@ -0,0 +1,58 @@
+import csv
+import gzip
+import io
+import unittest
+from datetime import datetime, timedelta, timezone
+
+from django.test import SimpleTestCase
+
+from apps.cross_counting import data_export
+
+ALARM = datetime(2025, 7, 30, 4, 0, tzinfo=timezone.utc)
+
+
+def reading(index, camera='Gate 1'):
+    alarm_time = ALARM + timedelta(seconds=index)
+    return ('GV-DNC575-AI', camera, 'CH1', index, index // 2, index + index // 2,
+            alarm_time + timedelta(seconds=1.5), alarm_time)
+
+
+def decode(chunks):
+    return list(csv.reader(io.StringIO(b''.join(chunks).decode('utf-8'))))
+
+
+class CsvExportTestCase(SimpleTestCase):
+    def test_rows_match_the_original_export(self):
+        rows = decode(data_export.csv_chunks([reading(3), reading(4, camera=None)]))
+
+        self.assertEqual(rows[0], data_export.HEADER)
+        self.assertEqual(rows[1], ['GV-DNC575-AI', 'Gate 1', 'CH1', '3', '1', '4',
+                                   '2025-07-30 04:00:04', '2025-07-30 04:00:03', '1.50'])
+        self.assertEqual(rows[2][1], '')
+
+    def test_large_exports_are_sent_in_chunks(self):
+        chunks = list(data_export.csv_chunks(reading(i) for i in range(5000)))
+
+        self.assertGreater(len(chunks), 1)
+        self.assertTrue(all(len(chunk) < 2 * data_export.CSV_CHUNK_BYTES for chunk in chunks))
+        self.assertEqual(len(decode(chunks)), 5001)
+
+    def test_gzip_output_decompresses_to_the_same_csv(self):
+        rows = [reading(i) for i in range(3000)]
+
+        compressed = b''.join(data_export.csv_chunks(rows, compress=True))
+
+        self.assertEqual(gzip.decompress(compressed), b''.join(data_export.csv_chunks(rows)))
+
+
+@unittest.skipIf(data_export.pyarrow is None, "pyarrow is not installed")
+class ParquetExportTestCase(SimpleTestCase):
+    def test_row_groups_are_streamed(self):
+        import pyarrow.parquet
+
+        chunks = list(data_export.parquet_chunks((reading(i) for i in range(25)), row_group_size=10))
+
+        self.assertEqual(len(chunks), 3)
+        table = pyarrow.parquet.read_table(io.BytesIO(b''.join(chunks)))
+        self.assertEqual(table.num_rows, 25)
+        self.assertEqual(table.column('time_difference_seconds')[0].as_py(), 1.5)
@@ -0,0 +1,63 @@
+import json
+from unittest.mock import MagicMock, patch
+
+import redis
+from django.test import SimpleTestCase
+
+from apps.cross_counting import events
+from apps.cross_counting.events import CAMERA_CHANNEL, REGION_CHANNEL, OccupancyPublisher, format_sse
+
+REGION = {'region_id': 1, 'current_count': 5, 'total_in_count': 9, 'total_out_count': 4, 'active_cameras': 2,
+          'max_occupancy': 50, 'occupancy_percentage': 10.0}
+CAMERA = {'camera_id': 'c1', 'cc_in_count': 9, 'cc_out_count': 4, 'cc_total_count': 13, 'current_occupancy': 5,
+          'reading_at': '2025-07-31T10:00:00+00:00'}
+
+
+class OccupancyPublisherTestCase(SimpleTestCase):
+    def setUp(self):
+        self.client = MagicMock()
+        patcher = patch.object(OccupancyPublisher, '_get_client', return_value=self.client)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.publisher = OccupancyPublisher(redis_url='redis://localhost:6379/0')
+
+    def test_publishes_only_changes(self):
+        self.publisher.publish([CAMERA], [REGION])
+        self.assertEqual([call.args[0] for call in self.client.publish.call_args_list], [REGION_CHANNEL, CAMERA_CHANNEL])
+        self.assertEqual(json.loads(self.client.publish.call_args_list[0].args[1]), {'regions': [REGION]})
+
+        self.client.publish.reset_mock()
+        self.assertIsNone(self.publisher.publish([dict(CAMERA, reading_at='later')], [REGION]))
+        self.client.publish.assert_not_called()
+
+        moved = dict(REGION, current_count=6)
+        delta = self.publisher.publish([CAMERA], [moved])
+        self.assertEqual(delta, {'regions': [moved], 'cameras': []})
+        self.client.publish.assert_called_once()
+
+    def test_redis_errors_do_not_propagate(self):
+        self.client.publish.side_effect = ConnectionError("down")
+        self.assertIsNotNone(self.publisher.publish([CAMERA], [REGION]))
+
+
+class FormatSSETestCase(SimpleTestCase):
+    def test_frames_event(self):
+        self.assertEqual(format_sse('delta', '{"regions":[]}'), 'event: delta\ndata: {"regions":[]}\n\n')
+
+
+@patch.object(events, 'build_snapshot', return_value={'regions': [], 'cameras': []})
+@patch.object(events.time, 'sleep')
+class StreamEventsTestCase(SimpleTestCase):
+    def test_lost_redis_connection_falls_back_to_polling(self, sleep, build_snapshot):
+        pubsub = MagicMock()
+        pubsub.get_message.side_effect = [{'data': b'{"regions":[]}'}, redis.ConnectionError("gone")]
+        with patch.object(redis.Redis, 'from_url') as from_url:
+            from_url.return_value.pubsub.return_value = pubsub
+            stream = events.stream_events(redis_url='redis://localhost:6379/0')
+            frames = [next(stream) for _ in range(3)]
+            stream.close()
+
+        self.assertEqual([frame.split('\n')[0] for frame in frames],
+                         ['event: snapshot', 'event: delta', 'event: snapshot'])
+        pubsub.close.assert_called_once()
+        sleep.assert_called_once_with(events.FALLBACK_POLL_INTERVAL)
@@ -0,0 +1,190 @@
+import csv
+import io
+import json
+import tempfile
+import time
+from datetime import date, timedelta
+from types import SimpleNamespace
+from unittest import mock
+
+from django.core.cache import cache
+from django.core.files.storage import default_storage
+from django.http import Http404
+from django.test import RequestFactory, SimpleTestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from apps.cross_counting import exports, report_cache
+from apps.cross_counting.views import analysis
+
+DAY = date(2025, 7, 30)
+
+DAILY_REPORT = {
+    'summary': {'total_peak_in': 12, 'total_peak_out': 9, 'total_peak_total': 21, 'active_cameras': 2},
+    'cameras': [
+        {'camera_name': 'Gate 1', 'peak_in': 7, 'peak_out': 4, 'peak_total': 11},
+        {'camera_name': 'Gate 2', 'peak_in': 5, 'peak_out': 5, 'peak_total': 10},
+    ],
+}
+
+
+class ExportRowsTestCase(SimpleTestCase):
+    def test_daily_rows(self):
+        rows = list(exports.daily_rows('Plant', [DAY], DAILY_REPORT))
+
+        self.assertEqual(rows[:3], [['Daily Analysis Report'], ['Region', 'Plant'], ['Date', DAY]])
+        self.assertIn(['Total Peak Count', 21], rows)
+        self.assertEqual(rows[-2:], [['Gate 1', 7, 4, 11], ['Gate 2', 5, 5, 10]])
+
+    def test_comprehensive_rows_list_each_camera_day(self):
+        report = {
+            'total_days': 2,
+            'daily_trends': [{'camera_name': 'Gate 1', 'daily_data': [
+                {'date': '2025-07-29', 'peak_in_count': 3, 'peak_out_count': 1, 'peak_total_count': 4},
+                {'date': '2025-07-30', 'peak_in_count': 2, 'peak_out_count': 2, 'peak_total_count': 4},
+            ]}],
+        }
+
+        rows = list(exports.comprehensive_rows('Plant', [DAY - timedelta(days=1), DAY], report))
+
+        self.assertIn(['Total Days', 2], rows)
+        self.assertEqual(rows[-3:], [['Date', 'Peak In', 'Peak Out', 'Peak Total'],
+                                     ['2025-07-29', 3, 1, 4], ['2025-07-30', 2, 2, 4]])
+
+
+@override_settings(
+    CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}},
+    CROSS_COUNTING_REPORT_CACHE_TTL=60,
+)
+class ExportNameTestCase(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_past_exports_are_stable_until_cameras_change(self):
+        name = exports.export_name('daily', 1, [DAY])
+
+        self.assertEqual(exports.export_name('daily', 1, [DAY]), name)
+        self.assertNotEqual(exports.export_name('daily', 2, [DAY]), name)
+        report_cache.invalidate_reports()
+        self.assertNotEqual(exports.export_name('daily', 1, [DAY]), name)
+
+    def test_exports_of_today_expire_with_the_report_ttl(self):
+        today = timezone.localdate()
+        with mock.patch.object(exports.time, 'time', return_value=600):
+            name = exports.export_name('daily', 1, [today])
+        with mock.patch.object(exports.time, 'time', return_value=659):
+            self.assertEqual(exports.export_name('daily', 1, [today]), name)
+        with mock.patch.object(exports.time, 'time', return_value=660):
+            self.assertNotEqual(exports.export_name('daily', 1, [today]), name)
+
+
+class ExportStorageMixin:
+    """Exports go to a temporary MEDIA_ROOT; the region is 'Plant' and its report is DAILY_REPORT"""
+
+    def setUp(self):
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        settings = override_settings(
+            CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}},
+            MEDIA_ROOT=media.name,
+        )
+        settings.enable()
+        self.addCleanup(settings.disable)
+        cache.clear()
+
+        region = mock.patch('apps.cross_counting.models.Region.objects.get',
+                            return_value=SimpleNamespace(name='Plant'))
+        region.start()
+        self.addCleanup(region.stop)
+        self.load_report = mock.patch.object(exports, 'load_report', return_value=DAILY_REPORT).start()
+        self.addCleanup(mock.patch.stopall)
+
+
+class BuildExportTestCase(ExportStorageMixin, SimpleTestCase):
+    def test_export_is_written_once_and_then_reused(self):
+        name = exports.build_export('daily', 1, [DAY])
+
+        self.assertTrue(exports.is_ready(name))
+        self.assertEqual(exports.build_export('daily', 1, [DAY]), name)
+        self.assertEqual(self.load_report.call_count, 1)
+
+        with default_storage.open(name, 'rb') as f:
+            rows = list(csv.reader(io.TextIOWrapper(f, encoding='utf-8', newline='')))
+        self.assertEqual(rows[2], ['Date', '2025-07-30'])
+        self.assertEqual(rows[-1], ['Gate 2', '5', '5', '10'])
+
+    def test_cleanup_deletes_old_exports(self):
+        name = exports.build_export('daily', 1, [DAY])
+
+        self.assertEqual(exports.cleanup_exports(), 0)
+        self.assertEqual(exports.cleanup_exports(max_age=timedelta(seconds=-1)), 1)
+        self.assertFalse(default_storage.exists(name))
+
+
+class ExportDownloadTestCase(ExportStorageMixin, SimpleTestCase):
+    def request(self, view, task_id, result):
+        request = RequestFactory().get('/')
+        request.user = SimpleNamespace(is_authenticated=True)
+        task = SimpleNamespace(state='SUCCESS', result=result, successful=lambda: True, failed=lambda: False)
+        with mock.patch.object(analysis, 'AsyncResult', return_value=task):
+            return view(request, task_id)
+
+    def test_status_links_to_the_file_the_task_wrote(self):
+        today = timezone.localdate()
+        with mock.patch.object(exports.time, 'time', return_value=600):
+            name = exports.build_export('daily', 1, [today])
+        result = {'report_type': 'daily', 'region_id': 1, 'dates': [today.isoformat()], 'export': name}
+
+        status = json.loads(self.request(analysis.analysis_job_status, 'task-1', result).content)
+        self.assertEqual(status['result_url'], reverse('cross_counting:analysis_export_download', args=['task-1']))
+
+        # Served by stored name even after the export name of today has moved to the next TTL bucket
+        with mock.patch.object(exports.time, 'time', return_value=6000), \
+                mock.patch.object(analysis, 'get_object_or_404', return_value=SimpleNamespace(name='Plant')):
+            response = self.request(analysis.analysis_export_download, 'task-1', result)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(f'daily_analysis_Plant_{today}.csv', response['Content-Disposition'])
+        self.assertIn(b'Daily Analysis Report', b''.join(response.streaming_content))
+
+    def test_names_outside_the_export_dir_are_not_served(self):
+        result = {'report_type': 'daily', 'region_id': 1, 'dates': [DAY.isoformat()], 'export': '../settings.py'}
+
+        with self.assertRaises(Http404):
+            self.request(analysis.analysis_export_download, 'task-1', result)
+
+
+@override_settings(CROSS_COUNTING_EXPORT_QUEUE_TIMEOUT=300)
+class ExportQueueTestCase(ExportStorageMixin, SimpleTestCase):
+    # Patching time.time also moves the cache clock, so stay near the real time
+    queued_at = time.time()
+
+    def status(self, task, now):
+        request = RequestFactory().get('/')
+        request.user = SimpleNamespace(is_authenticated=True)
+        with mock.patch.object(analysis, 'AsyncResult', return_value=task), \
+                mock.patch.object(exports.time, 'time', return_value=now):
+            return json.loads(analysis.analysis_job_status(request, 'task-1').content)
+
+    def test_export_no_worker_picks_up_is_given_up_on(self):
+        name = exports.export_name('daily', 1, [DAY])
+        with mock.patch.object(exports.time, 'time', return_value=self.queued_at):
+            exports.remember_task(name, 'task-1')
+        task = mock.Mock(state='PENDING', **{'successful.return_value': False, 'failed.return_value': False})
+
+        self.assertEqual(self.status(task, self.queued_at + 299), {'state': 'PENDING'})
+        self.assertEqual(exports.queued_task(name), 'task-1')
+
+        status = self.status(task, self.queued_at + 300)
+        self.assertEqual(status['state'], 'PENDING')
+        self.assertIn('No worker picked up the export', status['error'])
+        self.assertIsNone(exports.queued_task(name))
+        task.revoke.assert_called_once_with()
+
+    def test_running_export_is_not_given_up_on(self):
+        name = exports.export_name('daily', 1, [DAY])
+        with mock.patch.object(exports.time, 'time', return_value=self.queued_at):
+            exports.remember_task(name, 'task-1')
+        task = mock.Mock(state='PROGRESS', info={'current': 0, 'total': 1, 'step': 'Daily analysis'})
+
+        self.assertNotIn('error', self.status(task, self.queued_at + 1000))
+        self.assertEqual(exports.queued_task(name), 'task-1')
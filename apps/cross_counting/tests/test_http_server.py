@@ -0,0 +1,119 @@
+import asyncio
+import io
+from unittest import mock
+
+from django.core.management.base import OutputWrapper
+from django.test import SimpleTestCase
+from prometheus_client import REGISTRY
+
+from apps.cross_counting.http_server import AsyncEventServer, DatabaseSink, read_request, HTTPError
+
+
+class RecordingSink:
+    def __init__(self, accept=True):
+        self.accept = accept
+        self.bodies = []
+
+    async def start(self):
+        pass
+
+    def submit(self, body):
+        self.bodies.append(body)
+        return self.accept
+
+    async def close(self):
+        pass
+
+
+def _post(body, extra_headers=""):
+    return (
+        f"POST /alarm HTTP/1.1\r\nHost: test\r\nContent-Length: {len(body)}\r\n{extra_headers}\r\n"
+    ).encode() + body
+
+
+class ReadRequestTestCase(SimpleTestCase):
+    def _reader(self, data):
+        reader = asyncio.StreamReader()
+        reader.feed_data(data)
+        reader.feed_eof()
+        return reader
+
+    async def test_body_framed_by_content_length(self):
+        reader = self._reader(_post(b'{"a": 1}') + _post(b'{"b": 2}'))
+        first = await read_request(reader)
+        second = await read_request(reader)
+        self.assertEqual(first[4], b'{"a": 1}')
+        self.assertEqual(second[4], b'{"b": 2}')
+        self.assertIsNone(await read_request(reader))
+
+    async def test_chunked_body(self):
+        reader = self._reader(
+            b"POST / HTTP/1.1\r\nTransfer-Encoding: chunked\r\n\r\n4\r\nWiki\r\n5\r\npedia\r\n0\r\n\r\n"
+        )
+        request = await read_request(reader)
+        self.assertEqual(request[4], b"Wikipedia")
+
+    async def test_post_without_length_is_rejected(self):
+        with self.assertRaises(HTTPError) as ctx:
+            await read_request(self._reader(b"POST / HTTP/1.1\r\nHost: test\r\n\r\n"))
+        self.assertEqual(ctx.exception.status, 411)
+
+
+class AsyncEventServerTestCase(SimpleTestCase):
+    async def _exchange(self, sink, payload, expected_responses):
+        server = AsyncEventServer("127.0.0.1", 0, sink, verbosity=0)
+        handlers = set()
+
+        async def handle_connection(reader, writer):
+            handlers.add(asyncio.current_task())
+            await server._handle_connection(reader, writer)
+
+        listener = await asyncio.start_server(handle_connection, "127.0.0.1", 0)
+        port = listener.sockets[0].getsockname()[1]
+        try:
+            reader, writer = await asyncio.open_connection("127.0.0.1", port)
+            writer.write(payload)
+            await writer.drain()
+            responses = []
+            for _ in range(expected_responses):
+                head = await reader.readuntil(b"\r\n\r\n")
+                length = int(head.split(b"Content-Length: ")[1].split(b"\r\n")[0])
+                await reader.readexactly(length)
+                responses.append(head.split(b"\r\n")[0])
+            writer.close()
+            await writer.wait_closed()
+            return responses
+        finally:
+            # Let the server see the client hang up before the loop goes away, or its handlers are cancelled
+            await asyncio.wait_for(asyncio.gather(*handlers), timeout=5)
+            listener.close()
+            await listener.wait_closed()
+
+    async def test_pipelined_keep_alive_requests(self):
+        sink = RecordingSink()
+        responses = await self._exchange(sink, _post(b"one") + _post(b"two") + _post(b"three"), 3)
+        self.assertEqual(responses, [b"HTTP/1.1 200 OK"] * 3)
+        self.assertEqual(sink.bodies, [b"one", b"two", b"three"])
+
+    async def test_full_sink_answers_503(self):
+        responses = await self._exchange(RecordingSink(accept=False), _post(b"payload"), 1)
+        self.assertEqual(responses, [b"HTTP/1.1 503 Service Unavailable"])
+
+
+class DatabaseSinkTestCase(SimpleTestCase):
+    def test_malformed_bodies_are_dropped_as_invalid(self):
+        buffer = mock.Mock()
+        output = OutputWrapper(io.StringIO())
+        sink = DatabaseSink(buffer, stdout=output, stderr=output)
+        dropped = REGISTRY.get_sample_value('cross_counting_ingest_dropped_total', {'reason': 'invalid_payload'}) or 0
+
+        bodies = (b'[1,2]', b'"x"', b'{"data": null}', b'{"data": {"dev_net_info": []}}', b'not json')
+        for body in bodies:
+            with self.subTest(body=body):
+                self.assertTrue(sink.submit(body))
+
+        buffer.submit.assert_not_called()
+        self.assertEqual(
+            REGISTRY.get_sample_value('cross_counting_ingest_dropped_total', {'reason': 'invalid_payload'}),
+            dropped + len(bodies),
+        )
@@ -0,0 +1,140 @@
+import io
+import threading
+import uuid
+from unittest.mock import Mock, patch
+
+from django.core.management.base import OutputWrapper
+from django.test import SimpleTestCase
+
+from apps.cross_counting.ingest import CameraInfo, CameraLookupCache, IngestBuffer
+
+
+class CameraLookupCacheTestCase(SimpleTestCase):
+    def setUp(self):
+        self.camera = CameraInfo(uuid.uuid4(), 1, True)
+        self.cache = CameraLookupCache(refresh_interval=300, negative_ttl=60)
+
+        def reload(cache, now):
+            cache._cameras = {"CH1": self.camera}
+            cache._missing = {}
+            cache._loaded_at = now
+            cache._loaded_generation = CameraLookupCache._generation
+
+        reload_patcher = patch.object(CameraLookupCache, "_reload", autospec=True, side_effect=reload)
+        fetch_patcher = patch.object(CameraLookupCache, "_fetch", return_value=None)
+        self.reload = reload_patcher.start()
+        self.fetch = fetch_patcher.start()
+        self.addCleanup(reload_patcher.stop)
+        self.addCleanup(fetch_patcher.stop)
+
+    def test_known_camera_loaded_once(self):
+        self.assertEqual(self.cache.get("CH1"), self.camera)
+        self.assertEqual(self.cache.get("CH1"), self.camera)
+        self.assertEqual(self.reload.call_count, 1)
+        self.fetch.assert_not_called()
+
+    def test_unknown_camera_is_negatively_cached(self):
+        self.assertIsNone(self.cache.get("CH404"))
+        self.assertIsNone(self.cache.get("CH404"))
+        self.assertEqual(self.fetch.call_count, 1)
+
+    def test_invalidate_all_forces_reload(self):
+        self.cache.get("CH1")
+        CameraLookupCache.invalidate_all()
+        self.cache.get("CH1")
+        self.assertEqual(self.reload.call_count, 2)
+
+
+class RecordingBuffer(IngestBuffer):
+    """Records the row count of every flush instead of writing it"""
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.flushed = []
+        self.flushed_event = threading.Event()
+
+    def flush(self, items):
+        self.flushed.append(sum(len(rows) for _, _, rows in items))
+        self.flushed_event.set()
+
+
+class IngestBufferTestCase(SimpleTestCase):
+    def test_full_batch_is_flushed_before_the_interval(self):
+        # stop() waits out the interval once the queue is empty, so keep it short but well above the wait
+        buffer = RecordingBuffer(batch_size=5, flush_interval_ms=2000)
+        buffer.start()
+        self.addCleanup(buffer.stop)
+        for _ in range(5):
+            buffer.submit("CH1", [{}])
+
+        self.assertTrue(buffer.flushed_event.wait(1))
+        self.assertEqual(buffer.flushed, [5])
+
+    def test_partial_batch_is_flushed_after_the_interval(self):
+        buffer = RecordingBuffer(batch_size=500, flush_interval_ms=50)
+        buffer.start()
+        self.addCleanup(buffer.stop)
+        buffer.submit("CH1", [{}, {}])
+
+        self.assertTrue(buffer.flushed_event.wait(5))
+        self.assertEqual(buffer.flushed, [2])
+
+    def test_failed_batch_is_retried_one_payload_at_a_time(self):
+        camera_cache = Mock(get=Mock(return_value=CameraInfo(uuid.uuid4(), 1, True)))
+        buffer = IngestBuffer(camera_cache=camera_cache, publisher=Mock(),
+                              stdout=OutputWrapper(io.StringIO()), stderr=OutputWrapper(io.StringIO()))
+        items = [("CH1", None, [("row",)]) for _ in range(3)]
+        results = [Exception("bad row")] + [([], [])] * 3
+
+        with patch.object(buffer, "_write", side_effect=results) as write, \
+                patch("apps.cross_counting.ingest.connection"):
+            buffer.flush(items)
+
+        self.assertEqual([len(call.args[0]) for call in write.call_args_list], [3, 1, 1, 1])
+        self.assertEqual(buffer.publisher.publish.call_count, 3)
+
+    def test_bad_payload_does_not_stop_the_writer(self):
+        cameras = {"CH1": CameraInfo(uuid.uuid4(), 1, True)}
+        camera_cache = Mock(get=Mock(side_effect=lambda name: cameras[name]))
+        buffer = IngestBuffer(batch_size=1, flush_interval_ms=50, camera_cache=camera_cache, publisher=Mock(),
+                              stdout=OutputWrapper(io.StringIO()), stderr=OutputWrapper(io.StringIO()))
+        written = threading.Event()
+
+        def write(records, camera_ids, region_ids):
+            written.set()
+            return [], []
+
+        for patcher in (patch.object(buffer, "_write", side_effect=write),
+                        patch("apps.cross_counting.ingest.connection")):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        buffer.start()
+        self.addCleanup(buffer.stop)
+
+        buffer.submit(["CH1"], [("row",)])
+        buffer.submit("CH1", [("row",)])
+
+        self.assertTrue(written.wait(5))
+        self.assertTrue(buffer._thread.is_alive())
+        self.assertEqual(len(buffer._write.call_args.args[0]), 1)
+
+    def test_flushes_in_batches_and_drains_on_stop(self):
+        flushed = []
+
+        class RecordingBuffer(IngestBuffer):
+            def flush(self, items):
+                flushed.append(sum(len(rows) for _, _, rows in items))
+
+        buffer = RecordingBuffer(batch_size=5, flush_interval_ms=60000)
+        buffer.start()
+        for _ in range(12):
+            buffer.submit("CH1", [{}])
+        buffer.stop()
+
+        self.assertEqual(sum(flushed), 12)
+        self.assertTrue(all(size <= 5 for size in flushed[:-1]))
+
+    def test_submit_drops_when_queue_full(self):
+        buffer = IngestBuffer(max_queue_size=1)
+        self.assertTrue(buffer.submit("CH1", []))
+        self.assertFalse(buffer.submit("CH1", []))
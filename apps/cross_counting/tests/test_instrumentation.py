@@ -0,0 +1,33 @@
+import logging
+from unittest import mock
+
+from django.test import SimpleTestCase
+
+from apps.cross_counting.instrumentation import timed
+
+log = logging.getLogger('apps.cross_counting.tests.instrumentation')
+
+
+class TimedTestCase(SimpleTestCase):
+    def test_stage_is_logged_with_its_counts(self):
+        with self.assertLogs(log, level='DEBUG') as logs:
+            with timed('day readings', log) as stage:
+                stage.rows = 1200
+                stage.count(cameras=4)
+
+        (record,) = logs.records
+        self.assertRegex(record.getMessage(), r'^day readings: [\d.]+ ms, 0 queries, 1200 rows, cameras=4$')
+        self.assertEqual((record.stage, record.rows, record.cameras, record.queries), ('day readings', 1200, 4, 0))
+        self.assertGreaterEqual(record.duration_ms, 0)
+
+    def test_nothing_is_measured_below_the_logger_level(self):
+        log.setLevel(logging.INFO)
+        self.addCleanup(log.setLevel, logging.NOTSET)
+
+        with mock.patch('apps.cross_counting.instrumentation.time.perf_counter') as perf_counter, \
+                mock.patch.object(log, 'log') as log_call:
+            with timed('day readings', log) as stage:
+                stage.rows = 1200
+
+        perf_counter.assert_not_called()
+        log_call.assert_not_called()
@@ -0,0 +1,66 @@
+import uuid
+from datetime import datetime, timedelta, timezone as dt_timezone
+from types import SimpleNamespace
+from unittest import mock
+
+from django.test import SimpleTestCase
+
+from apps.cross_counting import live_state, signals
+from apps.cross_counting.live_state import LIVE_WINDOW, _is_stale, latest_readings, record_readings
+from apps.cross_counting.parsers import ROW_FIELDS
+
+NOW = datetime(2025, 7, 31, 10, 0, tzinfo=dt_timezone.utc)
+
+
+class LiveStateTestCase(SimpleTestCase):
+    def test_latest_readings_keeps_newest_row_per_camera(self):
+        records = [
+            ("a", NOW, ("first",)),
+            ("b", NOW, ("only",)),
+            ("a", NOW + timedelta(seconds=2), ("second",)),
+            ("a", NOW + timedelta(seconds=1), ("late",)),
+        ]
+
+        latest = latest_readings(records)
+
+        self.assertEqual(latest["a"], (NOW + timedelta(seconds=2), ("second",)))
+        self.assertEqual(latest["b"], (NOW, ("only",)))
+
+    def test_region_goes_stale_when_a_reading_ages_out(self):
+        fresh = {'has_state': True, 'oldest_reading_at': NOW - LIVE_WINDOW + timedelta(seconds=1)}
+        aged = {'has_state': True, 'oldest_reading_at': NOW - LIVE_WINDOW - timedelta(seconds=1)}
+        empty = {'has_state': True, 'oldest_reading_at': None}
+
+        self.assertFalse(_is_stale(fresh, now=NOW))
+        self.assertTrue(_is_stale(aged, now=NOW))
+        self.assertFalse(_is_stale(empty, now=NOW))
+        self.assertTrue(_is_stale({'has_state': False, 'oldest_reading_at': None}, now=NOW))
+
+    def test_only_readings_newer_than_the_stored_ones_are_published(self):
+        fresh, stale = uuid.uuid4(), uuid.uuid4()
+        row = tuple(range(len(ROW_FIELDS)))
+        with mock.patch.object(live_state, 'connection') as connection:
+            cursor = connection.cursor.return_value.__enter__.return_value
+            # The upsert's WHERE clause skipped `stale`: only `fresh` comes back from RETURNING
+            cursor.fetchall.return_value = [(fresh,)]
+            camera_states, region_states = record_readings([(fresh, NOW, row), (stale, NOW, row)], set())
+
+        sql = cursor.execute.call_args.args[0]
+        self.assertIn("WHERE EXCLUDED.reading_at >= cross_counting_camera_live_state.reading_at", sql)
+        self.assertEqual([state['camera_id'] for state in camera_states], [str(fresh)])
+        self.assertEqual(region_states, [])
+
+
+@mock.patch.object(signals.transaction, 'on_commit', side_effect=lambda callback: callback())
+@mock.patch.object(signals, 'recompute_regions')
+class CameraSignalTestCase(SimpleTestCase):
+    def test_only_the_camera_regions_are_recomputed(self, recompute_regions, on_commit):
+        signals.refresh_region_live_state(None, SimpleNamespace(region_id=3, _previous_region_id=5))
+        signals.refresh_region_live_state(None, SimpleNamespace(region_id=3, _previous_region_id=3))
+
+        self.assertEqual(recompute_regions.call_args_list, [mock.call({3, 5}), mock.call({3})])
+
+    def test_camera_without_a_region_recomputes_nothing(self, recompute_regions, on_commit):
+        signals.refresh_region_live_state(None, SimpleNamespace(region_id=None))
+
+        recompute_regions.assert_not_called()
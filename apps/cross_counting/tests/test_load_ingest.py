@@ -0,0 +1,74 @@
+import json
+import time
+from datetime import datetime, timezone as dt_timezone
+from unittest.mock import patch
+
+from django.test import SimpleTestCase
+
+from apps.cross_counting.management.commands.load_ingest import LoadRun
+from apps.cross_counting.models import CrossCountingData
+from apps.cross_counting.parsers import decode_payload, parse_cc_payload
+
+
+class LoadRunTestCase(SimpleTestCase):
+    def setUp(self):
+        self.run = LoadRun(42, ['SYN-R1-C1', 'SYN-R1-C2'])
+        self.run.started_at = time.time()
+
+    def poll(self, rows):
+        created_at = datetime.now(dt_timezone.utc)
+        with patch.object(CrossCountingData.objects, 'filter') as rows_filter:
+            rows_filter.return_value.values_list.return_value = [(seq, created_at) for seq in rows]
+            self.run.poll()
+        return rows_filter
+
+    def test_sends_at_the_requested_rate(self):
+        bodies = []
+        self.run.send(bodies.append, ['SYN-R1-C1', 'SYN-R1-C2'], rate=50, duration=0.2)
+
+        self.assertEqual(len(bodies), 20)
+        self.assertEqual(self.run.sent, 20)
+        channel_name, _ = parse_cc_payload(decode_payload(bodies[1]))
+        self.assertEqual(channel_name, 'SYN-R1-C2')
+        self.assertEqual(json.loads(bodies[1])['data']['subscribe_id'], 42)
+
+    def test_failed_sends_are_not_pending(self):
+        def send(body):
+            raise OSError("connection refused")
+
+        self.run.send(send, ['SYN-R1-C1'], rate=50, duration=0.1)
+
+        self.assertEqual(len(self.run.failed), 5)
+        self.assertEqual(self.run.pending(), 0)
+
+    def test_poll_records_new_rows_and_skips_seen_ones(self):
+        self.run.sent_at = dict.fromkeys([1, 2, 3], time.time())
+
+        self.poll([1, 3])
+        self.assertEqual(self.run.pending(), 1)
+        rows_filter = self.poll([2, 3])
+
+        self.assertEqual(self.run.rows, 3)
+        self.assertEqual(self.run.pending(), 0)
+        self.assertEqual(rows_filter.call_args.kwargs['data_pos__gte'], 2)
+
+    def test_poll_moves_past_payloads_that_were_never_written(self):
+        now = time.time()
+        self.run.sent_at = {1: now - 60, 2: now - 60, 3: now}
+
+        self.poll([2])
+        rows_filter = self.poll([])
+
+        self.assertEqual(self.run.pending(), 2)
+        self.assertEqual(rows_filter.call_args.kwargs['data_pos__gte'], 3)
+
+    def test_replayed_payloads_are_relabelled(self):
+        corpus = [json.dumps({"data": {"dev_net_info": [{"ChannelName": "CH11"}], "alarm_list": [
+            {"time": "2025-07-31T22:39:09Z+05:30", "channel_alarm": []}]}})]
+        run = LoadRun(42, ['SYN-R1-C1'], corpus)
+
+        payload = run.payload('SYN-R1-C1', 5, datetime(2025, 8, 1, 4, 30, tzinfo=dt_timezone.utc))
+
+        self.assertEqual(payload['data']['dev_net_info'][0]['ChannelName'], 'SYN-R1-C1')
+        self.assertEqual((payload['data']['subscribe_id'], payload['data']['data_pos']), (42, 5))
+        self.assertEqual(payload['data']['alarm_list'][0]['time'], '2025-08-01T10:00:00Z+05:30')
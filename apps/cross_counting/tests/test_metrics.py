@@ -0,0 +1,70 @@
+import io
+from datetime import date
+from unittest.mock import patch
+
+from django.core.cache import cache
+from django.core.management.base import OutputWrapper
+from django.test import SimpleTestCase, override_settings
+from prometheus_client import REGISTRY
+
+from apps.cross_counting import report_cache
+from apps.cross_counting.ingest import CameraLookupCache, IngestBuffer
+
+
+def sample(name, **labels):
+    return REGISTRY.get_sample_value(name, labels) or 0
+
+
+class IngestMetricsTestCase(SimpleTestCase):
+    def test_dropped_payloads_are_counted_by_reason(self):
+        queue_full = sample('cross_counting_ingest_dropped_total', reason='queue_full')
+        unknown_camera = sample('cross_counting_ingest_dropped_total', reason='unknown_camera')
+
+        output = OutputWrapper(io.StringIO())
+        buffer = IngestBuffer(max_queue_size=1, stdout=output, stderr=output)
+        buffer.submit("CH1", [])
+        buffer.submit("CH1", [])
+        with patch.object(CameraLookupCache, 'get', return_value=None), \
+                patch.object(IngestBuffer, '_write', return_value=([], [])):
+            buffer.flush([("CH404", None, [()])])
+
+        self.assertEqual(sample('cross_counting_ingest_dropped_total', reason='queue_full'), queue_full + 1)
+        self.assertEqual(sample('cross_counting_ingest_dropped_total', reason='unknown_camera'), unknown_camera + 1)
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+class ReportMetricsTestCase(SimpleTestCase):
+    def test_cache_hits_and_misses_are_counted(self):
+        cache.clear()
+        report = report_cache.cached_report('metrics_test')(lambda region_id, target_date: {'ok': True})
+        misses = sample('cross_counting_report_requests_total', report_type='metrics_test', cache='miss')
+        hits = sample('cross_counting_report_requests_total', report_type='metrics_test', cache='hit')
+
+        report(1, date(2025, 7, 30))
+        report(1, date(2025, 7, 30))
+
+        self.assertEqual(sample('cross_counting_report_requests_total', report_type='metrics_test', cache='miss'),
+                         misses + 1)
+        self.assertEqual(sample('cross_counting_report_requests_total', report_type='metrics_test', cache='hit'),
+                         hits + 1)
+        self.assertEqual(sample('cross_counting_report_seconds_count', report_type='metrics_test'), misses + 1)
+
+
+@override_settings(CROSS_COUNTING_METRICS_TOKEN='', CROSS_COUNTING_METRICS_ALLOWED_NETWORKS=[])
+class MetricsViewTestCase(SimpleTestCase):
+    def test_closed_by_default(self):
+        self.assertEqual(self.client.get('/metrics').status_code, 404)
+
+    @override_settings(CROSS_COUNTING_METRICS_ALLOWED_NETWORKS=['127.0.0.0/8'])
+    def test_exposes_metrics_to_allowed_networks(self):
+        response = self.client.get('/metrics')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(b'cross_counting_ingest_rows_total', response.content)
+        self.assertEqual(self.client.get('/metrics', REMOTE_ADDR='203.0.113.7').status_code, 404)
+
+    @override_settings(CROSS_COUNTING_METRICS_TOKEN='secret')
+    def test_token_opens_the_endpoint(self):
+        self.assertEqual(self.client.get('/metrics', headers={'Authorization': 'Bearer wrong'}).status_code, 404)
+        response = self.client.get('/metrics', headers={'Authorization': 'Bearer secret'})
+        self.assertEqual(response.status_code, 200)
@@ -0,0 +1,115 @@
+import json
+
+from dateutil.parser import parse
+from django.test import SimpleTestCase
+
+from apps.cross_counting.parsers import ROW_FIELDS, PayloadError, decode_payload, parse_alarm_time, parse_cc_payload
+
+SAMPLE_PAYLOAD = {
+    "data": {
+        "subscribe_id": 7,
+        "data_pos": 42,
+        "dev_net_info": [
+            {
+                "device_name": "GV-DNC575-AI",
+                "mac": "8C-1F-64-D5-DB-EF",
+                "ip": "172.17.41.211",
+                "phy": "eth0",
+                "ChannelName": "CH10",
+            }
+        ],
+        "alarm_list": [
+            {
+                "time": "2025-07-31T07:46:02Z+05:30",
+                "channel_alarm": [
+                    {
+                        "cc_alarm_num": {"cc_in_num": 59, "cc_out_num": 96, "cc_total_num": 155},
+                        "int_alarm": {"alarm_val": True, "int_subtype": "cc"},
+                        "record_flag": {"s": "on"},
+                        "channel": "CH1",
+                    },
+                    {
+                        "int_alarm": {"alarm_val": True, "int_subtype": "motion"},
+                        "channel": "CH1",
+                    },
+                ],
+            }
+        ],
+    }
+}
+
+
+class ParseCCPayloadTestCase(SimpleTestCase):
+    def test_cc_alarm_rows(self):
+        channel_name, rows = parse_cc_payload(decode_payload(json.dumps(SAMPLE_PAYLOAD).encode()))
+
+        self.assertEqual(channel_name, "CH10")
+        self.assertEqual(len(rows), 1)
+        row = dict(zip(ROW_FIELDS, rows[0]))
+        self.assertEqual(row["channel"], "CH10")
+        self.assertEqual((row["cc_in_count"], row["cc_out_count"], row["cc_total_count"]), (59, 96, 155))
+        self.assertEqual(row["device_ip"], "172.17.41.211")
+        self.assertEqual(row["record_flag"], "on")
+        self.assertEqual((row["subscribe_id"], row["data_pos"]), (7, 42))
+        self.assertTrue(row["alarm_status"])
+        self.assertEqual(row["alarm_time"], parse("2025-07-31T07:46:02Z+05:30"))
+
+    def test_missing_channel_name_is_rejected(self):
+        with self.assertRaises(PayloadError):
+            parse_cc_payload({"data": {"dev_net_info": [{}], "alarm_list": []}})
+
+    def test_payloads_of_the_wrong_shape_are_rejected(self):
+        for body in (b'[1,2]', b'"x"', b'{"data": null}', b'{"data": {"dev_net_info": []}}',
+                     b'{"data": {"dev_net_info": ["CH1"]}}',
+                     b'{"data": {"dev_net_info": [{"ChannelName": "CH1"}], "alarm_list": {}}}',
+                     b'{"data": {"dev_net_info": [{"ChannelName": ["CH1"]}]}}',
+                     b'{"data": {"dev_net_info": [{"ChannelName": {"CH1": 1}}]}}',
+                     b'{"data": {"dev_net_info": [{"ChannelName": "CH1"}], '
+                     b'"alarm_list": [{"time": "2025-07-31T07:46:02Z+05:30", "channel_alarm": "abc"}]}}'):
+            with self.subTest(body=body), self.assertRaises(PayloadError):
+                parse_cc_payload(decode_payload(body))
+
+    def test_alarm_that_is_not_an_object_is_skipped(self):
+        warnings = []
+        payload = {"data": {"dev_net_info": [{"ChannelName": "CH1"}], "alarm_list": ["alarm"]}}
+        self.assertEqual(parse_cc_payload(payload, warn=warnings.append), ("CH1", []))
+        self.assertEqual(len(warnings), 1)
+
+    def test_channel_alarm_that_is_not_an_object_is_skipped(self):
+        warnings = []
+        payload = json.loads(json.dumps(SAMPLE_PAYLOAD))
+        payload["data"]["alarm_list"][0]["channel_alarm"][:0] = ["cc", ["cc"]]
+        channel_name, rows = parse_cc_payload(payload, warn=warnings.append)
+        self.assertEqual((channel_name, len(rows)), ("CH10", 1))
+        self.assertEqual(len(warnings), 2)
+
+    def test_alarm_without_time_is_skipped(self):
+        warnings = []
+        payload = {"data": {"dev_net_info": [{"ChannelName": "CH1"}], "alarm_list": [{"channel_alarm": []}]}}
+        channel_name, rows = parse_cc_payload(payload, warn=warnings.append)
+        self.assertEqual((channel_name, rows), ("CH1", []))
+        self.assertEqual(len(warnings), 1)
+
+
+class ParseAlarmTimeTestCase(SimpleTestCase):
+    def test_matches_dateutil(self):
+        for value in [
+            "2025-07-31T07:46:02Z+05:30",
+            "2025-07-31T07:46:02Z-03:00",
+            "2025-07-31T07:46:02+05:30",
+            "2025-07-31T07:46:02-0330",
+            "2025-07-31T07:46:02Z",
+            "2025-07-31T07:46:02",
+            "2025-07-31 07:46:02.125Z+05:30",
+            "2025-07-31T07:46:02.5",
+            "31/07/2025 07:46:02",
+        ]:
+            with self.subTest(value=value):
+                expected = parse(value)
+                actual = parse_alarm_time(value)
+                self.assertEqual(actual, expected)
+                self.assertEqual(actual.utcoffset(), expected.utcoffset())
+
+    def test_invalid_date_falls_back_to_dateutil(self):
+        with self.assertRaises(ValueError):
+            parse_alarm_time("2025-02-30T07:46:02Z")
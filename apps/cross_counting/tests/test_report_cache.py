@@ -0,0 +1,61 @@
+from datetime import date, timedelta
+
+from django.core.cache import cache
+from django.test import SimpleTestCase, override_settings
+from django.utils import timezone
+
+from apps.cross_counting import report_cache
+
+DAY = date(2025, 7, 30)
+
+
+@override_settings(
+    CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}},
+    CROSS_COUNTING_REPORT_CACHE_TTL=60,
+)
+class ReportCacheTestCase(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+        self.calls = []
+
+        @report_cache.cached_report('daily')
+        def report(region_id, target_date, include_individual_data=True):
+            self.calls.append((region_id, target_date, include_individual_data))
+            return {'region_id': region_id, 'date': target_date.isoformat(), 'hourly': [{'hour': 0}]}
+
+        self.report = report
+
+    def test_repeated_reports_are_cache_hits(self):
+        first = self.report(1, DAY)
+        second = self.report(1, target_date=DAY)
+
+        self.assertEqual(first, second)
+        self.assertEqual(len(self.calls), 1)
+
+    def test_every_call_returns_a_fresh_copy(self):
+        self.report(1, DAY)['hourly'].append('mutated')
+
+        self.assertEqual(self.report(1, DAY)['hourly'], [{'hour': 0}])
+
+    def test_region_dates_and_options_are_part_of_the_key(self):
+        self.report(1, DAY)
+        self.report(2, DAY)
+        self.report(1, DAY - timedelta(days=1))
+        self.report(1, DAY, include_individual_data=False)
+
+        self.assertEqual(len(self.calls), 4)
+
+    def test_invalidation_orphans_cached_reports(self):
+        self.report(1, DAY)
+        report_cache.invalidate_reports()
+        self.report(1, DAY)
+
+        self.assertEqual(len(self.calls), 2)
+
+    @override_settings(CROSS_COUNTING_PAST_REPORT_CACHE_TTL=7 * 24 * 3600)
+    def test_closed_days_are_kept_for_the_long_ttl(self):
+        today = timezone.localdate()
+
+        self.assertEqual(report_cache.report_timeout([today - timedelta(days=2), today - timedelta(days=1)]),
+                         7 * 24 * 3600)
+        self.assertEqual(report_cache.report_timeout([today - timedelta(days=1), today]), 60)
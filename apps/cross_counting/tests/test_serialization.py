@@ -0,0 +1,48 @@
+import json
+import uuid
+from datetime import date, datetime, timedelta, timezone as dt_timezone
+from decimal import Decimal
+from unittest import mock
+
+from django.test import SimpleTestCase
+
+from apps.cross_counting import serialization
+
+IST = dt_timezone(timedelta(hours=5, minutes=30))
+
+
+class SerializationTestCase(SimpleTestCase):
+    data = {
+        'camera_id': uuid.UUID('12345678-1234-5678-1234-567812345678'),
+        'at': datetime(2025, 7, 31, 13, 45, 0, 250000, tzinfo=IST),
+        'day': date(2025, 7, 31),
+        'ratio': Decimal('1.5'),
+        'hourly': {0: 3},
+        'name': 'Gate </script> & more',
+    }
+
+    def assert_encodes(self):
+        encoded = json.loads(serialization.dumps(self.data))
+
+        self.assertEqual(encoded, {
+            'camera_id': '12345678-1234-5678-1234-567812345678',
+            'at': '2025-07-31T13:45:00.250000+05:30',
+            'day': '2025-07-31',
+            'ratio': '1.5',
+            'hourly': {'0': 3},
+            'name': 'Gate </script> & more',
+        })
+
+    def test_dumps(self):
+        self.assert_encodes()
+
+    def test_dumps_without_orjson(self):
+        with mock.patch.object(serialization, 'orjson', None):
+            self.assert_encodes()
+
+    def test_template_fragment_cannot_close_the_script(self):
+        fragment = serialization.json_for_template(self.data)
+
+        self.assertNotIn('<', fragment)
+        self.assertNotIn('&', fragment)
+        self.assertEqual(json.loads(fragment)['name'], 'Gate </script> & more')
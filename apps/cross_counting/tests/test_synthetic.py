@@ -0,0 +1,88 @@
+import io
+import json
+import uuid
+from datetime import date, datetime, timedelta, timezone as dt_timezone
+
+import numpy as np
+from django.core.management.base import CommandError
+from django.test import SimpleTestCase
+
+from apps.cross_counting.management.commands.benchmark_analytics import Command as BenchmarkCommand
+from apps.cross_counting.parsers import ROW_FIELDS, decode_payload, parse_cc_payload
+from apps.cross_counting.synthetic import camera_day_records, cc_payload, day_counters
+
+DAY = date(2025, 7, 30)
+IN_COUNT = ROW_FIELDS.index('cc_in_count')
+OUT_COUNT = ROW_FIELDS.index('cc_out_count')
+TOTAL_COUNT = ROW_FIELDS.index('cc_total_count')
+
+
+class SyntheticDataTestCase(SimpleTestCase):
+    def test_one_reading_per_cadence_over_the_local_day(self):
+        timestamps, cumulative_in, cumulative_out = day_counters(DAY, cadence=2, rng=np.random.default_rng(1))
+
+        self.assertEqual(len(timestamps), 43200)
+        self.assertEqual(len(cumulative_in), 43200)
+        self.assertEqual(timestamps[0].date(), DAY)
+        self.assertEqual(timestamps[0].hour, 0)
+        self.assertEqual(timestamps[1] - timestamps[0], timedelta(seconds=2))
+        self.assertEqual(timestamps[-1].date(), DAY)
+
+    def test_counters_are_cumulative_and_out_never_exceeds_in(self):
+        _, cumulative_in, cumulative_out = day_counters(DAY, cadence=60, rng=np.random.default_rng(1))
+
+        self.assertTrue((np.diff(cumulative_in) >= 0).all())
+        self.assertTrue((np.diff(cumulative_out) >= 0).all())
+        self.assertTrue((cumulative_out <= cumulative_in).all())
+        self.assertGreater(cumulative_in[-1], 1000)
+
+    def test_counters_reset_every_day(self):
+        rng = np.random.default_rng(1)
+        first = camera_day_records(uuid.uuid4(), 'SYN-R1-C1', '10.0.0.1', DAY, cadence=60, rng=rng)
+        second = camera_day_records(uuid.uuid4(), 'SYN-R1-C1', '10.0.0.1', DAY + timedelta(days=1), cadence=60,
+                                    rng=rng)
+
+        self.assertLess(second[0][2][IN_COUNT], first[-1][2][IN_COUNT])
+        self.assertLess(second[0][2][IN_COUNT], 5)
+
+    def test_records_have_the_ingest_shape(self):
+        camera_id = uuid.uuid4()
+        records = camera_day_records(camera_id, 'SYN-R1-C1', '10.0.0.1', DAY, cadence=3600,
+                                     rng=np.random.default_rng(1))
+
+        self.assertEqual(len(records), 24)
+        record_camera_id, received_at, row = records[-1]
+        self.assertEqual(record_camera_id, camera_id)
+        self.assertEqual(len(row), len(ROW_FIELDS))
+        self.assertEqual(row[ROW_FIELDS.index('channel')], 'SYN-R1-C1')
+        self.assertEqual(row[TOTAL_COUNT], row[IN_COUNT] + row[OUT_COUNT])
+        alarm_time = row[ROW_FIELDS.index('alarm_time')]
+        self.assertTrue(received_at - timedelta(seconds=1) <= alarm_time <= received_at)
+
+
+class BenchmarkBaselineTestCase(SimpleTestCase):
+    def compare(self, median_ms, baseline_ms, tolerance=0.2):
+        command = BenchmarkCommand(stdout=io.StringIO())
+        command._compare({'daily analysis': {'median_ms': median_ms}},
+                         {'daily analysis': {'median_ms': baseline_ms}}, tolerance)
+
+    def test_within_tolerance_passes(self):
+        self.compare(115, 100)
+
+    def test_regression_fails(self):
+        with self.assertRaisesMessage(CommandError, 'daily analysis: median 130.0 ms, baseline 100.0 ms'):
+            self.compare(130, 100)
+
+
+class CCPayloadTestCase(SimpleTestCase):
+    def test_payload_parses_like_a_camera_payload(self):
+        moment = datetime(2025, 7, 31, 17, 9, 9, tzinfo=dt_timezone.utc)
+        payload = cc_payload('SYN-R1-C1', 12, 5, moment, subscribe_id=99, data_pos=7)
+
+        channel_name, rows = parse_cc_payload(decode_payload(json.dumps(payload).encode()))
+
+        self.assertEqual(channel_name, 'SYN-R1-C1')
+        row = dict(zip(ROW_FIELDS, rows[0]))
+        self.assertEqual((row['cc_in_count'], row['cc_out_count'], row['cc_total_count']), (12, 5, 17))
+        self.assertEqual((row['subscribe_id'], row['data_pos']), (99, 7))
+        self.assertEqual(payload['data']['alarm_list'][0]['time'], '2025-07-31T22:39:09Z+05:30')
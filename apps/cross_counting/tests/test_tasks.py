@@ -0,0 +1,58 @@
+from datetime import date
+from unittest import mock
+
+from django.test import SimpleTestCase
+
+from apps.cross_counting import tasks
+
+UTILS = 'apps.cross_counting.utils.TablePartitioningManager'
+
+
+class AnalysisReportTaskTestCase(SimpleTestCase):
+    def test_comparative_report_computes_both_days_first(self):
+        with mock.patch(UTILS) as manager:
+            steps = tasks.report_steps('comparative', 3, [date(2025, 7, 1), date(2025, 7, 2)])
+            for _, step in steps:
+                step()
+
+        self.assertEqual(manager.mock_calls, [
+            mock.call.get_daily_analysis_data(3, date(2025, 7, 1), include_individual_data=False),
+            mock.call.get_daily_analysis_data(3, date(2025, 7, 2), include_individual_data=False),
+            mock.call.get_comparative_analysis_data(3, date(2025, 7, 1), date(2025, 7, 2)),
+        ])
+
+    def test_unknown_report_type(self):
+        with self.assertRaises(ValueError):
+            tasks.report_steps('weekly', 3, [date(2025, 7, 1)])
+
+    def test_task_reports_progress_and_returns_report_arguments(self):
+        with mock.patch(UTILS) as manager, \
+                mock.patch.object(tasks.generate_analysis_report, 'update_state') as update_state:
+            result = tasks.generate_analysis_report.apply(
+                args=('comprehensive', 3, ['2025-07-01', '2025-07-07'])).get()
+
+        manager.get_comprehensive_analysis_data.assert_called_once_with(3, date(2025, 7, 1), date(2025, 7, 7))
+        update_state.assert_called_once_with(state='PROGRESS', meta={
+            'current': 0, 'total': 1, 'step': 'Analysis from 2025-07-01 to 2025-07-07'})
+        self.assertEqual(result, {'report_type': 'comprehensive', 'region_id': 3,
+                                  'dates': ['2025-07-01', '2025-07-07']})
+
+
+class CleanupOldDataTaskTestCase(SimpleTestCase):
+    def test_deletes_in_batches_until_a_short_one(self):
+        batches = []
+
+        def delete(queryset):
+            # The real delete() raises on sliced querysets before reaching the database
+            self.assertFalse(queryset.query.is_sliced)
+            batches.append(str(queryset.query))
+            return (10000, 10000, 3)[len(batches) - 1], {}
+
+        with mock.patch('django.db.models.query.QuerySet.delete', autospec=True, side_effect=delete), \
+                mock.patch('apps.cross_counting.report_cache.invalidate_reports') as invalidate_reports:
+            deleted = tasks.cleanup_old_data.apply(kwargs={'days_to_keep': 30}).get()
+
+        self.assertEqual(deleted, 20003)
+        self.assertEqual(len(batches), 3)
+        self.assertIn('LIMIT 10000', batches[0])
+        invalidate_reports.assert_called_once_with()
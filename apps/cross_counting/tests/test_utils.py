@@ -0,0 +1,27 @@
+import uuid
+from datetime import datetime, timezone as dt_timezone
+
+from django.test import SimpleTestCase
+
+from apps.cross_counting.utils import LatestReadingSnapshot
+
+
+class LatestReadingSnapshotTestCase(SimpleTestCase):
+    def test_build_groups_cameras_by_region(self):
+        cam_a, cam_b = uuid.uuid4(), uuid.uuid4()
+        seen = datetime(2025, 7, 31, 10, 0, tzinfo=dt_timezone.utc)
+        rows = [
+            (1, "Gate", 100, cam_a, "CH1", 12, 20, 32, seen),
+            (1, "Gate", 100, cam_b, "CH2", None, None, None, None),
+            (2, "Hall", 50, None, None, None, None, None, None),
+        ]
+
+        snapshot = LatestReadingSnapshot.build(rows)
+
+        self.assertEqual([region['region_name'] for region in snapshot], ["Gate", "Hall"])
+        gate, hall = snapshot
+        self.assertEqual([camera['camera_name'] for camera in gate['cameras']], ["CH1", "CH2"])
+        self.assertEqual(gate['cameras'][0]['reading']['occupancy'], 0)
+        self.assertEqual(gate['cameras'][0]['reading']['created_at'], seen)
+        self.assertIsNone(gate['cameras'][1]['reading'])
+        self.assertEqual((hall['max_occupancy'], hall['cameras']), (50, []))
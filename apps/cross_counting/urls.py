@@ -12,11 +12,16 @@ urlpatterns = [
     path('analysis/daily/csv/', analysis.daily_analysis_csv, name='daily_analysis_csv'),
     path('analysis/comparative/csv/', analysis.comparative_analysis_csv, name='comparative_analysis_csv'),
     path('analysis/comprehensive/csv/', analysis.comprehensive_analysis_csv, name='comprehensive_analysis_csv'),
+
+    path('analysis/jobs/start/<str:report_type>/', analysis.analysis_job_start, name='analysis_job_start'),
+    path('analysis/jobs/<str:task_id>/status/', analysis.analysis_job_status, name='analysis_job_status'),
+    path('analysis/jobs/<str:task_id>/export/', analysis.analysis_export_download, name='analysis_export_download'),
     
     path('dashboard/', dashboard.enhanced_dashboard, name='enhanced_dashboard'),
     
     path('public/occupancy/', dashboard.public_occupancy_display, name='public_occupancy_display'),
     path('public/occupancy/api/', dashboard.public_occupancy_api, name='public_occupancy_api'),
+    path('public/occupancy/stream/', dashboard.occupancy_stream, name='occupancy_stream'),
     
     # Region Management
     path('config/region/', region.region_list, name='region_list'),
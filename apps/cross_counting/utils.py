@@ -13,35 +13,28 @@ from django.db import connection
 from django.utils import timezone
 from django.utils.timezone import localtime
 
+from .caching import cached
+from .instrumentation import timed
+from .report_cache import cached_report
+
 logger = logging.getLogger(__name__)
 
-def serialize_datetime_data(data):
-    """
-    Recursively serialize datetime and UUID objects in data structures to safe formats
-    for JavaScript consumption
-    """
-    import uuid
-
-    if isinstance(data, datetime):
-        return data.isoformat()
-    elif isinstance(data, date):
-        return data.isoformat()
-    elif isinstance(data, uuid.UUID):
-        return str(data)  # Convert UUID to string
-    elif isinstance(data, dict):
-        return {key: serialize_datetime_data(value) for key, value in data.items()}
-    elif isinstance(data, list):
-        return [serialize_datetime_data(item) for item in data]
-    else:
-        return data
+# Seconds live occupancy and dashboard figures are shared between workers before being recomputed
+OCCUPANCY_CACHE_SECONDS = 5
+DASHBOARD_STATS_CACHE_SECONDS = 60
 
 class CrossCountingAnalytics:
     @staticmethod
-    def refresh_materialized_views():
-        """Refresh materialized views for dashboard queries"""
+    def refresh_materialized_views(days=3):
+        """
+        Refresh the continuous aggregates over the last `days` days (all history when days is None)
+        The refresh policies already do this on a schedule; only buckets with new data are recomputed
+        """
+        window_start = None if days is None else timezone.now() - timedelta(days=days)
         with connection.cursor() as cursor:
-            cursor.execute("REFRESH MATERIALIZED VIEW CONCURRENTLY cross_counting_hourly_aggregates;")
-            cursor.execute("REFRESH MATERIALIZED VIEW CONCURRENTLY cross_counting_daily_peaks;")
+            for view in ('cross_counting_hourly_aggregates', 'cross_counting_daily_peaks',
+                         'cross_counting_camera_hourly_rollup'):
+                cursor.execute("CALL refresh_continuous_aggregate(%s, %s, NULL);", [view, window_start])
 
     @staticmethod
     def get_camera_activity_summary(camera_ids: List[str], hours: int = 24) -> List[Dict[str, Any]]:
@@ -115,6 +108,70 @@ class CrossCountingAnalytics:
             row = cursor.fetchone()
             return dict(zip(columns, row)) if row else {}
 
+class LatestReadingSnapshot:
+    """
+    Latest reading of every active camera, grouped by region, in one query
+    Reads the camera live state kept by the ingest writer (see live_state.py), so page cost does not grow
+    with the camera count or the size of the hypertable
+    """
+
+    @staticmethod
+    def get_snapshot(region_id: int = None, minutes: int = 5) -> List[Dict[str, Any]]:
+        """
+        Return one entry per region (ordered by name) with its active cameras (ordered by name)
+        A camera's 'reading' is None when it has not reported in the last `minutes` minutes
+        """
+        since = timezone.now() - timedelta(minutes=minutes)
+        region_filter = "WHERE r.id = %s" if region_id else ""
+        params = [since] + ([region_id] if region_id else [])
+
+        with connection.cursor() as cursor:
+            cursor.execute(f"""
+                SELECT r.id, r.name, r.occupancy,
+                       c.id, c.name,
+                       l.cc_in_count, l.cc_out_count, l.cc_total_count, l.reading_at
+                FROM cross_counting_region r
+                LEFT JOIN cross_counting_camera c ON c.region_id = r.id AND c.status = true
+                LEFT JOIN cross_counting_camera_live_state l ON l.camera_id = c.id AND l.reading_at >= %s
+                {region_filter}
+                ORDER BY r.name, c.name
+            """, params)
+            rows = cursor.fetchall()
+
+        return LatestReadingSnapshot.build(rows)
+
+    @staticmethod
+    def build(rows) -> List[Dict[str, Any]]:
+        """Group (region_id, region_name, occupancy, camera_id, camera_name, in, out, total, created_at) rows"""
+        regions = {}
+        for (region_id, region_name, max_occupancy, camera_id, camera_name,
+             cc_in_count, cc_out_count, cc_total_count, created_at) in rows:
+            region = regions.get(region_id)
+            if region is None:
+                region = regions[region_id] = {
+                    'region_id': region_id,
+                    'region_name': region_name,
+                    'max_occupancy': max_occupancy,
+                    'cameras': [],
+                }
+            if camera_id is None:
+                continue
+            reading = None
+            if created_at is not None:
+                reading = {
+                    'cc_in_count': cc_in_count,
+                    'cc_out_count': cc_out_count,
+                    'cc_total_count': cc_total_count,
+                    'created_at': created_at,
+                    'occupancy': max(0, cc_in_count - cc_out_count),
+                }
+            region['cameras'].append({
+                'camera_id': camera_id,
+                'camera_name': camera_name,
+                'reading': reading,
+            })
+        return list(regions.values())
+
 class TablePartitioningManager:
     """
     Utilities for managing table partitioning for very high volume data
@@ -122,7 +179,8 @@ class TablePartitioningManager:
     """
 
     @staticmethod
-    def get_daily_analysis_data(region_id: int, date: date) -> Dict[str, Any]:
+    @cached_report('daily')
+    def get_daily_analysis_data(region_id: int, date: date, include_individual_data: bool = True) -> Dict[str, Any]:
         """
         Updated daily analysis using simplified approach
         """
@@ -138,41 +196,40 @@ class TablePartitioningManager:
                 "simplified_analysis": {"individual_camera_data": [], "regional_hourly_data": []}
             }
 
-        print(f"FIXED DEBUG: Analysis for {date}")
-
         # Get traditional summary (peak cumulative counts)
         daily_data = []
         total_peak_in = 0
         total_peak_out = 0
         total_peak_total = 0
 
-        for camera in cameras:
-            daily_stats = CrossCountingData.objects.filter(
-                camera=camera,
-                created_at__date=date
-            ).aggregate(
-                peak_in_count=Max('cc_in_count'),
-                peak_out_count=Max('cc_out_count'),
-                peak_total_count=Max('cc_total_count')
-            )
+        with timed(f"daily summary {date}", logger) as stage:
+            for camera in cameras:
+                daily_stats = CrossCountingData.objects.filter(
+                    camera=camera,
+                    created_at__date=date
+                ).aggregate(
+                    peak_in_count=Max('cc_in_count'),
+                    peak_out_count=Max('cc_out_count'),
+                    peak_total_count=Max('cc_total_count')
+                )
 
-            if daily_stats['peak_in_count'] is not None:
-                camera_data = {
-                    "camera_name": camera.name,
-                    "peak_in": daily_stats['peak_in_count'],
-                    "peak_out": daily_stats['peak_out_count'],
-                    "peak_total": daily_stats['peak_total_count']
-                }
-                daily_data.append(camera_data)
-                total_peak_in += daily_stats['peak_in_count'] or 0
-                total_peak_out += daily_stats['peak_out_count'] or 0
-                total_peak_total += daily_stats['peak_total_count'] or 0
+                if daily_stats['peak_in_count'] is not None:
+                    camera_data = {
+                        "camera_name": camera.name,
+                        "peak_in": daily_stats['peak_in_count'],
+                        "peak_out": daily_stats['peak_out_count'],
+                        "peak_total": daily_stats['peak_total_count']
+                    }
+                    daily_data.append(camera_data)
+                    total_peak_in += daily_stats['peak_in_count'] or 0
+                    total_peak_out += daily_stats['peak_out_count'] or 0
+                    total_peak_total += daily_stats['peak_total_count'] or 0
+            stage.rows = len(daily_data)
+            stage.count(peak_in=total_peak_in, peak_out=total_peak_out)
 
         # Get simplified analysis
-        simplified_analysis = TablePartitioningManager.get_simplified_daily_analysis(region_id, date)
-
-        print(f"FIXED DEBUG: Traditional summary - Cameras: {len(daily_data)}, Peak In: {total_peak_in}")
-        print(f"FIXED DEBUG: Simplified analysis - Individual cameras: {len(simplified_analysis['individual_camera_data'])}")
+        simplified_analysis = TablePartitioningManager.get_simplified_daily_analysis(
+            region_id, date, include_individual_data=include_individual_data)
 
         result = {
             "cameras": daily_data,
@@ -183,57 +240,48 @@ class TablePartitioningManager:
                 "active_cameras": len(daily_data)
             },
             "simplified_analysis": simplified_analysis,
-            "analysis_date": date,
+            "analysis_date": date.isoformat(),
             "analysis_type": "simplified_daily"
         }
 
-        return serialize_datetime_data(result)
+        return result
 
     @staticmethod
-    def get_simplified_daily_analysis(region_id: int, target_date: date) -> Dict[str, Any]:
+    def get_simplified_daily_analysis(region_id: int, target_date: date, include_individual_data: bool = True,
+                                      max_points_per_camera: int = None) -> Dict[str, Any]:
         """
-        FIXED: Use Django ORM, cumulative max logic, proper date handling
+        FIXED: cumulative max logic, proper date handling
+        Regional cumulative maxima are computed in SQL; raw readings are only loaded for the per-camera
+        series, skipped when include_individual_data is False (see daily_analysis.py)
+        Per-camera series are downsampled to max_points_per_camera (CROSS_COUNTING_CHART_POINTS by default)
         """
-        from .models import Camera, CrossCountingData
-        from django.db.models.functions import TruncHour
-
-        local_tz = timezone.get_current_timezone()
-        cameras = Camera.objects.filter(region_id=region_id, status=True)
-        camera_ids = list(cameras.values_list('id', flat=True))
+        from django.conf import settings
 
-        if not camera_ids:
-            return {
-                "individual_camera_data": [],
-                "regional_hourly_data": [],
-                "region_name": "",
-                "camera_count": 0
-            }
-
-        print(f"FIXED CUMULATIVE DEBUG: Analyzing data for {target_date}")
-        print(f"FIXED CUMULATIVE DEBUG: Cameras: {len(camera_ids)}")
+        from . import daily_analysis
+        from .models import Camera
 
-        # Fetch all data using ORM
-        data_qs = CrossCountingData.objects.filter(
-            camera_id__in=camera_ids,
-            created_at__date=target_date
-        ).order_by('camera_id', 'created_at')
+        cameras = Camera.objects.filter(region_id=region_id, status=True).select_related('region')
+        camera_objects = {cam.id: cam for cam in cameras}
+        camera_ids = list(camera_objects)
 
-        all_camera_data = list(
-            data_qs.values('camera_id', 'cc_in_count', 'cc_out_count', 'cc_total_count', 'created_at'))
+        empty_result = {
+            "individual_camera_data": [],
+            "regional_hourly_data": [],
+            "region_name": "",
+            "camera_count": 0
+        }
+        if not camera_ids:
+            return empty_result
 
-        print(f"FIXED CUMULATIVE DEBUG: Retrieved {len(all_camera_data)} total data points")
+        with timed(f"hourly cumulative max {target_date}", logger) as stage:
+            cumulative_in, cumulative_out, max_data_hour = daily_analysis.load_hourly_cumulative_max(
+                camera_ids, target_date)
+            stage.count(cameras=len(camera_ids), max_data_hour=max_data_hour)
 
-        if not all_camera_data:
-            return {
-                "individual_camera_data": [],
-                "regional_hourly_data": [],
-                "region_name": "",
-                "camera_count": 0
-            }
+        if max_data_hour is None:
+            return empty_result
 
         # ULTRA-ROBUST FIX: Force historical analysis for any date that has complete 24-hour data
-        max_data_hour = max(localtime(d['created_at']).hour for d in all_camera_data)
-
         # Get current time in the application's configured timezone
         now_aware = timezone.now()
         current_local = localtime(now_aware)
@@ -248,145 +296,54 @@ class TablePartitioningManager:
 
         if is_clearly_historical or is_current_date_but_has_full_data:
             max_hour = max_data_hour  # Show all available data
-            print(
-                f"FIXED CUMULATIVE DEBUG: Historical/Complete day analysis - using all available hours up to: {max_hour}")
-            if is_clearly_historical:
-                print(f"FIXED CUMULATIVE DEBUG: Date is clearly in the past")
-            if is_current_date_but_has_full_data:
-                print(f"FIXED CUMULATIVE DEBUG: Current date but has near-complete day data ({max_data_hour}+ hours)")
         else:
             # Only limit for truly current/incomplete days
             max_hour = current_hour
-            print(f"FIXED CUMULATIVE DEBUG: Current incomplete day - limiting to current hour: {max_hour}")
-
-        print(f"FIXED CUMULATIVE DEBUG: Max hour: {max_hour}, Max data hour: {max_data_hour}")
-        print(f"FIXED CUMULATIVE DEBUG: Current datetime: {now_aware} (hour {current_hour})")
-        print(f"FIXED CUMULATIVE DEBUG: Current local date: {current_date}, Target date: {target_date}")
-        print(f"FIXED CUMULATIVE DEBUG: Has near full day data: {has_near_full_day_data}")
+        logger.debug("Daily analysis %s: hours up to %s (data up to %s)", target_date, max_hour, max_data_hour)
 
         # Individual camera raw data
         individual_camera_data = []
-        camera_objects = {cam.id: cam for cam in cameras}
-        camera_data_points = defaultdict(list)
-        for row in all_camera_data:
-            created_at_local = localtime(row['created_at'])
-            if created_at_local.hour > max_hour:
-                continue
-            camera_data_points[row['camera_id']].append({
-                'cc_in_count': row['cc_in_count'],
-                'cc_out_count': row['cc_out_count'],
-                'cc_total_count': row['cc_total_count'],
-                'created_at': created_at_local.strftime('%H:%M:%S'),
-                'timestamp': created_at_local
-            })
-
-        for camera_id in camera_ids:
-            if camera_id in camera_objects and camera_id in camera_data_points:
-                data_points = camera_data_points[camera_id]
-                individual_camera_data.append({
-                    'camera_id': str(camera_id),
-                    'camera_name': camera_objects[camera_id].name,
-                    'data_points': data_points,
-                    'total_points': len(data_points),
-                    'first_time': data_points[0]['created_at'] if data_points else '',
-                    'last_time': data_points[-1]['created_at'] if data_points else '',
-                    'max_in': max([p['cc_in_count'] for p in data_points], default=0),
-                    'max_out': max([p['cc_out_count'] for p in data_points], default=0)
-                })
-
-        print(f"FIXED CUMULATIVE DEBUG: Individual camera data prepared for {len(individual_camera_data)} cameras")
-
-        # Group for hourly max
-        camera_hour_data = defaultdict(lambda: defaultdict(list))
-        for row in all_camera_data:
-            created_at_local = localtime(row['created_at'])
-            hour = created_at_local.hour
-            if hour > max_hour:
-                continue
-            camera_hour_data[row['camera_id']][hour].append({
-                'cc_in_count': row['cc_in_count'],
-                'cc_out_count': row['cc_out_count'],
-                'created_at': created_at_local
-            })
-
-        # Cumulative max per camera
-        camera_hourly_values = {}
-        for camera_id in camera_ids:
-            if camera_id not in camera_objects:
-                continue
-            camera_name = camera_objects[camera_id].name
-            camera_hourly_values[camera_id] = {}
-            cumulative_in = 0
-            cumulative_out = 0
-            print(f"FIXED CUMULATIVE DEBUG: Processing {camera_name}")
-            for hour in range(max_hour + 1):
-                if hour in camera_hour_data[camera_id]:
-                    hour_records = camera_hour_data[camera_id][hour]
-                    hour_max_in = max(record['cc_in_count'] for record in hour_records)
-                    hour_max_out = max(record['cc_out_count'] for record in hour_records)
-                    cumulative_in = max(cumulative_in, hour_max_in)
-                    cumulative_out = max(cumulative_out, hour_max_out)
-                    print(f"FIXED CUMULATIVE DEBUG:   Hour {hour}: In={cumulative_in}, Out={cumulative_out} (updated)")
-                else:
-                    if cumulative_in > 0 or cumulative_out > 0:
-                        print(
-                            f"FIXED CUMULATIVE DEBUG:   Hour {hour}: In={cumulative_in}, Out={cumulative_out} (carried forward)")
-                camera_hourly_values[camera_id][hour] = {
-                    'cc_in_count': cumulative_in,
-                    'cc_out_count': cumulative_out
-                }
-
-        # Regional totals
-        regional_hourly_data = []
-        for hour in range(max_hour + 1):
-            total_in = 0
-            total_out = 0
-            active_cameras = 0
-            for camera_id in camera_ids:
-                if camera_id in camera_hourly_values:
-                    values = camera_hourly_values[camera_id][hour]
-                    total_in += values['cc_in_count']
-                    total_out += values['cc_out_count']
-                    if values['cc_in_count'] > 0 or values['cc_out_count'] > 0:
-                        active_cameras += 1
-            regional_hourly_data.append({
-                'hour': hour,
-                'total_in_count': total_in,
-                'total_out_count': total_out,
-                'active_cameras': active_cameras
-            })
-
-        # Debug regional
-        non_zero_hours = [h for h in regional_hourly_data if h['total_in_count'] > 0 or h['total_out_count'] > 0]
-        if non_zero_hours:
-            print(f"FIXED CUMULATIVE DEBUG: Regional data spans hours: {[h['hour'] for h in non_zero_hours]}")
-            for h in non_zero_hours:
-                print(f"FIXED CUMULATIVE DEBUG: Hour {h['hour']}: In={h['total_in_count']}, Out={h['total_out_count']}")
+        if include_individual_data:
+            with timed(f"day readings {target_date}", logger) as stage:
+                readings = daily_analysis.load_day_readings(camera_ids, target_date)
+                stage.rows = len(readings)
+
+            with timed(f"individual camera series {target_date}", logger) as stage:
+                local_us, offset_suffixes = daily_analysis.local_timestamps(
+                    readings[:, daily_analysis.EPOCH_US], target_date)
+                individual_camera_data = daily_analysis.individual_camera_series(
+                    readings, local_us, offset_suffixes, daily_analysis.local_hours(local_us), max_hour, camera_ids,
+                    {camera_id: cam.name for camera_id, cam in camera_objects.items()},
+                    max_points=max_points_per_camera or settings.CROSS_COUNTING_CHART_POINTS,
+                )
+                stage.rows = sum(camera['plotted_points'] for camera in individual_camera_data)
+                stage.count(cameras=len(individual_camera_data))
 
-        region_name = cameras.first().region.name if cameras.exists() else ""
+        # Regional totals of the cumulative max per camera, up to max_hour
+        regional_hourly_data = daily_analysis.regional_hourly_totals(
+            cumulative_in[:, :max_hour + 1], cumulative_out[:, :max_hour + 1])
 
         result = {
             "individual_camera_data": individual_camera_data,
             "regional_hourly_data": regional_hourly_data,
-            "region_name": region_name,
+            "region_name": cameras[0].region.name,
             "camera_count": len(camera_ids),
             "analysis_type": "cumulative_max_carry_forward_no_occupancy",
             "target_date": target_date.strftime('%Y-%m-%d')
         }
 
-        return serialize_datetime_data(result)
+        return result
 
     @staticmethod
+    @cached_report('comparative')
     def get_comparative_analysis_data(region_id: int, base_date: date, compare_date: date) -> Dict[str, Any]:
         """
         Get comparative analysis between two dates for a region
         """
-        base_data = TablePartitioningManager.get_daily_analysis_data(region_id, base_date)
-        compare_data = TablePartitioningManager.get_daily_analysis_data(region_id, compare_date)
-
-        print(f"FIXED DEBUG: Comparative analysis for {base_date} vs {compare_date}")
-        print(f"FIXED DEBUG: Base data cameras: {len(base_data.get('cameras', []))}")
-        print(f"FIXED DEBUG: Compare data cameras: {len(compare_data.get('cameras', []))}")
+        # Only the regional hourly totals are compared, so the raw per-camera series are not loaded
+        base_data = TablePartitioningManager.get_daily_analysis_data(region_id, base_date, include_individual_data=False)
+        compare_data = TablePartitioningManager.get_daily_analysis_data(
+            region_id, compare_date, include_individual_data=False)
 
         comparison = []
         for base_camera in base_data["cameras"]:
@@ -408,11 +365,11 @@ class TablePartitioningManager:
                 "diff_total": compare_camera["peak_total"] - base_camera["peak_total"]
             })
 
-        print(f"FIXED DEBUG: Total base: {sum(c['base_total'] for c in comparison)}, Total compare: {sum(c['compare_total'] for c in comparison)}, Difference: {sum(c['compare_total'] for c in comparison) - sum(c['base_total'] for c in comparison)}")
+        logger.debug("Comparative analysis %s vs %s: %d cameras", base_date, compare_date, len(comparison))
 
         result = {
-            "base_date": base_date,
-            "compare_date": compare_date,
+            "base_date": base_date.isoformat(),
+            "compare_date": compare_date.isoformat(),
             "comparison": comparison,
             "base_summary": base_data["summary"],
             "compare_summary": compare_data["summary"],
@@ -420,9 +377,10 @@ class TablePartitioningManager:
             "compare_hourly_aggregates": compare_data.get("simplified_analysis", {}).get("regional_hourly_data", [])
         }
 
-        return serialize_datetime_data(result)
+        return result
 
     @staticmethod
+    @cached_report('comprehensive')
     def get_comprehensive_analysis_data(region_id: int, from_date: date, to_date: date) -> Dict[str, Any]:
         """
         Get comprehensive analysis for a date range (max 7 days) using created_at
@@ -434,42 +392,42 @@ class TablePartitioningManager:
         cameras = Camera.objects.filter(region_id=region_id, status=True)
         daily_trends = []
 
-        print(f"FIXED DEBUG: Comprehensive analysis from {from_date} to {to_date}")
-
-        for camera in cameras:
-            daily_data = CrossCountingData.objects.filter(
-                camera=camera,
-                created_at__date__gte=from_date,
-                created_at__date__lte=to_date
-            ).annotate(
-                date=TruncDate('created_at')
-            ).values('date').annotate(
-                peak_in_count=Max('cc_in_count'),
-                peak_out_count=Max('cc_out_count'),
-                peak_total_count=Max('cc_total_count')
-            ).order_by('date')
-
-            daily_trends.append({
-                "camera_name": camera.name,
-                "daily_data": list(daily_data)
-            })
+        with timed(f"daily trends {from_date} to {to_date}", logger) as stage:
+            for camera in cameras:
+                daily_data = CrossCountingData.objects.filter(
+                    camera=camera,
+                    created_at__date__gte=from_date,
+                    created_at__date__lte=to_date
+                ).annotate(
+                    date=TruncDate('created_at')
+                ).values('date').annotate(
+                    peak_in_count=Max('cc_in_count'),
+                    peak_out_count=Max('cc_out_count'),
+                    peak_total_count=Max('cc_total_count')
+                ).order_by('date')
+
+                daily_trends.append({
+                    "camera_name": camera.name,
+                    "daily_data": [{**row, "date": row["date"].isoformat()} for row in daily_data]
+                })
+            stage.rows = sum(len(trend['daily_data']) for trend in daily_trends)
+            stage.count(cameras=len(daily_trends))
 
         total_days = (to_date - from_date).days + 1
-        region_hourly_aggregates = TablePartitioningManager.get_simplified_daily_analysis(region_id, from_date)
-
-        print(f"FIXED DEBUG: Analyzed {len(cameras)} cameras over {total_days} days")
-        print(f"FIXED DEBUG: Total daily data points: {sum(len(trend['daily_data']) for trend in daily_trends)}")
+        # The comprehensive page only charts regional totals
+        region_hourly_aggregates = TablePartitioningManager.get_simplified_daily_analysis(
+            region_id, from_date, include_individual_data=False)
 
         result = {
-            "from_date": from_date,
-            "to_date": to_date,
+            "from_date": from_date.isoformat(),
+            "to_date": to_date.isoformat(),
             "total_days": total_days,
             "daily_trends": daily_trends,
             "cameras": [{"id": str(cam.id), "name": cam.name} for cam in cameras],
             "region_hourly_aggregates": region_hourly_aggregates
         }
 
-        return serialize_datetime_data(result)
+        return result
 
     @staticmethod
     def get_hourly_region_aggregates(region_id: int, start_time, end_time) -> Dict[str, Any]:
@@ -493,31 +451,23 @@ class TablePartitioningManager:
             start_time = timezone.make_aware(start_time)
         if end_time.tzinfo is None:
             end_time = timezone.make_aware(end_time)
+        tz_name = timezone.get_current_timezone_name()
 
-        print(f"FIXED DEBUG: Querying hourly data from {start_time} to {end_time}")
-        print(f"FIXED DEBUG: Camera count: {len(camera_ids)}")
-
+        # Last value per camera and TIME_ZONE hour of day, from the hourly rollup (every bucket overlapping
+        # the window)
         with connection.cursor() as cursor:
             cursor.execute("""
-                WITH ranked_data AS (
-                    SELECT camera_id,
-                           cc_in_count,
-                           cc_out_count,
-                           EXTRACT(HOUR FROM created_at) as hour,
-                           created_at,
-                           ROW_NUMBER() OVER (
-                               PARTITION BY camera_id, EXTRACT(HOUR FROM created_at)
-                               ORDER BY created_at DESC
-                           ) as rn
-                    FROM cross_counting_data_timeseries
+                WITH last_values_per_hour AS (
+                    SELECT DISTINCT ON (camera_id, EXTRACT(HOUR FROM hour AT TIME ZONE %s))
+                           camera_id,
+                           EXTRACT(HOUR FROM hour AT TIME ZONE %s) as hour,
+                           last_in_count as cc_in_count,
+                           last_out_count as cc_out_count
+                    FROM cross_counting_camera_hourly_rollup
                     WHERE camera_id = ANY (%s)
-                      AND created_at >= %s
-                      AND created_at < %s
-                ),
-                last_values_per_hour AS (
-                    SELECT camera_id, hour, cc_in_count, cc_out_count
-                    FROM ranked_data
-                    WHERE rn = 1
+                      AND hour > %s - INTERVAL '1 hour'
+                      AND hour < %s
+                    ORDER BY camera_id, EXTRACT(HOUR FROM hour AT TIME ZONE %s), hour DESC
                 ),
                 region_hourly_totals AS (
                     SELECT hour, SUM(cc_in_count) as total_in_count, SUM(cc_out_count) as total_out_count
@@ -533,7 +483,7 @@ class TablePartitioningManager:
                 FROM all_hours ah
                 LEFT JOIN region_hourly_totals rht ON ah.hour = rht.hour
                 ORDER BY ah.hour
-            """, [camera_ids, start_time, end_time])
+            """, [tz_name, tz_name, camera_ids, start_time, end_time, tz_name])
 
             hourly_data = []
             for row in cursor.fetchall():
@@ -543,37 +493,22 @@ class TablePartitioningManager:
                     'total_out_count': int(row[2])
                 })
 
-        non_zero_hours = [h for h in hourly_data if h['total_in_count'] > 0 or h['total_out_count'] > 0]
-        if non_zero_hours:
-            print(f"FIXED DEBUG: Found data for hours: {[h['hour'] for h in non_zero_hours]}")
-            print(f"FIXED DEBUG: Last hour with data: {max([h['hour'] for h in non_zero_hours])}")
-            for h in non_zero_hours[:5]:
-                print(f"FIXED DEBUG: Hour {h['hour']}: In={h['total_in_count']}, Out={h['total_out_count']}")
-
         individual_camera_data = []
         camera_objects = {cam.id: cam for cam in cameras}
 
         with connection.cursor() as cursor:
             cursor.execute("""
-                WITH ranked_camera_data AS (
-                    SELECT camera_id,
-                           cc_in_count,
-                           cc_out_count,
-                           EXTRACT(HOUR FROM created_at) as hour,
-                           created_at,
-                           ROW_NUMBER() OVER (
-                               PARTITION BY camera_id, EXTRACT(HOUR FROM created_at)
-                               ORDER BY created_at DESC
-                           ) as rn
-                    FROM cross_counting_data_timeseries
+                WITH camera_last_values AS (
+                    SELECT DISTINCT ON (camera_id, EXTRACT(HOUR FROM hour AT TIME ZONE %s))
+                           camera_id,
+                           EXTRACT(HOUR FROM hour AT TIME ZONE %s) as hour,
+                           last_in_count as cc_in_count,
+                           last_out_count as cc_out_count
+                    FROM cross_counting_camera_hourly_rollup
                     WHERE camera_id = ANY (%s)
-                      AND created_at >= %s
-                      AND created_at < %s
-                ),
-                camera_last_values AS (
-                    SELECT camera_id, hour, cc_in_count, cc_out_count
-                    FROM ranked_camera_data
-                    WHERE rn = 1
+                      AND hour > %s - INTERVAL '1 hour'
+                      AND hour < %s
+                    ORDER BY camera_id, EXTRACT(HOUR FROM hour AT TIME ZONE %s), hour DESC
                 ),
                 all_hours AS (
                     SELECT generate_series(0, 23) as hour
@@ -590,7 +525,7 @@ class TablePartitioningManager:
                 LEFT JOIN camera_last_values clv
                     ON ac.camera_id = clv.camera_id AND ah.hour = clv.hour
                 ORDER BY ac.camera_id, ah.hour
-            """, [camera_ids, start_time, end_time, camera_ids])
+            """, [tz_name, tz_name, camera_ids, start_time, end_time, tz_name, camera_ids])
 
             camera_data_dict = defaultdict(list)
             for row in cursor.fetchall():
@@ -621,57 +556,38 @@ class TablePartitioningManager:
             "individual_camera_data": individual_camera_data
         }
 
-        return serialize_datetime_data(result)
+        return result
 
     @staticmethod
+    @cached('occupancy', timeout=OCCUPANCY_CACHE_SECONDS)
     def get_current_occupancy_data() -> List[Dict[str, Any]]:
         """
         Get current occupancy percentage for all regions for public display
+        Reads the live state maintained by the ingest writer (see live_state.py)
         """
-        from .models import Region, Camera, CrossCountingData
-        from django.utils import timezone
-        from datetime import timedelta
+        from .live_state import get_region_states
 
-        regions = Region.objects.all()
         occupancy_data = []
 
-        for region in regions:
-            cameras = Camera.objects.filter(region=region, status=True)
-            if not cameras.exists():
-                occupancy_data.append({
-                    "region_name": region.name,
-                    "current_count": 0,
-                    "max_occupancy": region.occupancy,
-                    "occupancy_percentage": 0.0
-                })
-                continue
-
-            current_total = 0
-            recent_time = timezone.now() - timedelta(minutes=5)
-
-            for camera in cameras:
-                latest_data = CrossCountingData.objects.filter(
-                    camera=camera,
-                    created_at__gte=recent_time
-                ).order_by('-created_at').first()
-
-                if latest_data:
-                    camera_occupancy = max(0, latest_data.cc_in_count - latest_data.cc_out_count)
-                    current_total += camera_occupancy
+        for region in get_region_states():
+            current_total = region['current_count']
+            max_occupancy = region['max_occupancy']
 
-            occupancy_percentage = (current_total / region.occupancy * 100) if region.occupancy > 0 else 0.0
+            occupancy_percentage = (current_total / max_occupancy * 100) if max_occupancy > 0 else 0.0
             occupancy_percentage = min(occupancy_percentage, 100.0)
 
             occupancy_data.append({
-                "region_name": region.name,
+                "region_id": region['region_id'],
+                "region_name": region['region_name'],
                 "current_count": current_total,
-                "max_occupancy": region.occupancy,
+                "max_occupancy": max_occupancy,
                 "occupancy_percentage": round(occupancy_percentage, 1)
             })
 
         return occupancy_data
 
     @staticmethod
+    @cached('dashboard_statistics', timeout=DASHBOARD_STATS_CACHE_SECONDS)
     def get_dashboard_statistics() -> Dict[str, Any]:
         """
         Get comprehensive platform statistics for dashboard
@@ -719,47 +635,39 @@ class TablePartitioningManager:
         }
 
     @staticmethod
+    @cached('enhanced_dashboard', timeout=OCCUPANCY_CACHE_SECONDS)
     def get_enhanced_dashboard_data() -> List[Dict[str, Any]]:
         """
         Get region cards data with cameras and their latest counts
         """
-        from .models import Region, Camera, CrossCountingData
-        from django.utils import timezone
-        from datetime import timedelta
-
-        regions = Region.objects.prefetch_related('cameras').all()
         enhanced_data = []
-        recent_time = timezone.now() - timedelta(minutes=5)
 
-        for region in regions:
-            cameras = Camera.objects.filter(region=region, status=True)
+        for region in LatestReadingSnapshot.get_snapshot(minutes=5):
             camera_data = []
             region_total_in = 0
             region_total_out = 0
             region_current_occupancy = 0
 
-            for camera in cameras:
-                latest_data = CrossCountingData.objects.filter(
-                    camera=camera,
-                    created_at__gte=recent_time
-                ).order_by('-created_at').first()
+            for camera in region['cameras']:
+                latest_data = camera['reading']
 
                 if latest_data:
-                    camera_occupancy = max(0, latest_data.cc_in_count - latest_data.cc_out_count)
                     camera_info = {
-                        'name': camera.name,
-                        'latest_in_count': latest_data.cc_in_count,
-                        'latest_out_count': latest_data.cc_out_count,
-                        'current_occupancy': camera_occupancy,
-                        'last_updated': latest_data.created_at,
+                        'camera_id': str(camera['camera_id']),
+                        'name': camera['camera_name'],
+                        'latest_in_count': latest_data['cc_in_count'],
+                        'latest_out_count': latest_data['cc_out_count'],
+                        'current_occupancy': latest_data['occupancy'],
+                        'last_updated': latest_data['created_at'],
                         'status': 'active'
                     }
-                    region_total_in += latest_data.cc_in_count
-                    region_total_out += latest_data.cc_out_count
-                    region_current_occupancy += camera_occupancy
+                    region_total_in += latest_data['cc_in_count']
+                    region_total_out += latest_data['cc_out_count']
+                    region_current_occupancy += latest_data['occupancy']
                 else:
                     camera_info = {
-                        'name': camera.name,
+                        'camera_id': str(camera['camera_id']),
+                        'name': camera['camera_name'],
                         'latest_in_count': 0,
                         'latest_out_count': 0,
                         'current_occupancy': 0,
@@ -769,12 +677,13 @@ class TablePartitioningManager:
 
                 camera_data.append(camera_info)
 
-            occupancy_percentage = (region_current_occupancy / region.occupancy * 100) if region.occupancy > 0 else 0.0
+            max_occupancy = region['max_occupancy']
+            occupancy_percentage = (region_current_occupancy / max_occupancy * 100) if max_occupancy > 0 else 0.0
 
             enhanced_data.append({
-                'region_name': region.name,
-                'region_id': region.id,
-                'max_occupancy': region.occupancy,
+                'region_name': region['region_name'],
+                'region_id': region['region_id'],
+                'max_occupancy': max_occupancy,
                 'current_occupancy': region_current_occupancy,
                 'occupancy_percentage': round(occupancy_percentage, 1),
                 'total_in_count': region_total_in,
@@ -792,6 +701,7 @@ class DataRetentionManager:
         Remove data older than specified days
         """
         from .models import CrossCountingData
+        from django.db.models import Subquery
         from django.utils import timezone
         from datetime import timedelta
 
@@ -800,13 +710,18 @@ class DataRetentionManager:
         total_deleted = 0
 
         while True:
-            deleted_count = CrossCountingData.objects.filter(
-                created_at__lt=cutoff_date
-            )[:batch_size].delete()[0]
+            # delete() refuses sliced querysets, so each batch is picked by primary key
+            batch = CrossCountingData.objects.filter(created_at__lt=cutoff_date).values('pk')[:batch_size]
+            deleted_count = CrossCountingData.objects.filter(pk__in=Subquery(batch)).delete()[0]
             total_deleted += deleted_count
             if deleted_count < batch_size:
                 break
 
+        if total_deleted:
+            # Cached reports on the purged days would outlive their data
+            from .report_cache import invalidate_reports
+            invalidate_reports()
+
         return total_deleted
 
     @staticmethod
@@ -923,50 +838,40 @@ class OccupancyAnalyzer:
         """
         Get real-time occupancy for all regions or specific region
         """
-        from .models import Region, Camera, CrossCountingData
-        from django.utils import timezone
-        from datetime import timedelta
-
-        recent_time = timezone.now() - timedelta(minutes=5)
-        regions = Region.objects.filter(id=region_id) if region_id else Region.objects.all()
         occupancy_data = []
 
-        for region in regions:
-            cameras = Camera.objects.filter(region=region, status=True)
+        for region in LatestReadingSnapshot.get_snapshot(region_id=region_id, minutes=5):
             region_occupancy = 0
             camera_details = []
 
-            for camera in cameras:
-                latest_data = CrossCountingData.objects.filter(
-                    camera=camera,
-                    created_at__gte=recent_time
-                ).order_by('-created_at').first()
+            for camera in region['cameras']:
+                latest_data = camera['reading']
 
                 if latest_data:
-                    camera_occupancy = max(0, latest_data.cc_in_count - latest_data.cc_out_count)
-                    region_occupancy += camera_occupancy
+                    region_occupancy += latest_data['occupancy']
                     camera_details.append({
-                        'camera_name': camera.name,
-                        'current_occupancy': camera_occupancy,
-                        'last_in': latest_data.cc_in_count,
-                        'last_out': latest_data.cc_out_count,
-                        'last_updated': latest_data.created_at
+                        'camera_name': camera['camera_name'],
+                        'current_occupancy': latest_data['occupancy'],
+                        'last_in': latest_data['cc_in_count'],
+                        'last_out': latest_data['cc_out_count'],
+                        'last_updated': latest_data['created_at']
                     })
                 else:
                     camera_details.append({
-                        'camera_name': camera.name,
+                        'camera_name': camera['camera_name'],
                         'current_occupancy': 0,
                         'last_in': 0,
                         'last_out': 0,
                         'last_updated': None
                     })
 
-            occupancy_percentage = (region_occupancy / region.occupancy * 100) if region.occupancy > 0 else 0.0
+            max_occupancy = region['max_occupancy']
+            occupancy_percentage = (region_occupancy / max_occupancy * 100) if max_occupancy > 0 else 0.0
             occupancy_data.append({
-                'region_name': region.name,
-                'region_id': region.id,
+                'region_name': region['region_name'],
+                'region_id': region['region_id'],
                 'current_occupancy': region_occupancy,
-                'max_occupancy': region.occupancy,
+                'max_occupancy': max_occupancy,
                 'occupancy_percentage': round(occupancy_percentage, 1),
                 'cameras': camera_details,
                 'status': 'normal' if occupancy_percentage < 80 else 'high' if occupancy_percentage < 100 else 'overcapacity'
@@ -981,7 +886,7 @@ class OccupancyAnalyzer:
     @staticmethod
     def get_occupancy_trends(region_id: int, hours: int = 24) -> Dict[str, Any]:
         """
-        Get occupancy trends over specified hours
+        Get occupancy trends over specified hours, from the last reading of each camera per hour
         """
         from .models import Camera
         from django.utils import timezone
@@ -997,32 +902,15 @@ class OccupancyAnalyzer:
 
         with connection.cursor() as cursor:
             cursor.execute("""
-                WITH hourly_last_values AS (
-                    SELECT camera_id,
-                           DATE_TRUNC('hour', created_at) as hour_bucket,
-                           cc_in_count,
-                           cc_out_count,
-                           ROW_NUMBER() OVER (
-                               PARTITION BY camera_id, DATE_TRUNC('hour', created_at)
-                               ORDER BY created_at DESC
-                           ) as rn
-                    FROM cross_counting_data_timeseries
-                    WHERE camera_id = ANY (%s)
-                      AND created_at BETWEEN %s AND %s
-                ),
-                camera_hourly_occupancy AS (
-                    SELECT camera_id,
-                           hour_bucket,
-                           GREATEST(0, cc_in_count - cc_out_count) as occupancy
-                    FROM hourly_last_values
-                    WHERE rn = 1
-                )
-                SELECT hour_bucket,
-                       SUM(occupancy) as total_occupancy,
+                SELECT hour as hour_bucket,
+                       SUM(GREATEST(0, last_in_count - last_out_count)) as total_occupancy,
                        COUNT(DISTINCT camera_id) as active_cameras
-                FROM camera_hourly_occupancy
-                GROUP BY hour_bucket
-                ORDER BY hour_bucket
+                FROM cross_counting_camera_hourly_rollup
+                WHERE camera_id = ANY (%s)
+                  AND hour > %s - INTERVAL '1 hour'
+                  AND hour <= %s
+                GROUP BY hour
+                ORDER BY hour
             """, [camera_ids, start_time, end_time])
 
             hourly_data = []
@@ -1115,8 +1003,8 @@ def format_duration(seconds):
         return f"{seconds / 3600:.1f} hours"
 
 __all__ = [
-    'serialize_datetime_data',
     'CrossCountingAnalytics',
+    'LatestReadingSnapshot',
     'TablePartitioningManager',
     'DataRetentionManager',
     'TrafficFlowAnalyzer',
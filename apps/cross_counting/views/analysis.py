@@ -1,58 +1,38 @@
 import logging
-import csv
-import json
-import uuid
-from datetime import datetime, date
+from datetime import date
+from urllib.parse import urlencode
 
+from celery.result import AsyncResult
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required
-from django.http import HttpResponse
+from django.core.files.storage import default_storage
+from django.http import FileResponse, Http404, JsonResponse
 from django.shortcuts import render, get_object_or_404, redirect
+from django.urls import reverse
 from django.utils import timezone
-from django.core.serializers.json import DjangoJSONEncoder
-from django.utils.safestring import mark_safe
+from django.views.decorators.http import require_POST
 
+from .. import metrics
+from ..exports import (EXPORT_DIR, build_export, download_filename, export_name, forget_if_lost, forget_task,
+                       is_ready, queued_task, remember_task)
 from ..forms import DailyAnalysisForm, ComparativeAnalysisForm, ComprehensiveAnalysisForm
 from ..models import Region
+from ..serialization import json_for_template
+from ..tasks import generate_analysis_report, generate_csv_export
 from ..utils import TablePartitioningManager
 
 logger = logging.getLogger('cross_counting.views')
 
-
-class CustomJSONEncoder(DjangoJSONEncoder):
-    """
-    Custom JSON encoder that handles UUID objects and other Django model fields
-    """
-
-    def default(self, obj):
-        if isinstance(obj, uuid.UUID):
-            return str(obj)
-        elif isinstance(obj, (datetime, date)):
-            return obj.isoformat()
-        return super().default(obj)
-
-
-def safe_json_for_template(data):
-    """
-    Convert data to a safe JSON string for template use
-    """
-    try:
-        json_string = json.dumps(data, cls=CustomJSONEncoder, ensure_ascii=False)
-        return mark_safe(json_string)
-    except (TypeError, ValueError) as e:
-        logger.error(f"Error serializing data to JSON: {e}")
-        return mark_safe('{}')
-
-
-def serialize_for_json(data):
-    """
-    Convert data to JSON string using custom encoder, then parse back to ensure clean data
-    """
-    json_string = json.dumps(data, cls=CustomJSONEncoder)
-    return json.loads(json_string)
+# report type -> (form, date fields in report argument order, page that shows the report)
+ANALYSIS_JOBS = {
+    'daily': (DailyAnalysisForm, ('date',), 'cross_counting:daily_analysis'),
+    'comparative': (ComparativeAnalysisForm, ('base_date', 'compare_date'), 'cross_counting:comparative_analysis'),
+    'comprehensive': (ComprehensiveAnalysisForm, ('from_date', 'to_date'), 'cross_counting:comprehensive_analysis'),
+}
 
 
 @login_required(login_url="account_login")
+@metrics.VIEW_SECONDS.labels(view='daily_analysis').time()
 def daily_analysis(request):
     form = DailyAnalysisForm(request.GET or None)
     analysis_data = None
@@ -62,55 +42,18 @@ def daily_analysis(request):
             region = form.cleaned_data['region']
             date = form.cleaned_data['date']
 
-            raw_analysis_data = TablePartitioningManager.get_daily_analysis_data(
-                region.id, date
-            )
-
-            # Serialize the data properly for JavaScript consumption
-            analysis_data = serialize_for_json(raw_analysis_data)
+            # Analysis results are JSON-ready; chart data is encoded once for the page's script
+            analysis_data = TablePartitioningManager.get_daily_analysis_data(region.id, date)
             analysis_data['region'] = region
-
-            # Add safe JSON strings for template use
-            if 'daily_trends' in analysis_data:
-                analysis_data['daily_trends_json'] = safe_json_for_template(analysis_data['daily_trends'])
-
-            if 'region_hourly_aggregates' in analysis_data and analysis_data['region_hourly_aggregates']:
-                analysis_data['region_hourly_json'] = safe_json_for_template(
-                    analysis_data['region_hourly_aggregates'].get('hourly_data', [])
-                )
-                analysis_data['individual_camera_json'] = safe_json_for_template(
-                    analysis_data['region_hourly_aggregates'].get('individual_camera_data', [])
-                )
-
-            # Add safe JSON strings for template use
-            if 'base_hourly_aggregates' in analysis_data and analysis_data['base_hourly_aggregates']:
-                analysis_data['base_hourly_json'] = safe_json_for_template(
-                    analysis_data['base_hourly_aggregates'].get('hourly_data', [])
-                )
-                analysis_data['base_individual_camera_json'] = safe_json_for_template(
-                    analysis_data['base_hourly_aggregates'].get('individual_camera_data', [])
-                )
-
-            if 'compare_hourly_aggregates' in analysis_data and analysis_data['compare_hourly_aggregates']:
-                analysis_data['compare_hourly_json'] = safe_json_for_template(
-                    analysis_data['compare_hourly_aggregates'].get('hourly_data', [])
-                )
-                analysis_data['compare_individual_camera_json'] = safe_json_for_template(
-                    analysis_data['compare_hourly_aggregates'].get('individual_camera_data', [])
-                )
-
-            if 'comparison' in analysis_data:
-                analysis_data['comparison_json'] = safe_json_for_template(analysis_data['comparison'])
             analysis_data['date'] = date
 
-            # Add safe JSON strings for template use
-            if 'region_hourly_aggregates' in analysis_data and analysis_data['region_hourly_aggregates']:
-                analysis_data['region_hourly_json'] = safe_json_for_template(
-                    analysis_data['region_hourly_aggregates'].get('hourly_data', [])
-                )
-                analysis_data['individual_camera_json'] = safe_json_for_template(
-                    analysis_data['region_hourly_aggregates'].get('individual_camera_data', [])
-                )
+            simplified_analysis = analysis_data['simplified_analysis']
+            analysis_data['regional_hourly_json'] = json_for_template(
+                simplified_analysis.get('regional_hourly_data', [])
+            )
+            analysis_data['individual_camera_json'] = json_for_template(
+                simplified_analysis.get('individual_camera_data', [])
+            )
 
             logger.info(f"Daily analysis generated for region {region.name} on {date}")
 
@@ -127,6 +70,7 @@ def daily_analysis(request):
 
 
 @login_required(login_url="account_login")
+@metrics.VIEW_SECONDS.labels(view='comparative_analysis').time()
 def comparative_analysis(request):
     form = ComparativeAnalysisForm(request.GET or None)
     analysis_data = None
@@ -137,12 +81,9 @@ def comparative_analysis(request):
             base_date = form.cleaned_data['base_date']
             compare_date = form.cleaned_data['compare_date']
 
-            raw_analysis_data = TablePartitioningManager.get_comparative_analysis_data(
+            analysis_data = TablePartitioningManager.get_comparative_analysis_data(
                 region.id, base_date, compare_date
             )
-
-            # Serialize the data properly for JavaScript consumption
-            analysis_data = serialize_for_json(raw_analysis_data)
             analysis_data['region'] = region
 
             logger.info(f"Comparative analysis generated for region {region.name}")
@@ -160,6 +101,7 @@ def comparative_analysis(request):
 
 
 @login_required(login_url="account_login")
+@metrics.VIEW_SECONDS.labels(view='comprehensive_analysis').time()
 def comprehensive_analysis(request):
     form = ComprehensiveAnalysisForm(request.GET or None)
     analysis_data = None
@@ -170,12 +112,9 @@ def comprehensive_analysis(request):
             from_date = form.cleaned_data['from_date']
             to_date = form.cleaned_data['to_date']
 
-            raw_analysis_data = TablePartitioningManager.get_comprehensive_analysis_data(
+            analysis_data = TablePartitioningManager.get_comprehensive_analysis_data(
                 region.id, from_date, to_date
             )
-
-            # Serialize the data properly for JavaScript consumption
-            analysis_data = serialize_for_json(raw_analysis_data)
             analysis_data['region'] = region
 
             logger.info(f"Comprehensive analysis generated for region {region.name}")
@@ -192,158 +131,166 @@ def comprehensive_analysis(request):
     return render(request, 'cross_counting/analysis/comprehensive.html', context)
 
 
-@login_required(login_url="account_login")
-def daily_analysis_csv(request):
-    form = DailyAnalysisForm(request.GET or None)
+def _csv_export(request, report_type):
+    """
+    Stream a report's CSV export from storage, queueing it first when it has not been built yet
+    Requests for an export that is already queued or being built share its task instead of queueing another one,
+    unless it failed or no worker picked it up within CROSS_COUNTING_EXPORT_QUEUE_TIMEOUT seconds.
+    """
+    form_class, date_fields, url_name = ANALYSIS_JOBS[report_type]
+    form = form_class(request.GET or None)
 
     if not form.is_valid():
         messages.error(request, "Invalid form data for CSV export.")
-        return redirect('cross_counting:daily_analysis')
+        return redirect(url_name)
 
+    region = form.cleaned_data['region']
+    dates = [form.cleaned_data[field] for field in date_fields]
     try:
-        region = form.cleaned_data['region']
-        date = form.cleaned_data['date']
-
-        analysis_data = TablePartitioningManager.get_daily_analysis_data(
-            region.id, date
-        )
-
-        response = HttpResponse(content_type='text/csv')
-        response['Content-Disposition'] = f'attachment; filename="daily_analysis_{region.name}_{date}.csv"'
-
-        writer = csv.writer(response)
-        writer.writerow(['Daily Analysis Report'])
-        writer.writerow(['Region', region.name])
-        writer.writerow(['Date', date])
-        writer.writerow([])
-
-        writer.writerow(['Summary'])
-        writer.writerow(['Total Peak In', analysis_data['summary']['total_peak_in']])
-        writer.writerow(['Total Peak Out', analysis_data['summary']['total_peak_out']])
-        writer.writerow(['Total Peak Count', analysis_data['summary']['total_peak_total']])
-        writer.writerow(['Active Cameras', analysis_data['summary']['active_cameras']])
-        writer.writerow([])
-
-        writer.writerow(['Camera-wise Peak Counts'])
-        writer.writerow(['Camera Name', 'Peak In', 'Peak Out', 'Peak Total'])
-        for camera in analysis_data['cameras']:
-            writer.writerow([
-                camera['camera_name'],
-                camera['peak_in'],
-                camera['peak_out'],
-                camera['peak_total']
-            ])
-
-        logger.info(f"Daily analysis CSV exported for region {region.name} on {date}")
-        return response
+        name = export_name(report_type, region.id, dates)
+        if not is_ready(name):
+            task_id = queued_task(name)
+            if task_id is not None:
+                result = AsyncResult(task_id)
+                if result.failed():
+                    forget_task(name, task_id)
+                    task_id = None
+                elif _lost_export(task_id, result):
+                    task_id = None
+            if task_id is None:
+                try:
+                    task_id = generate_csv_export.delay(
+                        report_type, region.id, [d.isoformat() for d in dates]).id
+                except Exception as e:
+                    logger.warning(f"Background export unavailable, exporting {report_type} CSV inline: {e}")
+                    name = build_export(report_type, region.id, dates)
+                    metrics.EXPORTS.labels(report_type=report_type, result='built_inline').inc()
+                else:
+                    remember_task(name, task_id)
+
+            if task_id is not None:
+                logger.info(f"{report_type.capitalize()} analysis CSV for region {region.name} queued as {task_id}")
+                metrics.EXPORTS.labels(report_type=report_type, result='queued').inc()
+                return render(request, 'cross_counting/analysis/export_pending.html', {
+                    'title': 'Preparing CSV Export',
+                    'status_url': reverse('cross_counting:analysis_job_status', args=[task_id]),
+                    'back_url': analysis_report_url(report_type, region.id, [d.isoformat() for d in dates]),
+                })
+
+        logger.info(f"{report_type.capitalize()} analysis CSV exported for region {region.name}")
+        metrics.EXPORTS.labels(report_type=report_type, result='served').inc()
+        return FileResponse(default_storage.open(name, 'rb'), as_attachment=True,
+                            filename=download_filename(report_type, region.name, dates),
+                            content_type='text/csv')
 
     except Exception as e:
-        logger.error(f"Error exporting daily analysis CSV: {e}")
+        logger.error(f"Error exporting {report_type} analysis CSV: {e}")
         messages.error(request, "An error occurred while exporting the CSV.")
-        return redirect('cross_counting:daily_analysis')
+        return redirect(url_name)
 
 
 @login_required(login_url="account_login")
+@metrics.VIEW_SECONDS.labels(view='daily_analysis_csv').time()
+def daily_analysis_csv(request):
+    return _csv_export(request, 'daily')
+
+
+@login_required(login_url="account_login")
+@metrics.VIEW_SECONDS.labels(view='comparative_analysis_csv').time()
 def comparative_analysis_csv(request):
-    form = ComparativeAnalysisForm(request.GET or None)
+    return _csv_export(request, 'comparative')
 
-    if not form.is_valid():
-        messages.error(request, "Invalid form data for CSV export.")
-        return redirect('cross_counting:comparative_analysis')
 
-    try:
-        region = form.cleaned_data['region']
-        base_date = form.cleaned_data['base_date']
-        compare_date = form.cleaned_data['compare_date']
-
-        analysis_data = TablePartitioningManager.get_comparative_analysis_data(
-            region.id, base_date, compare_date
-        )
-
-        response = HttpResponse(content_type='text/csv')
-        response[
-            'Content-Disposition'] = f'attachment; filename="comparative_analysis_{region.name}_{base_date}_vs_{compare_date}.csv"'
-
-        writer = csv.writer(response)
-        writer.writerow(['Comparative Analysis Report'])
-        writer.writerow(['Region', region.name])
-        writer.writerow(['Base Date', base_date])
-        writer.writerow(['Compare Date', compare_date])
-        writer.writerow([])
-
-        writer.writerow(['Camera-wise Comparison'])
-        writer.writerow(
-            ['Camera Name', 'Base In', 'Base Out', 'Base Total', 'Compare In', 'Compare Out', 'Compare Total',
-             'Diff In', 'Diff Out', 'Diff Total'])
-        for camera in analysis_data['comparison']:
-            writer.writerow([
-                camera['camera_name'],
-                camera['base_in'],
-                camera['base_out'],
-                camera['base_total'],
-                camera['compare_in'],
-                camera['compare_out'],
-                camera['compare_total'],
-                camera['diff_in'],
-                camera['diff_out'],
-                camera['diff_total']
-            ])
-
-        logger.info(f"Comparative analysis CSV exported for region {region.name}")
-        return response
+@login_required(login_url="account_login")
+@metrics.VIEW_SECONDS.labels(view='comprehensive_analysis_csv').time()
+def comprehensive_analysis_csv(request):
+    return _csv_export(request, 'comprehensive')
+
 
+def _lost_export(task_id, result):
+    """Whether `result` is an export task still queued past its deadline; it is revoked and forgotten"""
+    if result.state != 'PENDING' or not forget_if_lost(task_id):
+        return False
+    logger.error(f"CSV export {task_id} was not picked up by a worker in time")
+    try:
+        result.revoke()
     except Exception as e:
-        logger.error(f"Error exporting comparative analysis CSV: {e}")
-        messages.error(request, "An error occurred while exporting the CSV.")
-        return redirect('cross_counting:comparative_analysis')
+        logger.warning(f"Could not revoke CSV export {task_id}: {e}")
+    return True
 
 
-@login_required(login_url="account_login")
-def comprehensive_analysis_csv(request):
-    form = ComprehensiveAnalysisForm(request.GET or None)
+def analysis_report_url(report_type, region_id, dates):
+    _, date_fields, url_name = ANALYSIS_JOBS[report_type]
+    return f"{reverse(url_name)}?{urlencode({'region': region_id, **dict(zip(date_fields, dates))})}"
+
 
+@login_required(login_url="account_login")
+@require_POST
+def analysis_job_start(request, report_type):
+    """Queue an analysis report in the background; the page polls analysis_job_status and then loads it"""
+    if report_type not in ANALYSIS_JOBS:
+        raise Http404("Unknown report type")
+    form_class, date_fields, _ = ANALYSIS_JOBS[report_type]
+
+    form = form_class(request.POST)
     if not form.is_valid():
-        messages.error(request, "Invalid form data for CSV export.")
-        return redirect('cross_counting:comprehensive_analysis')
+        return JsonResponse({'success': False, 'errors': form.errors}, status=400)
 
+    region = form.cleaned_data['region']
+    dates = [form.cleaned_data[field].isoformat() for field in date_fields]
     try:
-        region = form.cleaned_data['region']
-        from_date = form.cleaned_data['from_date']
-        to_date = form.cleaned_data['to_date']
-
-        analysis_data = TablePartitioningManager.get_comprehensive_analysis_data(
-            region.id, from_date, to_date
-        )
-
-        response = HttpResponse(content_type='text/csv')
-        response[
-            'Content-Disposition'] = f'attachment; filename="comprehensive_analysis_{region.name}_{from_date}_to_{to_date}.csv"'
-
-        writer = csv.writer(response)
-        writer.writerow(['Comprehensive Analysis Report'])
-        writer.writerow(['Region', region.name])
-        writer.writerow(['From Date', from_date])
-        writer.writerow(['To Date', to_date])
-        writer.writerow(['Total Days', analysis_data['total_days']])
-        writer.writerow([])
-
-        writer.writerow(['Daily Trends by Camera'])
-        for camera_trend in analysis_data['daily_trends']:
-            writer.writerow([])
-            writer.writerow(['Camera', camera_trend['camera_name']])
-            writer.writerow(['Date', 'Peak In', 'Peak Out', 'Peak Total'])
-            for daily_data in camera_trend['daily_data']:
-                writer.writerow([
-                    daily_data['date'],
-                    daily_data['peak_in_count'],
-                    daily_data['peak_out_count'],
-                    daily_data['peak_total_count']
-                ])
-
-        logger.info(f"Comprehensive analysis CSV exported for region {region.name}")
-        return response
-
+        task = generate_analysis_report.delay(report_type, region.id, dates)
     except Exception as e:
-        logger.error(f"Error exporting comprehensive analysis CSV: {e}")
-        messages.error(request, "An error occurred while exporting the CSV.")
-        return redirect('cross_counting:comprehensive_analysis')
\ No newline at end of file
+        logger.error(f"Error queueing {report_type} analysis: {e}")
+        return JsonResponse({'success': False, 'error': 'Background processing is unavailable'}, status=503)
+
+    logger.info(f"Queued {report_type} analysis for region {region.name} as task {task.id}")
+    return JsonResponse({
+        'success': True,
+        'task_id': task.id,
+        'status_url': reverse('cross_counting:analysis_job_status', args=[task.id]),
+    })
+
+
+@login_required(login_url="account_login")
+def analysis_job_status(request, task_id):
+    """Progress of a background analysis report or CSV export, with its URL once it is ready"""
+    result = AsyncResult(task_id)
+    data = {'state': result.state}
+
+    if result.state == 'PROGRESS':
+        data.update(result.info or {})
+    elif _lost_export(task_id, result):
+        data['error'] = 'No worker picked up the export. Please try again later.'
+    elif result.successful():
+        report = result.result
+        if 'export' in report:
+            # The exact file the task wrote; the export name of a range with today moves on every TTL
+            data['result_url'] = reverse('cross_counting:analysis_export_download', args=[task_id])
+        else:
+            data['result_url'] = analysis_report_url(report['report_type'], report['region_id'], report['dates'])
+    elif result.failed():
+        logger.error(f"Background analysis {task_id} failed: {result.result}")
+        data['error'] = 'An error occurred while generating the analysis.'
+
+    return JsonResponse(data)
+
+
+@login_required(login_url="account_login")
+def analysis_export_download(request, task_id):
+    """Serve the CSV export written by a finished generate_csv_export task"""
+    result = AsyncResult(task_id)
+    if not result.successful() or 'export' not in (result.result or {}):
+        raise Http404("Export not found")
+
+    export = result.result
+    name = export['export']
+    if not name.startswith(f"{EXPORT_DIR}/") or not is_ready(name):
+        raise Http404("Export not found")
+
+    region = get_object_or_404(Region, pk=export['region_id'])
+    dates = [date.fromisoformat(value) for value in export['dates']]
+    metrics.EXPORTS.labels(report_type=export['report_type'], result='served').inc()
+    return FileResponse(default_storage.open(name, 'rb'), as_attachment=True,
+                        filename=download_filename(export['report_type'], region.name, dates),
+                        content_type='text/csv')
@@ -67,7 +67,7 @@ def camera_create(request):
                 messages.error(request, "An error occurred while creating the camera. Please try again.")
         else:
             messages.error(request, "Please correct the errors below.")
-            print(form.errors)
+            logger.debug(f"Camera form errors: {form.errors.as_json()}")
     else:
         form = CameraForm()
     
@@ -1,10 +1,12 @@
 import logging
 from django.contrib.auth.decorators import login_required
 from django.shortcuts import render
-from django.http import JsonResponse
+from django.core.handlers.asgi import ASGIRequest
+from django.http import JsonResponse, StreamingHttpResponse
 from django.views.decorators.cache import cache_page
 from django.utils import timezone
 
+from ..events import astream_events, stream_events
 from ..utils import TablePartitioningManager, CrossCountingAnalytics
 
 logger = logging.getLogger('cross_counting.views')
@@ -66,3 +68,20 @@ def public_occupancy_api(request):
             'success': False,
             'error': 'Unable to load occupancy data'
         }, status=500)
+
+
+def occupancy_stream(request):
+    """
+    Server-sent events with live occupancy: a snapshot on connect, then per-region deltas as ingest commits
+    Signed-in users also receive per-camera deltas (?cameras=1)
+    """
+    include_cameras = request.GET.get('cameras') == '1' and request.user.is_authenticated
+    if isinstance(request, ASGIRequest):
+        events = astream_events(include_cameras=include_cameras)
+    else:
+        events = stream_events(include_cameras=include_cameras)
+
+    response = StreamingHttpResponse(events, content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
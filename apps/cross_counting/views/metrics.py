@@ -0,0 +1,34 @@
+import ipaddress
+import os
+
+from django.conf import settings
+from django.http import Http404, HttpResponse
+from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, generate_latest, multiprocess
+
+
+def _allowed(request):
+    token = settings.CROSS_COUNTING_METRICS_TOKEN
+    if token and request.headers.get('Authorization') == f'Bearer {token}':
+        return True
+    try:
+        address = ipaddress.ip_address(request.META.get('REMOTE_ADDR', ''))
+    except ValueError:
+        return False
+    return any(address in ipaddress.ip_network(network, strict=False)
+               for network in settings.CROSS_COUNTING_METRICS_ALLOWED_NETWORKS)
+
+
+def metrics_view(request):
+    """
+    Prometheus scrape endpoint
+    Closed by default: scrapers must send CROSS_COUNTING_METRICS_TOKEN as a bearer token or connect from one
+    of CROSS_COUNTING_METRICS_ALLOWED_NETWORKS. Anyone else gets a 404.
+    """
+    if not _allowed(request):
+        raise Http404
+
+    registry = REGISTRY
+    if 'PROMETHEUS_MULTIPROC_DIR' in os.environ:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    return HttpResponse(generate_latest(registry), content_type=CONTENT_TYPE_LATEST)
@@ -0,0 +1,145 @@
+"""
+Opt-in per-request SQL profiling
+Records every query a request runs: the count, total SQL time, the slowest statements and statements that
+ran more than once with the same shape (N+1 candidates). The figures go out as a Server-Timing header, which
+browser dev tools show next to the request, and as one log line on "apps.web.middleware.query_profiler".
+
+Enable with QUERY_PROFILER_ENABLED; only paths under QUERY_PROFILER_PATH_PREFIXES are profiled. A request
+that runs more than its budget (@query_budget on the view, else QUERY_PROFILER_BUDGET) is logged as a
+warning, or raises QueryBudgetExceeded when QUERY_PROFILER_RAISE is set, which fails the test that made it.
+Streaming responses are not profiled: their body, and the queries that produce it, runs after the middleware
+has returned.
+"""
+
+import logging
+import re
+import time
+from collections import Counter
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+SLOWEST_COUNT = 3
+_STATEMENT_PREVIEW = 200
+
+_WHITESPACE = re.compile(r'\s+')
+_LITERALS = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+_LISTS = re.compile(r'\((?:\s*(?:%s|\?)\s*,)+\s*(?:%s|\?)\s*\)')
+
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+
+def query_budget(max_queries):
+    """Allow the decorated view at most `max_queries` queries per request"""
+
+    def decorator(view_func):
+        view_func.query_budget = max_queries
+        return view_func
+
+    return decorator
+
+
+def fingerprint(sql):
+    """The statement's shape: literals and IN-list lengths replaced, whitespace collapsed"""
+    sql = _LITERALS.sub('?', _WHITESPACE.sub(' ', sql).strip())
+    return _LISTS.sub('(...)', sql)
+
+
+class QueryProfile:
+    """Database execute wrapper that records the statements run through it"""
+
+    def __init__(self):
+        self.queries = []
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries.append((sql, time.perf_counter() - started))
+
+    @property
+    def count(self):
+        return len(self.queries)
+
+    @property
+    def total_ms(self):
+        return sum(duration for _, duration in self.queries) * 1000
+
+    def slowest(self, limit=SLOWEST_COUNT):
+        return sorted(self.queries, key=lambda query: query[1], reverse=True)[:limit]
+
+    def duplicates(self):
+        """(fingerprint, times run) of statements that ran more than once, most repeated first"""
+        counts = Counter(fingerprint(sql) for sql, _ in self.queries)
+        return [(shape, times) for shape, times in counts.most_common() if times > 1]
+
+
+class QueryProfilerMiddleware:
+    def __init__(self, get_response):
+        if not settings.QUERY_PROFILER_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not request.path.startswith(tuple(settings.QUERY_PROFILER_PATH_PREFIXES)):
+            return self.get_response(request)
+
+        profile = QueryProfile()
+        request.query_budget = settings.QUERY_PROFILER_BUDGET
+        started = time.perf_counter()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(profile))
+            response = self.get_response(request)
+        if response.streaming:
+            # Counting only the queries made before the first chunk would under-report them
+            return response
+        total_ms = (time.perf_counter() - started) * 1000
+
+        response['Server-Timing'] = (
+            f'db;dur={profile.total_ms:.1f};desc="{profile.count} queries", app;dur={total_ms:.1f}'
+        )
+        self._log(request, response, profile, total_ms)
+        self._check_budget(request, profile)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        budget = getattr(view_func, 'query_budget', None)
+        if budget is not None:
+            request.query_budget = budget
+
+    def _log(self, request, response, profile, total_ms):
+        duplicates = profile.duplicates()
+        message = (
+            f"{request.method} {request.path} {response.status_code}: {profile.count} queries, "
+            f"{profile.total_ms:.1f} ms SQL of {total_ms:.1f} ms"
+        )
+        if duplicates:
+            shape, times = duplicates[0]
+            message += f", {len(duplicates)} repeated (x{times}: {shape[:_STATEMENT_PREVIEW]})"
+        logger.info(message, extra={
+            'path': request.path,
+            'queries': profile.count,
+            'sql_ms': round(profile.total_ms, 3),
+            'total_ms': round(total_ms, 3),
+            'duplicates': duplicates,
+        })
+        for sql, duration in profile.slowest():
+            logger.debug(f"{duration * 1000:.1f} ms: {sql[:_STATEMENT_PREVIEW]}")
+
+    def _check_budget(self, request, profile):
+        budget = getattr(request, 'query_budget', None)
+        if budget is None or profile.count <= budget:
+            return
+
+        message = f"{request.path} ran {profile.count} queries, over its budget of {budget}"
+        if settings.QUERY_PROFILER_RAISE:
+            raise QueryBudgetExceeded(message)
+        logger.warning(message)
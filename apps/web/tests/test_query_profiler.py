@@ -0,0 +1,84 @@
+from django.db import connection
+from django.http import HttpResponse, StreamingHttpResponse
+from django.test import RequestFactory, SimpleTestCase, override_settings
+
+from apps.web.middleware.query_profiler import (
+    QueryBudgetExceeded, QueryProfile, QueryProfilerMiddleware, fingerprint, query_budget,
+)
+
+CAMERA_QUERY = 'SELECT "name" FROM "cross_counting_camera" WHERE "region_id" = %s'
+
+
+def run_queries(*statements):
+    """Pass statements through the installed execute wrappers without a database"""
+    for sql in statements:
+        for wrapper in connection.execute_wrappers:
+            wrapper(lambda *args: None, sql, (1,), False, {})
+
+
+class QueryProfileTestCase(SimpleTestCase):
+    def test_fingerprint_ignores_literals_and_list_lengths(self):
+        self.assertEqual(
+            fingerprint("SELECT * FROM t WHERE id IN (%s, %s, %s) AND name = 'CH1'"),
+            fingerprint("SELECT *\n  FROM t WHERE id IN (%s, %s) AND name = 'CH2'"),
+        )
+
+    def test_duplicates_and_slowest(self):
+        profile = QueryProfile()
+        profile.queries = [(CAMERA_QUERY, 0.002), ('SELECT 1', 0.010), (CAMERA_QUERY, 0.001)]
+
+        self.assertEqual(profile.duplicates(), [(fingerprint(CAMERA_QUERY), 2)])
+        self.assertEqual(profile.slowest(1), [('SELECT 1', 0.010)])
+        self.assertAlmostEqual(profile.total_ms, 13)
+
+
+@override_settings(
+    QUERY_PROFILER_ENABLED=True,
+    QUERY_PROFILER_PATH_PREFIXES=['/cross/'],
+    QUERY_PROFILER_BUDGET=None,
+    QUERY_PROFILER_RAISE=True,
+)
+class QueryProfilerMiddlewareTestCase(SimpleTestCase):
+    def get(self, view, path='/cross/dashboard/'):
+        middleware = QueryProfilerMiddleware(lambda request: middleware.process_view(request, view, (), {}) or
+                                             view(request))
+        return middleware(RequestFactory().get(path))
+
+    def setUp(self):
+        def view(request):
+            run_queries(CAMERA_QUERY, CAMERA_QUERY, 'SELECT 1')
+            return HttpResponse()
+
+        self.view = view
+
+    def test_server_timing_and_log_line(self):
+        with self.assertLogs('apps.web.middleware.query_profiler', level='INFO') as logs:
+            response = self.get(self.view)
+
+        self.assertRegex(response['Server-Timing'], r'^db;dur=[\d.]+;desc="3 queries", app;dur=[\d.]+$')
+        self.assertIn('3 queries', logs.output[0])
+        self.assertIn('1 repeated (x2', logs.output[0])
+
+    def test_other_paths_are_not_profiled(self):
+        response = self.get(self.view, path='/accounts/login/')
+
+        self.assertNotIn('Server-Timing', response)
+
+    def test_streaming_responses_are_not_profiled(self):
+        def view(request):
+            run_queries(CAMERA_QUERY, CAMERA_QUERY, 'SELECT 1')
+            return StreamingHttpResponse(iter([b'chunk']))
+
+        with self.assertNoLogs('apps.web.middleware.query_profiler'):
+            response = self.get(query_budget(2)(view))
+
+        self.assertNotIn('Server-Timing', response)
+
+    def test_view_over_its_budget_fails(self):
+        with self.assertLogs('apps.web.middleware.query_profiler'), self.assertRaises(QueryBudgetExceeded):
+            self.get(query_budget(2)(self.view))
+
+    @override_settings(QUERY_PROFILER_BUDGET=3)
+    def test_view_within_the_default_budget_passes(self):
+        with self.assertLogs('apps.web.middleware.query_profiler'):
+            self.assertEqual(self.get(self.view).status_code, 200)
@@ -2,6 +2,7 @@ import os
 from pathlib import Path
 
 import environ
+from celery.schedules import crontab
 from django.utils.translation import gettext_lazy
 
 # Initialize environment variables
@@ -38,6 +39,7 @@ THIRD_PARTY_APPS = [
     "django_otp",
     "django_otp.plugins.otp_totp",
     "django_otp.plugins.otp_static",
+    "django_celery_beat",
 ]
 
 LOCAL_APPS = [
@@ -57,6 +59,7 @@ MIDDLEWARE = [
     "allauth.account.middleware.AccountMiddleware",
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'apps.web.middleware.query_profiler.QueryProfilerMiddleware',
 ]
 
 ROOT_URLCONF = 'opjindal.urls'
@@ -226,8 +229,52 @@ else:
 if REDIS_URL.startswith("rediss"):
     REDIS_URL = f"{REDIS_URL}?ssl_cert_reqs=none"
 
+# Shared by every web worker and the ingest processes; a Redis outage degrades to cache misses
+CACHES = {
+    "default": {
+        "BACKEND": "django_redis.cache.RedisCache",
+        "LOCATION": REDIS_URL,
+        "KEY_PREFIX": "opjindal",
+        "OPTIONS": {
+            "CLIENT_CLASS": "django_redis.client.DefaultClient",
+            "SOCKET_CONNECT_TIMEOUT": 1,
+            "SOCKET_TIMEOUT": 1,
+            "IGNORE_EXCEPTIONS": True,
+        },
+    }
+}
+DJANGO_REDIS_LOG_IGNORED_EXCEPTIONS = True
+
 CELERY_BROKER_URL = CELERY_RESULT_BACKEND = REDIS_URL
 CELERY_BEAT_SCHEDULER = "django_celery_beat.schedulers:DatabaseScheduler"
+CELERY_TIMEZONE = TIME_ZONE
+CELERY_TASK_TRACK_STARTED = True
+CELERY_RESULT_EXPIRES = 60 * 60 * 24
+
+# Installed into the database scheduler when beat starts; times are in CELERY_TIMEZONE
+CELERY_BEAT_SCHEDULE = {
+    "refresh-continuous-aggregates": {
+        # The refresh policies keep aggregates current; this catches late-arriving data for closed days
+        "task": "apps.cross_counting.tasks.refresh_continuous_aggregates",
+        "schedule": crontab(minute=15, hour=1),
+        "kwargs": {"days": 3},
+    },
+    "cleanup-old-cross-counting-data": {
+        "task": "apps.cross_counting.tasks.cleanup_old_data",
+        "schedule": crontab(minute=30, hour=2),
+    },
+    "analyze-cross-counting-data": {
+        "task": "apps.cross_counting.tasks.optimize_table_maintenance",
+        "schedule": crontab(minute=0, hour=3),
+    },
+    "cleanup-cross-counting-exports": {
+        "task": "apps.cross_counting.tasks.cleanup_exports",
+        "schedule": crontab(minute=45, hour=3),
+    },
+}
+
+# Days of raw readings kept by the nightly retention task
+CROSS_COUNTING_RETENTION_DAYS = env.int("CROSS_COUNTING_RETENTION_DAYS", default=90)
 
 PROJECT_METADATA = {
     "NAME": gettext_lazy("clarify"),
@@ -240,6 +287,28 @@ PROJECT_METADATA = {
 
 USE_HTTPS_IN_ABSOLUTE_URLS = env.bool("USE_HTTPS_IN_ABSOLUTE_URLS", default=False)
 
+# Most points plotted per camera on the daily analysis charts; longer series are downsampled
+CROSS_COUNTING_CHART_POINTS = env.int("CROSS_COUNTING_CHART_POINTS", default=1200)
+
+# Seconds an analysis report that includes today stays cached
+CROSS_COUNTING_REPORT_CACHE_TTL = env.int("CROSS_COUNTING_REPORT_CACHE_TTL", default=60)
+# Seconds a report on past days stays cached; finite so that entries orphaned by a camera-set change expire
+CROSS_COUNTING_PAST_REPORT_CACHE_TTL = env.int("CROSS_COUNTING_PAST_REPORT_CACHE_TTL", default=7 * 24 * 3600)
+# Seconds a queued CSV export may wait for a worker before the progress page reports an error
+CROSS_COUNTING_EXPORT_QUEUE_TIMEOUT = env.int("CROSS_COUNTING_EXPORT_QUEUE_TIMEOUT", default=300)
+
+# /metrics answers 404 unless the scraper sends this bearer token or connects from one of these networks (CIDR)
+CROSS_COUNTING_METRICS_TOKEN = env("CROSS_COUNTING_METRICS_TOKEN", default="")
+CROSS_COUNTING_METRICS_ALLOWED_NETWORKS = env.list("CROSS_COUNTING_METRICS_ALLOWED_NETWORKS", default=[])
+
+# Per-request SQL profiling (apps/web/middleware/query_profiler.py): Server-Timing header and a log line
+QUERY_PROFILER_ENABLED = env.bool("QUERY_PROFILER_ENABLED", default=False)
+QUERY_PROFILER_PATH_PREFIXES = ["/cross/"]
+# Most queries a profiled request may run (views can set their own with @query_budget); None for no limit
+QUERY_PROFILER_BUDGET = env.int("QUERY_PROFILER_BUDGET", default=None)
+# Raise QueryBudgetExceeded instead of logging a warning, to fail tests
+QUERY_PROFILER_RAISE = env.bool("QUERY_PROFILER_RAISE", default=False)
+
 LOGGING = {
     "version": 1,
     "disable_existing_loggers": False,
@@ -262,6 +331,19 @@ LOGGING = {
             "handlers": ["console"],
             "level": env("CLARIFY_LOG_LEVEL", default="INFO"),
         },
+        "apps.web.middleware.query_profiler": {
+            "handlers": ["console"],
+            "level": env("QUERY_PROFILER_LOG_LEVEL", default="INFO"),
+        },
+        # DEBUG adds per-stage timings, query and row counts of the analyses (apps/cross_counting/instrumentation.py)
+        "apps.cross_counting": {
+            "handlers": ["console"],
+            "level": env("CROSS_COUNTING_LOG_LEVEL", default="INFO"),
+        },
+        "cross_counting": {
+            "handlers": ["console"],
+            "level": env("CROSS_COUNTING_LOG_LEVEL", default="INFO"),
+        },
     },
 }
 
@@ -6,6 +6,7 @@ from django.urls import path, include
 from django.views.generic import RedirectView
 from drf_spectacular.views import SpectacularAPIView, SpectacularSwaggerView
 
+from apps.cross_counting.views.metrics import metrics_view
 from apps.web.sitemaps import StaticViewSitemap
 
 sitemaps = {
@@ -22,6 +23,7 @@ urlpatterns = [
                   path("", include("apps.web.urls")),
                   # APPS URL
                   path("cross/", include('apps.cross_counting.urls')),
+                  path("metrics", metrics_view, name="metrics"),
                   # API docs
                   path("api/schema/", SpectacularAPIView.as_view(), name="schema"),
                   # Optional UI - you may wish to remove one of these depending on your preference